@@ -0,0 +1,287 @@
+"""
+Smart Platform Project: ForumCrawler Module.
+
+AI Searching Engine Package: Web Searching Engine.
+
+Version: 2026.10.18.02
+"""
+
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+from collections.abc import Callable
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+from lang.aise.foruminfo import ForumConfig
+from lang.aise.forumscraper import ForumScraper
+from lang.aise.site.oursteps import OurSteps
+
+
+class TokenBucket:
+    """Token Bucket Class: rate limit of one host."""
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Class initialization.
+
+        :param rate: Requests per second.
+        :param burst: Requests sent at once after an idle time.
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        # waiters take their turn in order
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait for a token."""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class CrawlStats:
+    """Crawl Stats Class."""
+
+    def __init__(self):
+        """Class initialization."""
+        self.start = time.perf_counter()
+        self.pages = 0
+        self.bytes = 0
+        self.errors = 0
+        self.retries = 0
+
+    def __str__(self) -> str:
+        """Pages/s, bytes/s and error rate."""
+        seconds = max(time.perf_counter() - self.start, 1e-9)
+        total = self.pages + self.errors or 1
+        return (
+            f"{self.pages} pages, {self.bytes / 1024:.0f} KB in "
+            f"{seconds:.1f}s: {self.pages / seconds:.2f} pages/s, "
+            f"{self.bytes / 1024 / seconds:.1f} KB/s, "
+            f"{self.errors} errors ({self.errors / total:.1%}), "
+            f"{self.retries} retries"
+        )
+
+
+class ForumCrawler:
+    """
+    ForumCrawler Class.
+
+    Crawl a forum without prompts: the boards in the site Boards, their
+    pages and the pages of their threads, several at a time. All requests
+    go through one httpx.AsyncClient with pooled keep-alive connections,
+    HTTP/2 when the h2 package is installed, and a token bucket per host
+    keeps the crawl polite. Timeouts, connection errors, 429 and 5xx
+    responses are retried with exponential backoff.
+    """
+
+    # Retries of a failed request
+    Retries: int = 3
+    # Backoff of the first retry in seconds, doubled after each
+    Backoff: float = 1.0
+    # Responses worth a retry
+    Retry_Status: frozenset[int] = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        cfg: ForumConfig,
+        concurrency: int = 8,
+        rate: float = 2.0,
+        burst: int = 4,
+        board_pages: int = 5,
+        thread_pages: int = 3,
+        timeout: float = 20.0,
+    ):
+        """
+        Class initialization.
+
+        :param cfg: Forum config.
+        :param concurrency: Requests in flight, and pooled connections.
+        :param rate: Requests per second to one host.
+        :param burst: Requests at once to one host after an idle time.
+        :param board_pages: Pages crawled per board.
+        :param thread_pages: Pages crawled per thread.
+        :param timeout: Request timeout in seconds.
+        """
+        self.concurrency = concurrency
+        self.rate = rate
+        self.burst = burst
+        self.board_pages = board_pages
+        self.thread_pages = thread_pages
+        # logs in and fetches the pages with the tuned client
+        self.scraper = ForumScraper(cfg, self.get_client(timeout))
+        self.host = urlsplit(cfg.forum_url).netloc
+        self.buckets: dict[str, TokenBucket] = {}
+        self.seen: set[str] = set()
+        self.stats = CrawlStats()
+
+    def get_client(self, timeout: float) -> httpx.AsyncClient:
+        """Get a pooled async client, HTTP/2 if h2 is installed."""
+        return httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+                keepalive_expiry=30.0,
+            ),
+        )
+
+    def bucket(self, url: str) -> TokenBucket:
+        """Get the token bucket of an url host."""
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+    def backoff(self, attempt: int, response: httpx.Response | None) -> float:
+        """Get the seconds to wait before a retry."""
+        after = response.headers.get("Retry-After") if response else None
+        if after and after.isdigit():
+            return float(after)
+        # jitter: retries of the same burst do not land together
+        return self.Backoff * 2**attempt * random.uniform(0.5, 1.5)
+
+    async def fetch(self, url: str) -> str | None:
+        """Fetch a page, None if it still fails after the retries."""
+        for attempt in range(self.Retries + 1):
+            await self.bucket(url).acquire()
+            response = None
+            try:
+                response = await self.scraper.client.get(url)
+                if response.status_code not in self.Retry_Status:
+                    response.raise_for_status()
+                    self.stats.pages += 1
+                    self.stats.bytes += response.num_bytes_downloaded
+                    return response.text
+            except httpx.TransportError as te:
+                logging.warning(f"{url}: {te!r}")
+            except httpx.HTTPStatusError as he:
+                logging.error(f"{url}: {he!r}")
+                break
+            if attempt < self.Retries:
+                self.stats.retries += 1
+                await asyncio.sleep(self.backoff(attempt, response))
+        self.stats.errors += 1
+        return None
+
+    def follow(self, base: str, href: str | None) -> str | None:
+        """Get the absolute url of a forum link, None if off site or seen."""
+        if not href:
+            return None
+        url = urljoin(base, href)
+        if urlsplit(url).netloc != self.host or url in self.seen:
+            return None
+        self.seen.add(url)
+        return url
+
+    async def crawl_page(
+        self,
+        queue: asyncio.Queue[tuple[str, str, int]],
+        url: str,
+        kind: str,
+        page: int,
+        on_thread: Callable[[str, str], None] | None,
+    ) -> None:
+        """Fetch a board or thread page and queue the pages it links to."""
+        html = await self.fetch(url)
+        if html is None:
+            return
+        limit = self.board_pages if kind == "board" else self.thread_pages
+        nxt = (
+            self.follow(url, OurSteps.next_page(html)) if page < limit else None
+        )
+        if nxt:
+            queue.put_nowait((nxt, kind, page + 1))
+        if kind == "thread":
+            if on_thread is not None:
+                on_thread(url, html)
+            return
+        for href in OurSteps.thread_links(html):
+            thread = self.follow(url, href)
+            if thread:
+                queue.put_nowait((thread, "thread", 1))
+
+    async def crawl(
+        self, on_thread: Callable[[str, str], None] | None = None
+    ) -> CrawlStats:
+        """
+        Crawl the boards of the forum and their threads.
+
+        :param on_thread: Called with the url and html of each thread page.
+        :return: Crawl stats.
+        :raise RuntimeError: No saved cookies and no login details in the
+            config or the environment.
+        """
+        try:
+            if not await self.scraper.ensure_login(prompt=False):
+                prefix = self.scraper.cfg.forum_name.upper()
+                raise RuntimeError(
+                    f"No cookies or login details of {prefix}: set "
+                    f"{prefix}_USERNAME and {prefix}_PASSWORD."
+                )
+            await self.walk(on_thread)
+        finally:
+            await self.scraper.client.aclose()
+        return self.stats
+
+    async def walk(self, on_thread: Callable[[str, str], None] | None):
+        """Walk from the forum main page, several pages at a time."""
+        self.stats = CrawlStats()
+        base = self.scraper.cfg.forum_url + self.scraper.cfg.base_path
+        self.seen = {base}
+        index = await self.fetch(base)
+        if index is None:
+            return
+        queue: asyncio.Queue[tuple[str, str, int]] = asyncio.Queue()
+        for _, href in OurSteps.board_links(index):
+            board = self.follow(base, href)
+            if board:
+                queue.put_nowait((board, "board", 1))
+
+        async def worker() -> None:
+            while True:
+                url, kind, page = await queue.get()
+                try:
+                    await self.crawl_page(queue, url, kind, page, on_thread)
+                except Exception as ex:
+                    self.stats.errors += 1
+                    logging.error(f"{url}: {ex!r}")
+                finally:
+                    queue.task_done()
+
+        workers = [
+            asyncio.create_task(worker()) for _ in range(self.concurrency)
+        ]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    from lang.aise.foruminfo import ForumList
+
+    forum_name = "oursteps"
+    fc = ForumList.get_forum_config(forum_name)
+    if fc is None:
+        logging.warning("Forum config not found.")
+    else:
+        fcr = ForumCrawler(fc)
+        print(asyncio.run(fcr.crawl()))
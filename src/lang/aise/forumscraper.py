@@ -3,12 +3,13 @@ Smart Platform Project: ForumScraper Module.
 
 AI Searching Engine Package: Web Searching Engine.
 
-Version: 2024.07.19.01
+Version: 2026.10.18.02
 """
 
 import asyncio
 import json
 import logging
+import os
 
 import httpx
 from lang.aise.foruminfo import ForumConfig
@@ -19,10 +20,12 @@ from selectolax.lexbor import LexborHTMLParser as HTMLParser
 class ForumScraper:
     """Forum Scraper class."""
 
-    def __init__(self, cfg: ForumConfig):
+    def __init__(
+        self, cfg: ForumConfig, client: httpx.AsyncClient | None = None
+    ):
         """Class initialization."""
         self.cfg = cfg
-        self.client = httpx.AsyncClient()
+        self.client = client or httpx.AsyncClient()
 
     def cfg_init(self) -> bool:
         """Initialize ForumConfig login details."""
@@ -148,15 +151,42 @@ class ForumScraper:
         await self.save_cookies()
         return response
 
+    def env_init(self) -> bool:
+        """
+        Initialize ForumConfig login details without prompts.
+
+        The details set in the config go first, then the <FORUM>_USERNAME
+        and <FORUM>_PASSWORD environment variables, e.g. OURSTEPS_USERNAME.
+        """
+        prefix = self.cfg.forum_name.upper()
+        name = os.environ.get(f"{prefix}_USERNAME", "").strip()
+        pwd = os.environ.get(f"{prefix}_PASSWORD", "").strip()
+        if self.cfg.username == "None" and name:
+            self.cfg.username = name
+        if self.cfg.password == "None" and pwd:
+            self.cfg.password = pwd
+        return "None" not in {self.cfg.username, self.cfg.password}
+
+    async def ensure_login(self, prompt: bool = True) -> bool:
+        """
+        Load the saved cookies or log in, False if login details fail.
+
+        :param prompt: Ask for the login details missing in the config and
+            the environment.
+        """
+        if not (self.cfg.cookie_pass and await self.load_cookies()):
+            if not (self.env_init() or (prompt and self.cfg_init())):
+                logging.error("Enter login detail failed.")
+                return False
+            await self.login()
+        return True
+
     async def access_protected_page(
         self, path: str | None = None
     ) -> str | None:
         """Access protected page."""
-        if not (self.cfg.cookie_pass and await self.load_cookies()):
-            if not self.cfg_init():
-                logging.error("Enter login detail failed.")
-                return None
-            await self.login()
+        if not await self.ensure_login():
+            return None
 
         protected_page_url = self.cfg.forum_url + self.cfg.base_path
         if path:
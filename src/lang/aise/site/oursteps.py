@@ -1,7 +1,7 @@
 """
 Oursteps web site Module.
 
-Version: 2024.07.31.01
+Version: 2026.10.18.01
 """
 
 from selectolax.lexbor import LexborHTMLParser as HTMLParser
@@ -16,26 +16,38 @@ class OurSteps:
     ]
 
     @staticmethod
-    def list_boards(html: str) -> str:
-        """List boards from the forum."""
+    def board_links(html: str) -> list[tuple[str, str]]:
+        """Get the names and links of the boards in Boards."""
         tree = HTMLParser(html)
         ref = "a[href^='forum.php?mod=forumdisplay&fid=']"
-        nodes = tree.css(f"dt > {ref}, p > {ref}")
-        urls: list[str] = []
-        idx = 1
+        links: dict[str, str] = {}
+        for node in tree.css(f"dt > {ref}, p > {ref}"):
+            if node.text() in OurSteps.Boards and node.text() not in links:
+                links[node.text()] = node.attributes["href"] or ""
+        return list(links.items())
+
+    @staticmethod
+    def list_boards(html: str) -> str:
+        """List boards from the forum."""
+        boards = OurSteps.board_links(html)
         print("Available boards:")
-        for node in nodes:
-            if node.text() in OurSteps.Boards:
-                print(f"{idx}: {node.text()}")
-                urls.append(node.attributes["href"])
-                idx += 1
-                if idx > len(OurSteps.Boards):
-                    break
+        for idx, (name, _) in enumerate(boards, 1):
+            print(f"{idx}: {name}")
         sel = input("Select board:")
-        if sel.isdigit() and 0 < int(sel) <= len(urls):
-            return urls[int(sel) - 1]
+        if sel.isdigit() and 0 < int(sel) <= len(boards):
+            return boards[int(sel) - 1][1]
         return ""
 
+    @staticmethod
+    def thread_links(html: str) -> list[str]:
+        """Get the thread links of a board page."""
+        tree = HTMLParser(html)
+        ref = "a[href^='forum.php?mod=viewthread']"
+        return [
+            node.attributes["href"] or ""
+            for node in tree.css(f"tbody > tr > th > {ref}")
+        ]
+
     @staticmethod
     def list_threads(html: str) -> str:
         """List threads from the board."""
@@ -43,5 +55,11 @@ class OurSteps:
         ref = "a[href^='forum.php?mod=viewthread']"
         nodes = tree.css(f"tbody > tr > th > {ref}")
         for i, node in enumerate(nodes):
-            print(f"{i+1}: {node.text()}")
+            print(f"{i + 1}: {node.text()}")
         return ""
+
+    @staticmethod
+    def next_page(html: str) -> str | None:
+        """Get the next page link of a board or thread page."""
+        node = HTMLParser(html).css_first("div.pg > a.nxt")
+        return node.attributes.get("href") if node else None
@@ -3,14 +3,19 @@ Smart Platform Project: icmd module.
 
 User input from command line interface.
 
-Version: 2024.07.17.01
+Version: 2026.10.18.08
 """
 
+import asyncio
+import contextlib
+import logging
+import signal
 from datetime import datetime
 
 from aioconsole import ainput
 from lang.prod.lg import LG
-from lang.prod.lm import EOM, OLM
+from lang.prod.lm import EOM
+from lang.prod.lmpool import OLMPool
 from lang.prod.prompt import Prompt
 
 
@@ -22,6 +27,7 @@ class ICMD:
         "#: The next question will be in the same context.\n"
         "@: The next question will be in a new context.\n"
         "^: Retrieve answers from a web link's domain and path.\n"
+        "!: Cancel the answer in progress, or press Ctrl-C.\n"
         "$: Quit.\n"
         "Please enter your question:\n"
     )
@@ -47,16 +53,43 @@ class ICMD:
         """Class initialization."""
         # Context ID
         self.cid = datetime.now().strftime("%Y%m%d%H%M%S")
-        # Smart Assistant
-        self.ass = OLM(
+        # Smart Assistant pool: reuse models within a memory budget
+        self.pool = OLMPool()
+        self.ass = self.pool.get(
             self.Assistant_List[0][0],
             self.Assistant_List[0][1],
         )
-        self.lg = LG(self.ass)
+        self.lg = LG(self.ass, pool=self.pool)
+        # questions to answer in order: message, context ID, new context
+        self.questions: asyncio.Queue[tuple[str, str, bool]] = asyncio.Queue()
+        # answer in progress
+        self.task: asyncio.Task | None = None
 
     async def input(self, size: int = 6) -> None:
         """Input method from user."""
+        # conversations survive restarts: resume the last context
+        await self.lg.saver.maintain()
+        self.cid = await self.lg.saver.latest() or self.cid
+        print(f"Context {self.cid}.")
         print(self.Prompt_Welcome)
+        loop = asyncio.get_running_loop()
+        # no signal handlers on Windows event loops
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signal.SIGINT, self.interrupt)
+        # answers stream while the next question is typed
+        worker = asyncio.create_task(self.answer())
+        try:
+            await self.read(size)
+        finally:
+            worker.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await worker
+            with contextlib.suppress(NotImplementedError):
+                loop.remove_signal_handler(signal.SIGINT)
+            await self.lg.saver.close()
+
+    async def read(self, size: int) -> None:
+        """Read the user input until quit."""
         prompt = self.Prompt_Normal
         # concat message
         cmsg = ""
@@ -68,6 +101,8 @@ class ICMD:
             uimsg = uimsg.strip()
             if uimsg == "$":
                 break
+            elif uimsg == "!":
+                self.cancel()
             elif uimsg == "*":
                 await self.change_assistant()
             elif uimsg == "^":
@@ -85,26 +120,68 @@ class ICMD:
 
                 uimsg = uimsg[1:].strip()
                 cmsg += uimsg
-                if (inc and cmsg) or not inc:
-                    self.lg.graph_proc(cmsg, self.cid)
+                await self.questions.put((cmsg, self.cid, inc))
                 if inc:
-                    datetime.now().strftime("%Y%m%d%H%M%S")
+                    self.cid = datetime.now().strftime("%Y%m%d%H%M%S")
                 prompt = self.Prompt_Normal
                 cmsg = ""
 
+    async def answer(self) -> None:
+        """Answer the questions in order, each one can be cancelled."""
+        while True:
+            umsg, cid, inc = await self.questions.get()
+            if umsg:
+                self.task = asyncio.create_task(self.lg.agraph_proc(umsg, cid))
+                try:
+                    # not evicted by an assistant change meanwhile
+                    with self.pool.hold(self.lg.olm.mn):
+                        await self.task
+                except asyncio.CancelledError:
+                    # the worker itself is cancelled on quit
+                    worker = asyncio.current_task()
+                    if worker is not None and worker.cancelling():
+                        raise
+                    print("\nThe answer is cancelled.\n")
+                except Exception as ex:
+                    # a failed answer does not stop the next questions
+                    logging.error(f"ICMD {cid}: {ex!r}")
+                    print(f"\nThe answer failed: {ex}\n")
+                finally:
+                    self.task = None
+            if inc:
+                # the old context keeps its latest checkpoint only
+                try:
+                    await self.lg.saver.compact(cid)
+                except Exception as ex:
+                    logging.error(f"ICMD compact {cid}: {ex!r}")
+
+    def cancel(self) -> bool:
+        """Cancel the answer in progress, False if there is none."""
+        if self.task is None or self.task.done():
+            return False
+        self.task.cancel()
+        return True
+
+    def interrupt(self) -> None:
+        """Handle Ctrl-C: cancel the answer, never the process."""
+        if not self.cancel():
+            print("\nNothing to cancel, enter $ to quit.")
+
     async def change_assistant(self) -> None:
         """Change assistant."""
         # Smart assistant count
         count: int = len(self.Assistant_List) + 1
         uimsg = await ainput(self.Prompt_Assistant)
-        uimsg.strip()
+        uimsg = uimsg.strip()
         for i in range(3):
             if uimsg.isdigit() and 0 < int(uimsg) < count:
-                self.ass = OLM(
+                self.ass = await self.pool.acquire(
                     self.Assistant_List[int(uimsg) - 1][0],
                     self.Assistant_List[int(uimsg) - 1][1],
                 )
                 self.lg.change_llm(self.ass)
                 break
-            uimsg = input("Wrong format, please enter your number:").strip()
-        print(f"Smart AI {self.ass.name} is your assistant.\n")
+            uimsg = await ainput("Wrong format, please enter your number:")
+            uimsg = uimsg.strip()
+        print(f"Smart AI {self.ass.name} is your assistant.")
+        print(f"{self.pool}\n")
@@ -3,13 +3,398 @@ Smart Platform Project: iweb module.
 
 User input from web browser interface.
 
-Version: 2024.07.17.01
+Version: 2026.10.18.06
 """
 
+import asyncio
+import contextlib
+import json
+import logging
+import time
+import uuid
+import weakref
+from collections import deque
+from collections.abc import Awaitable, Callable, MutableMapping
+from typing import Any
+from urllib.parse import parse_qs
+
+import numpy as np
+from lang.prod.lg import LG
+from lang.prod.lgsave import LGSaver
+from lang.prod.lm import EOM, OLM
+from lang.prod.lmpool import OLMPool
+from lang.prod.rcache import ResponseCache
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+
 
 class IWEB:
-    """Class IWEB."""
+    """
+    Class IWEB.
+
+    ASGI application streaming the answers as Server-Sent Events. Each
+    session is a context ID, and all sessions share one event loop, one
+    checkpointer, one response cache and the model pool, with one LG per
+    model. The turns of a context run one at a time, in order.
+
+    GET /: chat page.
+    GET or POST /chat: q (question), cid (context, new if none) and model
+    (EOM name), as query or JSON body. Events: session, token, done and
+    error.
+    GET /stats: sessions, failures, time-to-first-token and the queue
+    wait and generation time of each model.
+    """
+
+    Page: str = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Smart AI</title></head>
+<body>
+<pre id="out"></pre>
+<form id="ask"><input id="q" size="80" autofocus></form>
+<script>
+let cid = "";
+document.getElementById("ask").onsubmit = (e) => {
+  e.preventDefault();
+  const q = document.getElementById("q");
+  const out = document.getElementById("out");
+  out.textContent += "\\nUser: " + q.value + "\\nAI: ";
+  const query = new URLSearchParams({q: q.value, cid});
+  const src = new EventSource("/chat?" + query);
+  src.addEventListener("session", (m) => { cid = JSON.parse(m.data).cid; });
+  src.addEventListener("token", (m) => {
+    out.textContent += JSON.parse(m.data).token;
+  });
+  src.addEventListener("done", () => src.close());
+  src.addEventListener("error", () => src.close());
+  q.value = "";
+};
+</script>
+</body></html>
+"""
+
+    # TTFT samples kept for the stats
+    Samples: int = 10000
+
+    def __init__(
+        self,
+        pool: OLMPool | None = None,
+        model: str = "L008",
+        saver: LGSaver | None = None,
+        cache: ResponseCache | None = None,
+    ):
+        """
+        Class initialization.
+
+        :param pool: Model pool, a local Ollama by default.
+        :param model: Default EOM model name.
+        :param saver: Checkpointer shared by all sessions.
+        :param cache: Response cache shared by all sessions.
+        """
+        self.pool = pool or OLMPool()
+        self.model = model
+        self.saver = saver or LGSaver.from_path()
+        self.cache = cache
+        # EOM name -> LG of the model
+        self.lgs: dict[str, LG] = {}
+        self.lgs_lock = asyncio.Lock()
+        # context ID -> lock of its turns, dropped when unused
+        self.locks: weakref.WeakValueDictionary[str, asyncio.Lock] = (
+            weakref.WeakValueDictionary()
+        )
+        self.active = 0
+        self.served = 0
+        self.failed = 0
+        self.ttfts: deque[float] = deque(maxlen=self.Samples)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        """ASGI entry point."""
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        match scope["method"], scope["path"]:
+            case "GET", "/":
+                await self.reply(send, 200, self.Page.encode(), "text/html")
+            case "GET" | "POST", "/chat":
+                await self.chat(scope, receive, send)
+            case "GET", "/stats":
+                await self.reply_json(send, 200, self.stats())
+            case _:
+                await self.reply_json(send, 404, {"error": "Not found."})
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        """Maintain the checkpointer on startup and close it on shutdown."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.saver.maintain()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.saver.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def get_lg(self, name: str) -> LG:
+        """Get the LG of a model, loading the model on first use."""
+        mn = EOM[name]
+        if name in self.lgs:
+            # marked as recently used in the pool
+            self.pool.get(name, mn)
+            return self.lgs[name]
+        async with self.lgs_lock:
+            if name not in self.lgs:
+                olm = await self.pool.acquire(name, mn)
+                lg = LG(olm, self.saver, self.cache, pool=self.pool)
+                self.cache = lg.cache
+                self.lgs[name] = lg
+        return self.lgs[name]
+
+    async def params(self, scope: Scope, receive: Receive) -> dict[str, str]:
+        """Get the query parameters, and the JSON body of a POST."""
+        query = parse_qs(scope.get("query_string", b"").decode())
+        params = {key: values[0] for key, values in query.items()}
+        if scope["method"] == "POST":
+            body = b""
+            more = True
+            while more:
+                message = await receive()
+                body += message.get("body", b"")
+                more = message.get("more_body", False)
+            if body:
+                params.update(
+                    {key: str(value) for key, value in json.loads(body).items()}
+                )
+        return params
+
+    async def chat(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Stream the answer of a question as Server-Sent Events."""
+        try:
+            params = await self.params(scope, receive)
+        except (json.JSONDecodeError, AttributeError):
+            await self.reply_json(send, 400, {"error": "Bad JSON body."})
+            return
+        question = params.get("q", "").strip()
+        name = params.get("model") or self.model
+        if not question or name not in EOM.__members__:
+            await self.reply_json(send, 400, {"error": "Bad question/model."})
+            return
+        cid = params.get("cid") or uuid.uuid4().hex
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    # no proxy buffering of the stream
+                    (b"x-accel-buffering", b"no"),
+                ],
+            }
+        )
+        await self.event(send, "session", {"cid": cid, "model": name})
+        stream = asyncio.create_task(self.stream(send, name, question, cid))
+        watch = asyncio.create_task(self.disconnected(receive))
+        await asyncio.wait({stream, watch}, return_when=asyncio.FIRST_COMPLETED)
+        # a client gone stops its generation
+        for task in (stream, watch):
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        await send({"type": "http.response.body", "body": b""})
+
+    async def stream(self, send: Send, name: str, question: str, cid: str):
+        """Stream the answer tokens of a turn."""
+        start = time.perf_counter()
+        ttft: float | None = None
+        self.active += 1
+        lock = self.locks.setdefault(cid, asyncio.Lock())
+        try:
+            # the model of a stream is not evicted for another session
+            with self.pool.hold(EOM[name]):
+                lg = await self.get_lg(name)
+                # a stream stopped at a token is closed, and its turn
+                # rolled back, right away
+                async with (
+                    lock,
+                    contextlib.aclosing(lg.astream(question, cid)) as tokens,
+                ):
+                    async for token in tokens:
+                        if ttft is None:
+                            ttft = time.perf_counter() - start
+                            self.ttfts.append(ttft)
+                        await self.event(send, "token", {"token": token})
+            self.served += 1
+            await self.event(
+                send,
+                "done",
+                {
+                    "cid": cid,
+                    "ttft": ttft,
+                    "total": time.perf_counter() - start,
+                },
+            )
+        except Exception as ex:
+            self.failed += 1
+            logging.error(f"IWEB {cid}: {ex!r}")
+            await self.event(send, "error", {"error": str(ex)})
+        finally:
+            self.active -= 1
+
+    @staticmethod
+    async def disconnected(receive: Receive) -> None:
+        """Wait until the client disconnects."""
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @staticmethod
+    async def event(send: Send, name: str, data: dict[str, Any]) -> None:
+        """Send a Server-Sent Event."""
+        await send(
+            {
+                "type": "http.response.body",
+                "body": f"event: {name}\ndata: {json.dumps(data)}\n\n".encode(),
+                "more_body": True,
+            }
+        )
+
+    @staticmethod
+    async def reply(
+        send: Send, status: int, body: bytes, content_type: str
+    ) -> None:
+        """Send a whole response."""
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", content_type.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def reply_json(send: Send, status: int, data: dict[str, Any]):
+        """Send a JSON response."""
+        await IWEB.reply(
+            send, status, json.dumps(data).encode(), "application/json"
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Get the session and time-to-first-token stats."""
+        ttfts = np.array(self.ttfts)
+        return {
+            "active": self.active,
+            "served": self.served,
+            "failed": self.failed,
+            "ttft_p50": float(np.percentile(ttfts, 50)) if ttfts.size else None,
+            "ttft_p99": float(np.percentile(ttfts, 99)) if ttfts.size else None,
+            "pool": str(self.pool),
+            "scheduler": OLM.Request_Scheduler.stats(),
+        }
+
+    def serve(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        """Serve with uvicorn, which is only needed here."""
+        # optional: the ASGI app runs under any server without it
+        import uvicorn  # noqa: PLC0415
+
+        uvicorn.run(self, host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+    from urllib.parse import urlencode
+
+    async def session(app: IWEB, index: int, turns: int) -> list[float]:
+        """Run the turns of a session in process, get their TTFT."""
+        cid = f"load-{uuid.uuid4().hex}"
+        ttfts: list[float] = []
+        for turn in range(turns):
+            query = urlencode(
+                {"q": f"Load test session {index} question {turn}.", "cid": cid}
+            )
+            scope = {
+                "type": "http",
+                "method": "GET",
+                "path": "/chat",
+                "query_string": query.encode(),
+                "headers": [],
+            }
+            start = time.perf_counter()
+            first: list[float] = []
+            done = asyncio.Event()
+
+            async def receive() -> Message:
+                await done.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message: Message) -> None:
+                body = message.get("body", b"")
+                if not first and body.startswith(b"event: token"):
+                    first.append(time.perf_counter() - start)
+                if body.startswith(b"event: error"):
+                    raise RuntimeError(body.decode())
+
+            await app(scope, receive, send)
+            done.set()
+            ttfts += first
+        return ttfts
+
+    async def load(
+        sessions: int, concurrency: int, turns: int, base_url: str
+    ) -> None:
+        """Run concurrent sessions against one IWEB, report the rates."""
+        out = Path("out/iweb-load")
+        out.mkdir(parents=True, exist_ok=True)
+        # no semantic tier: each question is new to the model
+        app = IWEB(
+            OLMPool(base_url=base_url),
+            saver=LGSaver.from_path(out / "lg.sqlite"),
+            cache=ResponseCache(out / "rcache.sqlite"),
+        )
+        gate = asyncio.Semaphore(concurrency)
+
+        async def run(index: int) -> list[float]:
+            async with gate:
+                return await session(app, index, turns)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(run(i) for i in range(sessions)), return_exceptions=True
+        )
+        seconds = time.perf_counter() - start
+        await app.saver.close()
+        ttfts = [t for r in results if isinstance(r, list) for t in r]
+        failed = sum(isinstance(r, BaseException) for r in results)
+        print(
+            f"{sessions} sessions x {turns} turns, {concurrency} at a time, "
+            f"in {seconds:.2f}s: {sessions / seconds:.2f} sessions/s, "
+            f"{failed} failed"
+        )
+        if ttfts:
+            print(
+                f"TTFT p50 {np.percentile(ttfts, 50):.3f}s, "
+                f"p99 {np.percentile(ttfts, 99):.3f}s"
+            )
+        print(OLM.Request_Scheduler)
 
-    def __init__(self):
-        """Class initialization."""
-        pass
+    # python iweb.py [port] | python iweb.py load [sessions] [concurrency]
+    #   [turns] [base_url]
+    if sys.argv[1:2] == ["load"]:
+        args = sys.argv[2:]
+        asyncio.run(
+            load(
+                int(args[0]) if args[0:] else 50,
+                int(args[1]) if args[1:] else 10,
+                int(args[2]) if args[2:] else 2,
+                args[3] if args[3:] else "http://localhost:11434",
+            )
+        )
+    else:
+        IWEB().serve(port=int(sys.argv[1]) if sys.argv[1:] else 8000)
@@ -0,0 +1,282 @@
+"""
+Batch Question Answering Module.
+
+Version: 2026.10.18.03
+"""
+
+import asyncio
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, TextIO
+
+import numpy as np
+from lang.prod.lg import LG
+from lang.prod.lgsave import LGSaver
+from lang.prod.lm import OLM
+from lang.prod.prompt import Prompt
+from lang.prod.rcache import ResponseCache
+from lang.prod.sched import Priority, SchedulerBusyError
+from lang.util.decorators import Timer
+from lang.util.tokens import Tokens
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables.base import Runnable
+
+
+class BatchQA:
+    """
+    BatchQA Class.
+
+    Answer the questions of a JSONL file, {"id": ..., "question": ...} per
+    line, through an LC chain or an LG graph, a few at a time. Each result
+    is appended to the output JSONL as soon as it completes, so a stopped
+    run resumes with the questions not answered yet. The requests have the
+    batch priority, interactive sessions go first.
+
+    A chain of the caller, e.g. KB.get_chain() piped to a model chain, gets
+    the question and streams the answer, and binds its own priority. The
+    default LC chain pipes a prompt, the system prompt and the question
+    unless given, to the model. The default LG graph gets its own checkpointer
+    and an exact-only response cache next to the output, so a run neither
+    reads nor fills the semantic cache of the chat sessions. A question
+    rejected by a full scheduler queue is asked again: LG rolls the failed
+    turn back first, so its context holds the question once.
+    """
+
+    # Results between two progress lines
+    Progress: int = 50
+    # Retries of a question rejected by a full scheduler queue
+    Busy_Retries: int = 10
+
+    def __init__(
+        self,
+        olm: OLM,
+        mode: str = "lg",
+        concurrency: int = 4,
+        prompt: ChatPromptTemplate | None = None,
+        chain: Runnable | LG | None = None,
+    ):
+        """
+        Class initialization.
+
+        :param olm: Ollama local model.
+        :param mode: "lc" for the model chain, "lg" for the graph, of the
+            model: set by the type of the chain if any.
+        :param concurrency: Questions in flight.
+        :param prompt: Prompt of the LC chain, with a {question} variable.
+        :param chain: Chain or graph answering instead of the ones of the
+            model, a chain gets the question string.
+        """
+        if mode not in {"lc", "lg"}:
+            raise ValueError(f"Unknown batch mode {mode}.")
+        self.olm = olm
+        self.mode = mode
+        self.concurrency = concurrency
+        self.prompt = prompt or ChatPromptTemplate.from_messages(
+            [("system", Prompt.System_Message), ("human", "{question}")]
+        )
+        self.chain: Runnable | None = None
+        self.lg: LG | None = None
+        if isinstance(chain, LG):
+            self.mode, self.lg = "lg", chain
+        elif chain is not None:
+            self.mode, self.chain = "lc", chain
+        # the graph built by the run, closed by it
+        self.own_lg = False
+        self.answered = 0
+        self.failed = 0
+        self.skipped = 0
+        self.tokens = 0
+        self.latencies: list[float] = []
+
+    @staticmethod
+    def read(path: Path) -> list[tuple[str, str]]:
+        """Get the IDs and questions of a JSONL file, line numbers if none."""
+        questions = []
+        with path.open(encoding="utf-8") as file:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                questions.append(
+                    (str(item.get("id", number)), str(item["question"]))
+                )
+        return questions
+
+    @staticmethod
+    def finished(path: Path) -> set[str]:
+        """Get the IDs answered in an output JSONL file, failures excluded."""
+        if not path.exists():
+            return set()
+        done = set()
+        with path.open(encoding="utf-8") as file:
+            for line in file:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    # the last line of a killed run
+                    continue
+                if "error" not in item:
+                    done.add(str(item["id"]))
+        return done
+
+    @staticmethod
+    def ended(path: Path) -> bool:
+        """Check if a file ends with a new line."""
+        with path.open("rb") as file:
+            file.seek(-1, 2)
+            return file.read(1) == b"\n"
+
+    async def answer(self, qid: str, question: str) -> str:
+        """Get the answer of a question, each one in its own context."""
+        cid = f"batch-{qid}"
+        if self.lg is not None:
+            tokens = [token async for token in self.lg.astream(question, cid)]
+            return "".join(tokens)
+        chain = self.chain or (
+            {"question": RunnablePassthrough()}
+            | self.prompt
+            | self.olm.get_llm().bind(session=cid, priority=Priority.BATCH)
+            | StrOutputParser()
+        )
+        # a chain without an output parser streams messages
+        return "".join(
+            [
+                str(getattr(chunk, "content", chunk))
+                async for chunk in chain.astream(question)
+            ]
+        )
+
+    async def ask(self, qid: str, question: str) -> dict[str, Any]:
+        """Get the result record of a question."""
+        start = time.perf_counter()
+        record: dict[str, Any] = {"id": qid, "question": question}
+        for attempt in range(self.Busy_Retries):
+            try:
+                answer = await self.answer(qid, question)
+                break
+            except SchedulerBusyError:
+                # back-pressure: the interactive sessions need the slots,
+                # the rejected turn is not saved
+                await asyncio.sleep(2**attempt)
+            except Exception as ex:
+                logging.error(f"BatchQA {qid}: {ex!r}")
+                return {**record, "error": repr(ex)}
+        else:
+            return {**record, "error": "The scheduler queue stayed full."}
+        seconds = time.perf_counter() - start
+        tokens = Tokens.estimate(answer)
+        self.tokens += tokens
+        self.latencies.append(seconds)
+        return {
+            **record,
+            "answer": answer,
+            "model": self.olm.mn,
+            "tokens": tokens,
+            "seconds": round(seconds, 3),
+        }
+
+    async def worker(
+        self, queue: asyncio.Queue[tuple[str, str]], out: TextIO
+    ) -> None:
+        """Answer the queued questions and append their results."""
+        while True:
+            qid, question = await queue.get()
+            record = await self.ask(qid, question)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if "error" in record:
+                self.failed += 1
+            else:
+                self.answered += 1
+            if (self.answered + self.failed) % self.Progress == 0:
+                print(f"{self.answered} answered, {self.failed} failed.")
+            queue.task_done()
+
+    @Timer.afxn_run
+    async def run(self, src: Path, dst: Path) -> None:
+        """
+        Answer the questions of a JSONL file.
+
+        :param src: Questions JSONL file.
+        :param dst: Results JSONL file, appended to.
+        """
+        done = self.finished(dst)
+        todo = [(qid, q) for qid, q in self.read(src) if qid not in done]
+        self.skipped = len(done)
+        if self.mode == "lg" and self.lg is None:
+            # batch contexts stay out of the chat checkpoints and cache
+            self.lg = LG(
+                self.olm,
+                LGSaver.from_path(dst.with_suffix(".sqlite")),
+                ResponseCache(dst.with_suffix(".rcache.sqlite")),
+                priority=Priority.BATCH,
+            )
+            self.own_lg = True
+        self.olm.prewarm()
+        await asyncio.to_thread(self.olm.wait_warm)
+
+        queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
+        for item in todo:
+            queue.put_nowait(item)
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        with dst.open("a", encoding="utf-8") as out:
+            # a killed run may leave a torn last line
+            if out.tell() and not self.ended(dst):
+                out.write("\n")
+            workers = [
+                asyncio.create_task(self.worker(queue, out))
+                for _ in range(min(self.concurrency, len(todo)))
+            ]
+            try:
+                await queue.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                if self.own_lg and self.lg is not None:
+                    await self.lg.saver.close()
+                    self.lg, self.own_lg = None, False
+        self.summary(time.perf_counter() - start)
+
+    def summary(self, seconds: float) -> None:
+        """Print the throughput of a run."""
+        seconds = max(seconds, 1e-9)
+        print(
+            f"{self.answered} answered, {self.failed} failed, "
+            f"{self.skipped} done before, in {seconds:.1f}s: "
+            f"{self.answered / seconds * 60:.1f} questions/min, "
+            f"{self.tokens / seconds:.1f} tokens/s"
+        )
+        if self.latencies:
+            print(
+                f"Latency p50 {np.percentile(self.latencies, 50):.2f}s, "
+                f"p99 {np.percentile(self.latencies, 99):.2f}s"
+            )
+        print(OLM.Request_Scheduler)
+
+
+if __name__ == "__main__":
+    import sys
+
+    from lang.prod.lm import EOM
+
+    # python batch.py questions.jsonl results.jsonl [lc|lg] [EOM name]
+    #   [concurrency] [--url ollama url]
+    args = sys.argv[1:]
+    url = "http://localhost:11434"
+    if "--url" in args:
+        at = args.index("--url")
+        url = args[at + 1]
+        del args[at : at + 2]
+    name = args[3] if args[3:] else "L008"
+    batch = BatchQA(
+        OLM(name, EOM[name], base_url=url),
+        args[2] if args[2:] else "lg",
+        int(args[4]) if args[4:] else 4,
+    )
+    asyncio.run(batch.run(Path(args[0]), Path(args[1])))
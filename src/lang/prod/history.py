@@ -0,0 +1,222 @@
+"""
+Conversation History Module.
+
+Version: 2026.10.18.04
+"""
+
+from collections.abc import Sequence
+from contextlib import AbstractContextManager, nullcontext
+from typing import Any
+
+from lang.prod.lm import EOM, OLM
+from lang.prod.lmpool import OLMPool
+from lang.prod.prompt import Prompt
+from lang.prod.sched import Priority
+from lang.util.tokens import Tokens
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from langchain_core.runnables.config import RunnableConfig
+
+
+class HistoryPolicy:
+    """
+    HistoryPolicy Class.
+
+    Fit the messages of a context into a token budget. The recent turns
+    are kept verbatim; older turns are dropped ("trim") or folded into a
+    rolling summary by a small model ("summary"). The summary and the
+    number of messages it covers live in the graph state, so it is only
+    regenerated when more turns fall out of the budget. It cuts down to
+    half the budget at a time, so that happens every few turns at most,
+    and the prompt prefix stays the same, and cached by Ollama, between
+    two cuts in both modes.
+
+    With a model pool, the summary model comes from the pool like the chat
+    models, so it counts against the memory budget of the pool; the chat
+    model of the turn is held meanwhile, so making room for the summary
+    model never unloads it. The summary requests run in the session and
+    with the priority of the turn.
+    """
+
+    # Tag of the summary model runs, not part of the streamed answer
+    Tag: str = "history"
+    # Summary model and its answer tokens
+    Summary_Model: tuple[str, str] = ("P003", EOM.P003)
+    Summary_Tokens: int = 256
+
+    def __init__(
+        self,
+        mode: str = "summary",
+        budget: int = 3072,
+        keep: int = 2,
+        summarizer: OLM | None = None,
+        pool: OLMPool | None = None,
+    ):
+        """
+        Class initialization.
+
+        :param mode: "summary" or "trim".
+        :param budget: History tokens sent to the model, system prompt
+            excluded.
+        :param keep: Recent messages always kept verbatim.
+        :param summarizer: Summary model, P003 by default.
+        :param pool: Model pool of the default summary model.
+        """
+        if mode not in {"summary", "trim"}:
+            raise ValueError(f"Unknown history mode {mode}.")
+        self.mode = mode
+        self.budget = budget
+        self.keep = keep
+        self.summarizer = summarizer
+        self.pool = pool
+
+    @staticmethod
+    def tokens(msg: BaseMessage) -> int:
+        """Estimate the tokens of a message."""
+        return Tokens.estimate(str(msg.content)) + 4
+
+    def cut(self, msgs: Sequence[BaseMessage], budget: int) -> int:
+        """Get the index of the first message kept verbatim."""
+        size = 0
+        start = len(msgs)
+        while start > 0:
+            size += self.tokens(msgs[start - 1])
+            if size > budget and len(msgs) - start >= self.keep:
+                break
+            start -= 1
+        return start
+
+    def plan(self, state: dict[str, Any]) -> tuple[list[BaseMessage], int, str]:
+        """
+        Plan the history of a turn.
+
+        :return: The messages to keep verbatim, the index of the first one
+            and the messages to add to the summary, none when trimming.
+        """
+        msgs = state["messages"]
+        start = self.cut(msgs, self.budget)
+        summarized = state.get("summarized") or 0
+        if start <= summarized:
+            return list(msgs[summarized:]), summarized, ""
+        # cut down to half the budget, the cut lasts a few turns
+        start = max(self.cut(msgs, self.budget // 2), summarized + 1)
+        fold = (
+            "\n".join(
+                f"{msg.type}: {msg.content}" for msg in msgs[summarized:start]
+            )
+            if self.mode == "summary"
+            else ""
+        )
+        return list(msgs[start:]), start, fold
+
+    def get_summarizer(self) -> OLM:
+        """Get the summary model, marked as recently used in the pool."""
+        if self.summarizer is not None:
+            return self.summarizer
+        if self.pool is not None:
+            return self.pool.get(*self.Summary_Model)
+        self.summarizer = OLM(
+            *self.Summary_Model, num_predict=self.Summary_Tokens
+        )
+        return self.summarizer
+
+    async def aget_summarizer(self) -> OLM:
+        """Get the summary model, making room for it in the pool."""
+        if self.summarizer is None and self.pool is not None:
+            return await self.pool.acquire(*self.Summary_Model)
+        return self.get_summarizer()
+
+    def hold(self, model: str) -> AbstractContextManager:
+        """Keep the chat model of a turn from being evicted by the pool."""
+        if self.pool is None or not model:
+            return nullcontext()
+        return self.pool.hold(model)
+
+    def summary_messages(self, summary: str, fold: str) -> list[BaseMessage]:
+        """Get the summary model input."""
+        return [
+            SystemMessage(Prompt.History_Summary),
+            HumanMessage(
+                f"Summary so far:\n{summary or '-'}\n\n"
+                f"Conversation to add:\n{fold}"
+            ),
+        ]
+
+    def result(
+        self,
+        state: dict[str, Any],
+        recent: list[BaseMessage],
+        start: int,
+        summary: str,
+    ) -> tuple[list[BaseMessage], dict[str, Any]]:
+        """Get the messages to send and the state update."""
+        messages = (
+            [SystemMessage(f"{Prompt.History_Prefix}{summary}")]
+            if summary
+            else []
+        ) + recent
+        update: dict[str, Any] = {}
+        if start != (state.get("summarized") or 0):
+            update = {"summary": summary, "summarized": start}
+        return messages, update
+
+    def apply(
+        self,
+        state: dict[str, Any],
+        model: str = "",
+        session: str = "",
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> tuple[list[BaseMessage], dict[str, Any]]:
+        """
+        Apply the policy to the state of a turn.
+
+        :param model: Chat model of the turn, held by the async version.
+        :param session: Scheduler session of the turn.
+        :param priority: Scheduler priority of the turn.
+        :return: The messages to send and the state update.
+        """
+        recent, start, fold = self.plan(state)
+        summary = state.get("summary") or ""
+        if fold:
+            summary = str(
+                self.get_summarizer()
+                .get_llm()
+                .bind(
+                    num_predict=self.Summary_Tokens,
+                    session=session,
+                    priority=priority,
+                )
+                .invoke(
+                    self.summary_messages(summary, fold),
+                    RunnableConfig(tags=[self.Tag]),
+                )
+                .content
+            )
+        return self.result(state, recent, start, summary)
+
+    async def aapply(
+        self,
+        state: dict[str, Any],
+        model: str = "",
+        session: str = "",
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> tuple[list[BaseMessage], dict[str, Any]]:
+        """Apply the policy to the state of a turn: async version."""
+        recent, start, fold = self.plan(state)
+        summary = state.get("summary") or ""
+        if fold:
+            with self.hold(model):
+                summarizer = await self.aget_summarizer()
+            reply = await (
+                summarizer.get_llm()
+                .bind(
+                    num_predict=self.Summary_Tokens,
+                    session=session,
+                    priority=priority,
+                )
+                .ainvoke(
+                    self.summary_messages(summary, fold),
+                    RunnableConfig(tags=[self.Tag]),
+                )
+            )
+            summary = str(reply.content)
+        return self.result(state, recent, start, summary)
@@ -1,65 +1,218 @@
 """
 KnowledgeBase Module.
 
-Version: 2024.07.10.01
+Version: 2026.10.18.14
 """
 
+import asyncio
+from collections.abc import Callable
+from pathlib import Path
+
 import bs4
+from lang.prod.kbcache import CachedRetriever
+from lang.prod.kbdedup import MinHashDedup
+from lang.prod.kbembed import EmbeddingCache
+from lang.prod.kbfetch import KBFetcher, Page
+from lang.prod.kbhtml import LexborParser
+from lang.prod.kbindex import KBIndex
+from lang.prod.kblex import BM25Index, HybridRetriever
+from lang.prod.kbpipe import ChromaSink, KBPipe, KBSink, SinkGroup
+from lang.prod.kbvec import VectorIndex
 from lang.util.decorators import Timer
 from langchain import hub
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
-from langchain_community.document_loaders import WebBaseLoader
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.runnables.base import Runnable
-from langchain_huggingface import HuggingFaceEmbeddings
 
 
 class KB:
     """KB Class."""
 
-    def __init__(self, urls: list[str]):
-        """Class initialization."""
+    # Pipeline passes of an update, re-queued pages included
+    Requeue_Rounds: int = 3
+
+    def __init__(
+        self,
+        urls: list[str],
+        path: Path = Path("out/kb"),
+        store: str = "chroma",
+        quant: str = "",
+        dedup: float = 0.8,
+        search: str = "dense",
+        parser: str = "lexbor",
+    ):
+        """
+        Class initialization.
+
+        :param urls: Source page urls.
+        :param path: Persistent index folder.
+        :param store: Vector store: chroma or numpy.
+        :param quant: Quantized numpy index mode: int8 or binary.
+        :param dedup: Near-duplicate chunk threshold, 0 to keep all chunks.
+        :param search: Retrieval mode: dense, lexical or hybrid.
+        :param parser: Page parser: lexbor or bs4.
+        """
         self.urls = urls
 
         # Embedding model
         self.em = "sentence-transformers/all-MiniLM-L6-v2"
 
+        # Persistent index folder: one manifest per vector store
+        self.path = path
+        self.store = store
+        self.quant = quant
+        self.dedup = dedup
+        self.search = search
+        self.parser = parser
+        self.index = KBIndex(self.path / self.store)
+
+        # Page content classes to keep
+        self.classes: tuple[str, ...] = (
+            "post-content",
+            # "post-title",
+            # "post-header"
+        )
+
     @Timer.fxn_run
     def get_chain(self) -> Runnable:
         """Get KnowledgeBase Chain."""
-        loader = WebBaseLoader(
-            web_paths=self.urls,
-            bs_kwargs=dict(
-                parse_only=bs4.SoupStrainer(
-                    class_=(
-                        "post-content",
-                        # "post-title",
-                        # "post-header"
-                    )
-                )
-            ),
-        )
-        docs = loader.load()
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=250, chunk_overlap=20
-        )
-        splits = splitter.split_documents(docs)
-        embeddings = HuggingFaceEmbeddings(model_name=self.em)
-        vectorstore = Chroma.from_documents(
-            documents=splits,
-            embedding=embeddings,
+        embeddings = EmbeddingCache(self.em, self.path / "emb")
+        # hybrid search fuses more candidates of each retriever
+        k = 20 if self.search == "hybrid" else 4
+        sink, dense = self.get_store(embeddings, k)
+        lexical = BM25Index(self.path / self.store / "bm25.sqlite")
+        if lexical.count() == 0 and self.index.urls():
+            # chunks indexed before the lexical index: re-split them all,
+            # their embeddings come from the cache
+            self.reindex(sink)
+        asyncio.run(self.update(SinkGroup(sink, lexical), embeddings))
+
+        retriever: BaseRetriever = dense
+        if self.search == "lexical":
+            retriever = lexical.as_retriever()
+        elif self.search == "hybrid":
+            retriever = HybridRetriever(
+                retrievers=[lexical.as_retriever(k), dense]
+            )
+        # kept for the cache hit counters
+        self.embeddings = embeddings
+        self.retriever = CachedRetriever(
+            retriever=retriever, generation=self.index.generation
         )
-        retriever = vectorstore.as_retriever()
         prompt = hub.pull("rlm/rag-prompt")
         chain = {
-            "context": retriever | KB.format_docs,
+            "context": self.retriever | KB.format_docs,
             "question": RunnablePassthrough(),
         } | prompt
 
         return chain
 
+    def reindex(self, sink: KBSink) -> None:
+        """
+        Index all pages again on the next update.
+
+        The manifest is the only record of the stored chunks: delete them
+        from the store before forgetting them, and the near-duplicate
+        signatures with them, or they stay in the store for good.
+        """
+        stale = self.index.all_chunk_ids()
+        if stale:
+            sink.delete(stale)
+        (self.path / self.store / "minhash.npz").unlink(missing_ok=True)
+        self.index.reset()
+
+    def get_store(
+        self, embeddings: Embeddings, k: int = 4
+    ) -> tuple[KBSink, BaseRetriever]:
+        """Get the vector store sink and its top-k retriever."""
+        if self.store == "numpy":
+            index = VectorIndex(
+                self.path / self.store / "vec", quant=self.quant
+            )
+            return index, index.as_retriever(embeddings, k)
+        vectorstore = Chroma(
+            collection_name="kb",
+            embedding_function=embeddings,
+            persist_directory=str(self.path / self.store / "db"),
+        )
+        return ChromaSink(vectorstore), vectorstore.as_retriever(
+            search_kwargs={"k": k}
+        )
+
+    async def update(self, sink: KBSink, embeddings: Embeddings) -> None:
+        """
+        Update the persistent index incrementally.
+
+        Pages stream through the fetch -> split -> embed -> upsert pipeline,
+        unchanged pages are skipped, only new or changed chunks are embedded
+        and stale chunks are deleted. Pages with near duplicates of a removed
+        chunk go through the pipeline again, so their text is kept.
+        """
+        dedup = (
+            MinHashDedup(
+                self.dedup, path=self.path / self.store / "minhash.npz"
+            )
+            if self.dedup
+            else None
+        )
+        requeue: set[str] = set()
+        # Pages no longer in the url list
+        for url in set(self.index.urls()) - set(self.urls):
+            stale = list(self.index.chunk_ids(url))
+            if stale:
+                sink.delete(stale)
+                if dedup is not None:
+                    requeue |= dedup.remove(stale)
+            self.index.remove_page(url)
+
+        parse: Callable[[Page], Document] = self.parse_page
+        # only changed pages are parsed: the pool decides on their count
+        executor = None
+        if self.parser == "lexbor":
+            parse = LexborParser(tuple(f".{cls}" for cls in self.classes))
+            executor = LexborParser.get_executor()
+        pipe = KBPipe(
+            self.index,
+            RecursiveCharacterTextSplitter(chunk_size=250, chunk_overlap=20),
+            parse,
+            embeddings,
+            sink,
+            dedup=dedup,
+            executor=executor,
+        )
+        urls = self.urls
+        try:
+            for _ in range(self.Requeue_Rounds):
+                self.index.invalidate(sorted(requeue & set(self.urls)))
+                await pipe.run(KBFetcher(self.index), urls)
+                requeue = pipe.requeue
+                urls = sorted(requeue & set(self.urls))
+                if not urls:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if isinstance(embeddings, EmbeddingCache):
+                # once per update, not per embedded batch
+                embeddings.flush()
+            if dedup is not None:
+                dedup.save()
+
+    def parse_page(self, page: Page) -> Document:
+        """Parse a fetched page into a document with bs4."""
+        soup = bs4.BeautifulSoup(
+            page.text or "",
+            "html.parser",
+            parse_only=bs4.SoupStrainer(class_=self.classes),
+        )
+        return Document(
+            page_content=soup.get_text(), metadata={"source": page.url}
+        )
+
     @staticmethod
     def format_docs(docs: list[Document]) -> str:
         """Format docs."""
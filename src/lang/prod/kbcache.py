@@ -0,0 +1,134 @@
+"""
+KnowledgeBase Cache Module.
+
+Version: 2026.10.18.01
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from lang.util.tokens import Tokens
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.pydantic_v1 import Field
+from langchain_core.retrievers import BaseRetriever
+
+
+class LRUCache:
+    """LRUCache Class: thread safe LRU cache with a time to live."""
+
+    def __init__(self, size: int = 1024, ttl: float = 3600.0):
+        """
+        Class initialization.
+
+        :param size: Max entries.
+        :param ttl: Seconds an entry stays valid, 0 for no limit.
+        """
+        self.size = size
+        self.ttl = ttl
+        self.data: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Any | None:
+        """Get a valid entry, None for a miss."""
+        with self.lock:
+            entry = self.data.get(key)
+            if entry is not None and (
+                not self.ttl or time.monotonic() - entry[0] < self.ttl
+            ):
+                self.data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Any, value: Any) -> None:
+        """Put an entry, the least recently used one is evicted."""
+        with self.lock:
+            self.data[key] = (time.monotonic(), value)
+            self.data.move_to_end(key)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self.lock:
+            self.data.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """Cache hit rate."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __str__(self) -> str:
+        """Cache stats."""
+        return (
+            f"{len(self.data)}/{self.size} entries, {self.hits} hits, "
+            f"{self.misses} misses, hit rate {self.hit_rate:.1%}"
+        )
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    CachedRetriever Class.
+
+    Cache the top-k documents of normalised queries in front of a
+    retriever. The cache is cleared when the index generation changes, so
+    answers never come from chunks that were replaced or deleted.
+    """
+
+    retriever: BaseRetriever
+    generation: Callable[[], int]
+    cache: LRUCache = Field(default_factory=lambda: LRUCache(256))
+    seen: int = -1
+
+    @staticmethod
+    def key(query: str) -> str:
+        """Get the cache key: case, spacing and punctuation ignored."""
+        return " ".join(Tokens.words(query))
+
+    def check(self) -> None:
+        """Clear the cache of an old index generation."""
+        generation = self.generation()
+        if generation != self.seen:
+            self.cache.clear()
+            self.seen = generation
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        """Get the top-k documents of a query."""
+        self.check()
+        key = self.key(query)
+        docs = self.cache.get(key)
+        if docs is None:
+            docs = self.retriever.invoke(
+                query, {"callbacks": run_manager.get_child()}
+            )
+            self.cache.put(key, docs)
+        return list(docs)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        """Get the top-k documents of a query asynchronously."""
+        self.check()
+        key = self.key(query)
+        docs = self.cache.get(key)
+        if docs is None:
+            docs = await self.retriever.ainvoke(
+                query, {"callbacks": run_manager.get_child()}
+            )
+            self.cache.put(key, docs)
+        return list(docs)
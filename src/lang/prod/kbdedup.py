@@ -0,0 +1,227 @@
+"""
+KnowledgeBase Deduplication Module.
+
+Version: 2026.10.18.02
+"""
+
+import hashlib
+from pathlib import Path
+
+import numpy as np
+from lang.util.tokens import Tokens
+from langchain_core.documents import Document
+
+
+class MinHashDedup:
+    """
+    MinHashDedup Class.
+
+    Drop near-duplicate chunks: quoted replies, navigation text and
+    signatures. Each chunk gets a MinHash signature of its word shingles;
+    LSH bands find candidate chunks, and a candidate is a duplicate when the
+    estimated Jaccard similarity reaches the threshold.
+
+    A dropped chunk is recorded with the page it came from under the chunk
+    it duplicates: when that kept chunk is removed, its page is returned
+    to be indexed again, or the dropped text would be lost for good.
+    """
+
+    # Mersenne prime 2^31 - 1: a * hash + b fits in uint64
+    Prime: int = (1 << 31) - 1
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 64,
+        shingle: int = 3,
+        path: Path | None = None,
+    ):
+        """
+        Class initialization.
+
+        :param threshold: Jaccard similarity of a near duplicate.
+        :param num_perm: MinHash permutations.
+        :param shingle: Words per shingle.
+        :param path: Signature file to keep them across updates.
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.path = path
+        self.bands, self.rows = self.lsh_params(threshold, num_perm)
+
+        rng = np.random.default_rng(1)
+        self.a = rng.integers(1, self.Prime, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, self.Prime, num_perm, dtype=np.uint64)
+
+        # chunk id -> signature, and LSH band bucket -> chunk ids
+        self.sigs: dict[str, np.ndarray] = {}
+        self.buckets: list[dict[bytes, set[str]]] = [
+            {} for _ in range(self.bands)
+        ]
+        # kept chunk id -> dropped chunk id -> page url of the dropped one
+        self.dups: dict[str, dict[str, str]] = {}
+        self.seen = 0
+        self.dropped = 0
+        self.load()
+
+    @staticmethod
+    def lsh_params(threshold: float, num_perm: int) -> tuple[int, int]:
+        """
+        Get the LSH bands and rows per band.
+
+        The S-curve threshold (1/b)^(1/r) is set close to the Jaccard
+        threshold, slightly below it to favour recall.
+        """
+        best = (num_perm, 1)
+        for rows in range(1, num_perm + 1):
+            bands = num_perm // rows
+            cut = (1 / bands) ** (1 / rows)
+            if cut <= threshold and abs(cut - threshold) < abs(
+                (1 / best[0]) ** (1 / best[1]) - threshold
+            ):
+                best = (bands, rows)
+        return best
+
+    def signature(self, text: str) -> np.ndarray:
+        """Get the MinHash signature of a text."""
+        words = Tokens.words(text)
+        n = self.shingle
+        shingles = {
+            " ".join(words[i : i + n])
+            for i in range(max(1, len(words) - n + 1))
+        }
+        hashes = np.array(
+            [
+                int.from_bytes(
+                    hashlib.blake2b(s.encode(), digest_size=4).digest(),
+                    "little",
+                )
+                for s in shingles
+            ],
+            dtype=np.uint64,
+        )
+        perms = (np.outer(self.a, hashes) + self.b[:, None]) % self.Prime
+        return perms.min(axis=1).astype(np.uint32)
+
+    def band_keys(self, sig: np.ndarray) -> list[bytes]:
+        """Get the LSH bucket key of each band."""
+        r = self.rows
+        return [sig[i * r : (i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add(self, cid: str, sig: np.ndarray) -> None:
+        """Add a chunk signature."""
+        self.sigs[cid] = sig
+        for bucket, key in zip(self.buckets, self.band_keys(sig)):
+            bucket.setdefault(key, set()).add(cid)
+
+    def remove(self, ids: list[str]) -> set[str]:
+        """
+        Remove deleted chunks.
+
+        :return: Page urls of the chunks dropped as their duplicates.
+        """
+        urls: set[str] = set()
+        for cid in ids:
+            urls.update(self.dups.pop(cid, {}).values())
+            sig = self.sigs.pop(cid, None)
+            if sig is None:
+                continue
+            for bucket, key in zip(self.buckets, self.band_keys(sig)):
+                bucket[key].discard(cid)
+                if not bucket[key]:
+                    del bucket[key]
+        return urls
+
+    def duplicate(self, cid: str, text: str, url: str = "") -> str | None:
+        """
+        Check a chunk and add it when it is not a near duplicate.
+
+        :param cid: Chunk id.
+        :param text: Chunk text.
+        :param url: Page of the chunk, recorded when it is dropped.
+        :return: Id of the chunk it duplicates, or None.
+        """
+        self.seen += 1
+        if cid in self.sigs:
+            return None
+        sig = self.signature(text)
+        cands: set[str] = set()
+        for bucket, key in zip(self.buckets, self.band_keys(sig)):
+            cands |= bucket.get(key, set())
+        for cand in cands:
+            if np.mean(self.sigs[cand] == sig) >= self.threshold:
+                self.dropped += 1
+                if url:
+                    self.dups.setdefault(cand, {})[cid] = url
+                return cand
+        self.add(cid, sig)
+        return None
+
+    def filter(self, chunks: list[Document]) -> list[Document]:
+        """Keep the chunks that are not near duplicates."""
+        return [
+            chunk
+            for chunk in chunks
+            if self.duplicate(
+                chunk.metadata["id"],
+                chunk.page_content,
+                chunk.metadata.get("source", ""),
+            )
+            is None
+        ]
+
+    def load(self) -> None:
+        """Load saved signatures."""
+        if self.path is None or not self.path.exists():
+            return
+        data = np.load(self.path)
+        if data["sigs"].shape[1:] != (self.num_perm,):
+            return
+        for cid, sig in zip(data["ids"], data["sigs"]):
+            self.add(str(cid), sig)
+        # files saved before the duplicates were recorded have none
+        if "dup_ids" in data.files:
+            for kept, cid, url in zip(
+                data["dup_kept"], data["dup_ids"], data["dup_urls"]
+            ):
+                self.dups.setdefault(str(kept), {})[str(cid)] = str(url)
+
+    def save(self) -> None:
+        """Save signatures."""
+        if self.path is None:
+            return
+        ids = np.array(list(self.sigs), dtype=str)
+        sigs = (
+            np.stack(list(self.sigs.values()))
+            if self.sigs
+            else np.zeros((0, self.num_perm), dtype=np.uint32)
+        )
+        dups = [
+            (kept, cid, url)
+            for kept, dropped in self.dups.items()
+            for cid, url in dropped.items()
+        ]
+        kept, dup_ids, dup_urls = (
+            (np.array(col, dtype=str) for col in zip(*dups))
+            if dups
+            else (np.zeros(0, dtype=str) for _ in range(3))
+        )
+        with open(self.path, "wb") as f:
+            np.savez(
+                f,
+                ids=ids,
+                sigs=sigs,
+                dup_kept=kept,
+                dup_ids=dup_ids,
+                dup_urls=dup_urls,
+            )
+
+    def __str__(self) -> str:
+        """Deduplication stats."""
+        rate = self.dropped / self.seen if self.seen else 0.0
+        return (
+            f"  dedup: {self.dropped} of {self.seen} chunks dropped "
+            f"({rate:.1%}), threshold {self.threshold}, "
+            f"{self.bands}x{self.rows} bands"
+        )
@@ -0,0 +1,201 @@
+"""
+KnowledgeBase Embedding Cache Module.
+
+Version: 2026.10.18.03
+"""
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+from lang.prod.kbcache import LRUCache
+from langchain_core.embeddings import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+
+
+class EmbeddingCache(Embeddings):
+    """
+    EmbeddingCache Class.
+
+    Map (embedding model, normalised chunk text hash) to a vector. Vectors
+    live in a memory-mapped float32 matrix with one row per slot, and a
+    compact memory-mapped index keeps the 16-byte key and last use tick of
+    each slot: a batch only writes its own rows, and flush syncs the
+    changed pages. When the matrix reaches its size limit, the least
+    recently used slots are evicted.
+
+    The model runs outside the lock, so threads embed batches at once.
+    """
+
+    Key_Type = np.dtype([("key", "S16"), ("tick", "<i8")])
+
+    def __init__(
+        self,
+        model: str,
+        path: Path,
+        max_mb: int = 512,
+        embeddings: Embeddings | None = None,
+    ):
+        """
+        Class initialization.
+
+        :param model: Embedding model name.
+        :param path: Cache root folder, one sub folder per model.
+        :param max_mb: Max size of the vector matrix in MB.
+        :param embeddings: Embedding model, loaded on the first miss if None.
+        """
+        self.model = model
+        self.path = path / re.sub(r"[^\w.-]+", "_", model)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.base = embeddings
+        self.lock = threading.Lock()
+
+        self.dim = 0
+        self.tick = 0
+        self.slots: dict[bytes, int] = {}
+        self.index: np.ndarray = np.zeros(0, dtype=self.Key_Type)
+        self.vectors: np.memmap | None = None
+        self.hits = 0
+        self.misses = 0
+        # query embeddings
+        self.queries = LRUCache(1024)
+        self.load()
+
+    def load(self) -> None:
+        """Load the cache files if they exist."""
+        meta = self.path / "meta.json"
+        if not meta.exists():
+            return
+        with open(meta) as f:
+            info = json.load(f)
+        if info["model"] != self.model:
+            return
+        self.dim = info["dim"]
+        self.index = np.load(self.path / "index.npy", mmap_mode="r+")
+        self.vectors = np.memmap(
+            self.path / "vectors.f32",
+            dtype=np.float32,
+            mode="r+",
+            shape=(len(self.index), self.dim),
+        )
+        self.tick = int(self.index["tick"].max(initial=0))
+        self.slots = {
+            bytes(key): slot
+            for slot, key in enumerate(self.index["key"])
+            if key
+        }
+
+    def create(self, dim: int) -> None:
+        """Create the cache files for a vector dimension."""
+        self.dim = dim
+        capacity = max(1, self.max_bytes // (dim * 4))
+        self.index = np.lib.format.open_memmap(
+            self.path / "index.npy",
+            mode="w+",
+            dtype=self.Key_Type,
+            shape=(capacity,),
+        )
+        self.vectors = np.memmap(
+            self.path / "vectors.f32",
+            dtype=np.float32,
+            mode="w+",
+            shape=(capacity, dim),
+        )
+        with open(self.path / "meta.json", "w") as f:
+            json.dump({"model": self.model, "dim": dim}, f)
+
+    def flush(self) -> None:
+        """Write the changed vectors and index rows to disk."""
+        with self.lock:
+            if self.vectors is not None:
+                self.vectors.flush()
+                self.index.flush()  # type: ignore[attr-defined]
+
+    def key(self, text: str) -> bytes:
+        """Get the cache key of a text."""
+        norm = unicodedata.normalize("NFC", " ".join(text.split()))
+        return hashlib.blake2b(
+            f"{self.model}\x00{norm}".encode(), digest_size=16
+        ).digest()
+
+    def get_base(self) -> Embeddings:
+        """Get the embedding model."""
+        if self.base is None:
+            self.base = HuggingFaceEmbeddings(model_name=self.model)
+        return self.base
+
+    def free_slots(self, count: int) -> list[int]:
+        """Get free slots, evicting least recently used ones if needed."""
+        free = np.flatnonzero(self.index["key"] == b"")
+        if len(free) < count:
+            # evict at least 1/8 of the cache to amortise eviction cost
+            need = max(count - len(free), len(self.index) // 8)
+            used = np.flatnonzero(self.index["key"] != b"")
+            need = min(need, len(used))
+            old = used[np.argpartition(self.index["tick"][used], need - 1)]
+            for slot in old[:need]:
+                del self.slots[bytes(self.index["key"][slot])]
+            self.index[old[:need]] = (b"", 0)
+            free = np.flatnonzero(self.index["key"] == b"")
+        return free[:count].tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents, only the cache misses hit the model."""
+        keys = [self.key(text) for text in texts]
+        with self.lock:
+            self.tick += 1
+            found: dict[bytes, list[float]] = {}
+            miss: dict[bytes, str] = {}
+            for key, text in zip(keys, texts):
+                if key in found or key in miss:
+                    continue
+                slot = self.slots.get(key)
+                if slot is None:
+                    miss[key] = text
+                else:
+                    self.index["tick"][slot] = self.tick
+                    found[key] = self.vectors[slot].tolist()  # type: ignore
+            self.hits += len(texts) - len(miss)
+            self.misses += len(miss)
+        if not miss:
+            return [found[key] for key in keys]
+
+        vectors = self.get_base().embed_documents(list(miss.values()))
+        found.update(zip(miss, vectors))
+        with self.lock:
+            if self.vectors is None:
+                self.create(len(vectors[0]))
+            # cached by another thread meanwhile
+            new = [
+                (key, vector)
+                for key, vector in zip(miss, vectors)
+                if key not in self.slots
+            ]
+            # a batch larger than the whole cache is not cached
+            if len(new) <= len(self.index):
+                slots = self.free_slots(len(new))
+                for slot, (key, vector) in zip(slots, new):
+                    self.vectors[slot] = vector  # type: ignore[index]
+                    self.index[slot] = (key, self.tick)
+                    self.slots[key] = slot
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query, recent queries are cached in memory."""
+        key = self.key(text)
+        vector = self.queries.get(key)
+        if vector is None:
+            vector = self.get_base().embed_query(text)
+            self.queries.put(key, vector)
+        return vector
+
+    @property
+    def hit_rate(self) -> float:
+        """Cache hit rate of embedded documents."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,158 @@
+"""
+KnowledgeBase Fetch Module.
+
+Version: 2026.10.18.02
+"""
+
+import asyncio
+import logging
+import os
+from urllib.parse import urlsplit
+
+import httpx
+from lang.prod.kbindex import KBIndex
+
+
+class Page:
+    """Fetched Page Class."""
+
+    def __init__(
+        self,
+        url: str,
+        status: int,
+        text: str | None = None,
+        etag: str | None = None,
+        modified: str | None = None,
+    ):
+        """
+        Class initialization.
+
+        :param url: Page url.
+        :param status: HTTP status code, 0 for a failed request.
+        :param text: Page body, None when not modified or failed.
+        :param etag: HTTP ETag response header.
+        :param modified: HTTP Last-Modified response header.
+        """
+        self.url = url
+        self.status = status
+        self.text = text
+        self.etag = etag
+        self.modified = modified
+
+    @property
+    def changed(self) -> bool:
+        """Page has a new body to index."""
+        return self.text is not None
+
+    @property
+    def failed(self) -> bool:
+        """Page request failed, the indexed copy is kept."""
+        return self.status == 0 or self.status >= httpx.codes.BAD_REQUEST
+
+
+class KBFetcher:
+    """
+    KBFetcher Class.
+
+    Fetch pages concurrently with one pooled httpx.AsyncClient and revalidate
+    them with the ETag/Last-Modified saved in KBIndex, so unchanged pages
+    cost a 304 response only.
+    """
+
+    def __init__(
+        self,
+        index: KBIndex,
+        concurrency: int = 32,
+        per_host: int = 6,
+        timeout: float = 20.0,
+    ):
+        """Class initialization."""
+        self.index = index
+        # max requests in flight
+        self.concurrency = concurrency
+        # max requests in flight to one host: its pooled connections
+        self.per_host = per_host
+        self.timeout = timeout
+        self.headers = {"User-Agent": os.environ.get("USER_AGENT", "lang")}
+        self.hosts: dict[str, asyncio.Semaphore] = {}
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Get a pooled async client."""
+        return httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency,
+            ),
+        )
+
+    def host_sem(self, url: str) -> asyncio.Semaphore:
+        """Get the semaphore of an url host."""
+        host = urlsplit(url).netloc
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(self.per_host)
+        return self.hosts[host]
+
+    async def fetch(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        sem: asyncio.Semaphore,
+    ) -> Page:
+        """Fetch one page with a conditional GET."""
+        headers = {}
+        if self.index.page_hash(url) is not None:
+            etag, modified = self.index.validators(url)
+            if etag:
+                headers["If-None-Match"] = etag
+            if modified:
+                headers["If-Modified-Since"] = modified
+
+        async with sem, self.host_sem(url):
+            try:
+                response = await client.get(url, headers=headers)
+            except httpx.HTTPError as he:
+                logging.error(f"{url}: {he!r}")
+                return Page(url, 0)
+
+        etag = response.headers.get("ETag")
+        modified = response.headers.get("Last-Modified")
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            return Page(url, response.status_code, None, etag, modified)
+        if response.is_error:
+            logging.error(f"{url}: HTTP {response.status_code}")
+            return Page(url, response.status_code)
+        return Page(url, response.status_code, response.text, etag, modified)
+
+    async def fetch_all(self, urls: list[str]) -> list[Page]:
+        """Fetch all pages concurrently."""
+        sem = asyncio.Semaphore(self.concurrency)
+        self.hosts = {}
+        async with self.get_client() as client:
+            return await asyncio.gather(
+                *(self.fetch(client, url, sem) for url in urls)
+            )
+
+    async def fetch_into(self, urls: list[str], queue: asyncio.Queue) -> None:
+        """
+        Fetch pages into a bounded queue.
+
+        Only changed pages are queued. A full queue blocks the workers, so
+        at most concurrency + queue size bodies are held in memory.
+        """
+        todo = iter(urls)
+        sem = asyncio.Semaphore(self.concurrency)
+        self.hosts = {}
+
+        async def worker(client: httpx.AsyncClient) -> None:
+            for url in todo:
+                page = await self.fetch(client, url, sem)
+                if page.changed:
+                    await queue.put(page)
+
+        async with self.get_client() as client:
+            await asyncio.gather(
+                *(worker(client) for _ in range(self.concurrency))
+            )
@@ -0,0 +1,166 @@
+"""
+KnowledgeBase HTML Module.
+
+Version: 2026.10.18.02
+"""
+
+import multiprocessing
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any
+
+from lang.prod.kbfetch import Page
+from langchain_core.documents import Document
+from selectolax.lexbor import LexborHTMLParser as HTMLParser
+
+
+class LexborParser:
+    """
+    LexborParser Class.
+
+    Extract page text with the selectolax Lexbor parser and CSS selectors.
+    It is picklable, so large batches can run it in a process pool.
+    """
+
+    # Changed pages per update worth the process pool start up cost
+    Pool_Threshold: int = 64
+
+    def __init__(self, selectors: tuple[str, ...] = (".post-content",)):
+        """
+        Class initialization.
+
+        :param selectors: CSS selectors of the content to keep.
+        """
+        self.selectors = selectors
+
+    def extract(self, html: str) -> str:
+        """Extract the text of the selected nodes in document order."""
+        tree = HTMLParser(html)
+        nodes = tree.css(", ".join(self.selectors))
+        return "".join(node.text(deep=True) for node in nodes)
+
+    def __call__(self, page: Page) -> Document:
+        """Parse a fetched page into a document."""
+        return Document(
+            page_content=self.extract(page.text or ""),
+            metadata={"source": page.url},
+        )
+
+    @staticmethod
+    def get_executor() -> "ParsePool":
+        """Get the parser executor of an update."""
+        return ParsePool(LexborParser.Pool_Threshold)
+
+
+class ParsePool(Executor):
+    """
+    ParsePool Class.
+
+    Parse the first pages in threads and the pages after a threshold in a
+    process pool. Only changed pages are parsed, so the process workers
+    are only started when the changes of an update are many. They come
+    from a forkserver, or spawn where there is none: forking a process
+    that runs an event loop and other threads is not safe.
+    """
+
+    def __init__(self, threshold: int, workers: int | None = None):
+        """
+        Class initialization.
+
+        :param threshold: Pages parsed in threads before the process pool.
+        :param workers: Process pool size, the cpu count by default.
+        """
+        self.threshold = threshold
+        self.workers = workers or os.cpu_count()
+        self.submitted = 0
+        self.lock = threading.Lock()
+        self.threads = ThreadPoolExecutor()
+        self.processes: ProcessPoolExecutor | None = None
+
+    @staticmethod
+    def start_method() -> str:
+        """Get the process start method."""
+        methods = multiprocessing.get_all_start_methods()
+        return "forkserver" if "forkserver" in methods else "spawn"
+
+    def submit(
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> Future:
+        """Run a call in threads or in the process pool."""
+        with self.lock:
+            self.submitted += 1
+            if self.processes is None and self.submitted > self.threshold:
+                self.processes = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method()),
+                )
+            pool: Executor = self.processes or self.threads
+        return pool.submit(fn, *args, **kwargs)
+
+    def shutdown(
+        self, wait: bool = True, *, cancel_futures: bool = False
+    ) -> None:
+        """Shut down the threads and the process pool."""
+        self.threads.shutdown(wait, cancel_futures=cancel_futures)
+        if self.processes is not None:
+            self.processes.shutdown(wait, cancel_futures=cancel_futures)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from pathlib import Path
+
+    import bs4
+
+    # python kbhtml.py [html files]: compare the bs4 and Lexbor parsers
+    if sys.argv[1:]:
+        htmls = [Path(name).read_text() for name in sys.argv[1:]]
+    else:
+        post = "<p>Forum reply text with <a href='#'>a link</a>.</p>" * 40
+        nav = "<ul>" + "<li><a href='#'>Menu item</a></li>" * 200 + "</ul>"
+        htmls = [
+            f"<html><body>{nav}<div class='post-content'>{post}</div>"
+            f"<script>var x = 1;</script>{nav}</body></html>"
+        ] * 500
+    pages = [Page(f"page{i}", 200, html) for i, html in enumerate(htmls)]
+
+    def bs4_parse(page: Page) -> str:
+        """Parse with the bs4 SoupStrainer path."""
+        soup = bs4.BeautifulSoup(
+            page.text or "",
+            "html.parser",
+            parse_only=bs4.SoupStrainer(class_=("post-content",)),
+        )
+        return soup.get_text()
+
+    lexbor = LexborParser()
+    start = time.perf_counter()
+    texts = [bs4_parse(page) for page in pages]
+    bs4_time = time.perf_counter() - start
+    start = time.perf_counter()
+    docs = [lexbor(page) for page in pages]
+    lexbor_time = time.perf_counter() - start
+    start = time.perf_counter()
+    with ParsePool(0) as pool:
+        pool_docs = list(pool.map(lexbor, pages, chunksize=16))
+    pool_time = time.perf_counter() - start
+
+    same = sum(
+        " ".join(text.split()) == " ".join(doc.page_content.split())
+        for text, doc in zip(texts, docs)
+    )
+    print(f"{len(pages)} pages, {same} with the same text")
+    for name, took in (
+        ("bs4", bs4_time),
+        ("lexbor", lexbor_time),
+        ("lexbor pool", pool_time),
+    ):
+        print(f"{name:>12}: {took:.2f}s, {len(pages) / took:.0f} pages/s")
@@ -0,0 +1,187 @@
+"""
+KnowledgeBase Index Module.
+
+Version: 2026.10.18.06
+"""
+
+import hashlib
+import sqlite3
+import time
+from pathlib import Path
+
+
+class KBIndex:
+    """
+    KBIndex Class.
+
+    A small SQLite manifest stored next to the vector store. It records the
+    content hash of every source page and the ids of the chunks it produced,
+    so an update only embeds what has actually changed.
+    """
+
+    Schema: str = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            hash TEXT NOT NULL,
+            updated REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS chunks (
+            id TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            hash TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS chunks_url ON chunks (url);
+        CREATE TABLE IF NOT EXISTS http (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            modified TEXT
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+    """
+
+    def __init__(self, path: Path):
+        """Class initialization."""
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        # retrievers read the generation from worker threads
+        self.conn = sqlite3.connect(
+            self.path / "index.sqlite", check_same_thread=False
+        )
+        self.conn.executescript(self.Schema)
+        self.conn.commit()
+
+    @staticmethod
+    def text_hash(text: str) -> str:
+        """Get the content hash of a text."""
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def chunk_id(url: str, text: str) -> str:
+        """Get the chunk id: stable for the same text in the same page."""
+        return KBIndex.text_hash(f"{url}\x00{text}")
+
+    def generation(self) -> int:
+        """Get the index generation, it changes whenever chunks change."""
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = 'generation'"
+        ).fetchone()
+        return row[0]
+
+    def bump(self) -> None:
+        """Start a new index generation, called in a transaction."""
+        self.conn.execute(
+            "UPDATE meta SET value = value + 1 WHERE key = 'generation'"
+        )
+
+    def urls(self) -> list[str]:
+        """Get all indexed page urls."""
+        rows = self.conn.execute("SELECT url FROM pages")
+        return [row[0] for row in rows]
+
+    def page_hash(self, url: str) -> str | None:
+        """Get the content hash of an indexed page."""
+        row = self.conn.execute(
+            "SELECT hash FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def chunk_ids(self, url: str) -> set[str]:
+        """Get the chunk ids of an indexed page."""
+        rows = self.conn.execute("SELECT id FROM chunks WHERE url = ?", (url,))
+        return {row[0] for row in rows}
+
+    def all_chunk_ids(self) -> list[str]:
+        """Get the chunk ids of all indexed pages."""
+        return [row[0] for row in self.conn.execute("SELECT id FROM chunks")]
+
+    def validators(self, url: str) -> tuple[str | None, str | None]:
+        """Get the HTTP ETag and Last-Modified of an indexed page."""
+        row = self.conn.execute(
+            "SELECT etag, modified FROM http WHERE url = ?", (url,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, None)
+
+    def set_validators(
+        self, url: str, etag: str | None, modified: str | None
+    ) -> None:
+        """Set the HTTP ETag and Last-Modified of a page."""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO http (url, etag, modified) "
+                "VALUES (?, ?, ?)",
+                (url, etag, modified),
+            )
+
+    def commit_page(
+        self,
+        url: str,
+        phash: str,
+        ids: dict[str, str],
+        etag: str | None = None,
+        modified: str | None = None,
+    ) -> None:
+        """
+        Record a page and its chunks after they are stored.
+
+        The HTTP validators are only saved here, so a page is never marked
+        as revalidated before its chunks are in the vector store.
+
+        :param url: Page url.
+        :param phash: Page content hash.
+        :param ids: Chunk id to chunk content hash.
+        :param etag: HTTP ETag of the page.
+        :param modified: HTTP Last-Modified of the page.
+        """
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO http (url, etag, modified) "
+                "VALUES (?, ?, ?)",
+                (url, etag, modified),
+            )
+            self.conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, url, hash) "
+                "VALUES (?, ?, ?)",
+                [(cid, url, chash) for cid, chash in ids.items()],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, hash, updated) "
+                "VALUES (?, ?, ?)",
+                (url, phash, time.time()),
+            )
+            self.bump()
+
+    def invalidate(self, urls: list[str]) -> None:
+        """Mark pages as changed: the next update fetches and splits them."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE pages SET hash = '' WHERE url = ?",
+                [(url,) for url in urls],
+            )
+            self.conn.executemany(
+                "DELETE FROM http WHERE url = ?", [(url,) for url in urls]
+            )
+
+    def remove_page(self, url: str) -> None:
+        """Remove a page and its chunks from the index."""
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE url = ?", (url,))
+            self.conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.conn.execute("DELETE FROM http WHERE url = ?", (url,))
+            self.bump()
+
+    def reset(self) -> None:
+        """Forget all pages, the next update indexes them again."""
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM pages")
+            self.conn.execute("DELETE FROM http")
+            self.bump()
+
+    def close(self) -> None:
+        """Close the index database."""
+        self.conn.close()
@@ -0,0 +1,252 @@
+"""
+KnowledgeBase Lexical Search Module.
+
+Version: 2026.10.18.01
+"""
+
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from lang.util.tokens import Tokens
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class BM25Index:
+    """
+    BM25Index Class.
+
+    Inverted index in SQLite, updated in the same ingestion pass as the
+    vector store: it is a pipeline sink that ignores the vectors. Postings
+    are clustered by term and carry the document length, so a query reads
+    only the posting lists of its terms and needs no embedding model.
+    """
+
+    Schema: str = """
+        CREATE TABLE IF NOT EXISTS docs (
+            row INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            text TEXT NOT NULL,
+            meta TEXT NOT NULL,
+            len INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS terms (
+            tid INTEGER PRIMARY KEY,
+            term TEXT NOT NULL UNIQUE,
+            df INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS postings (
+            tid INTEGER NOT NULL,
+            row INTEGER NOT NULL,
+            tf INTEGER NOT NULL,
+            len INTEGER NOT NULL,
+            PRIMARY KEY (tid, row)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS postings_row ON postings (row);
+    """
+
+    def __init__(self, path: Path, k1: float = 1.5, b: float = 0.75):
+        """
+        Class initialization.
+
+        :param path: Index database file.
+        :param k1: BM25 term frequency saturation.
+        :param b: BM25 document length normalisation.
+        """
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.Schema)
+        self.conn.commit()
+
+    def count(self) -> int:
+        """Get the document count."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def upsert(
+        self,
+        ids: list[str],
+        docs: list[Document],
+        vectors: list[list[float]],
+    ) -> None:
+        """Insert or replace chunks, the vectors are not used."""
+        with self.lock, self.conn:
+            self.remove(ids)
+            for cid, doc in zip(ids, docs):
+                words = Counter(Tokens.words(doc.page_content))
+                size = sum(words.values())
+                row = self.conn.execute(
+                    "INSERT INTO docs (id, text, meta, len) "
+                    "VALUES (?, ?, ?, ?)",
+                    (cid, doc.page_content, json.dumps(doc.metadata), size),
+                ).lastrowid
+                self.conn.executemany(
+                    "INSERT INTO terms (term, df) VALUES (?, 1) "
+                    "ON CONFLICT (term) DO UPDATE SET df = df + 1",
+                    [(term,) for term in words],
+                )
+                self.conn.executemany(
+                    "INSERT INTO postings (tid, row, tf, len) "
+                    "SELECT tid, ?, ?, ? FROM terms WHERE term = ?",
+                    [(row, tf, size, term) for term, tf in words.items()],
+                )
+
+    def delete(self, ids: list[str]) -> None:
+        """Delete chunks."""
+        with self.lock, self.conn:
+            self.remove(ids)
+
+    def remove(self, ids: list[str]) -> None:
+        """Remove chunks, called in a transaction."""
+        for cid in ids:
+            found = self.conn.execute(
+                "SELECT row FROM docs WHERE id = ?", (cid,)
+            ).fetchone()
+            if found is None:
+                continue
+            row = found[0]
+            self.conn.execute(
+                "UPDATE terms SET df = df - 1 WHERE tid IN "
+                "(SELECT tid FROM postings WHERE row = ?)",
+                (row,),
+            )
+            self.conn.execute("DELETE FROM postings WHERE row = ?", (row,))
+            self.conn.execute("DELETE FROM docs WHERE row = ?", (row,))
+
+    def search(self, query: str, k: int = 4) -> list[tuple[int, float]]:
+        """
+        BM25 top-k search.
+
+        :return: (row, score) pairs, best first.
+        """
+        words = Counter(Tokens.words(query))
+        with self.lock:
+            total, length = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(len), 0) FROM docs"
+            ).fetchone()
+            if not total or not words:
+                return []
+            avgdl = length / total
+            rows: list[np.ndarray] = []
+            scores: list[np.ndarray] = []
+            for term, qtf in words.items():
+                found = self.conn.execute(
+                    "SELECT tid, df FROM terms WHERE term = ?", (term,)
+                ).fetchone()
+                if found is None or found[1] == 0:
+                    continue
+                tid, df = found
+                post = np.array(
+                    self.conn.execute(
+                        "SELECT row, tf, len FROM postings WHERE tid = ?",
+                        (tid,),
+                    ).fetchall(),
+                    dtype=np.float64,
+                ).reshape(-1, 3)
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                tf, dl = post[:, 1], post[:, 2]
+                norm = self.k1 * (1 - self.b + self.b * dl / avgdl)
+                rows.append(post[:, 0].astype(np.int64))
+                scores.append(qtf * idf * tf * (self.k1 + 1) / (tf + norm))
+        if not rows:
+            return []
+        # sum the term scores of each row
+        hits, inverse = np.unique(np.concatenate(rows), return_inverse=True)
+        sums = np.bincount(inverse, weights=np.concatenate(scores))
+        top = np.argsort(-sums)[:k]
+        return [(int(hits[i]), float(sums[i])) for i in top]
+
+    def doc(self, row: int) -> Document:
+        """Get the document of a row."""
+        with self.lock:
+            text, meta = self.conn.execute(
+                "SELECT text, meta FROM docs WHERE row = ?", (row,)
+            ).fetchone()
+        return Document(page_content=text, metadata=json.loads(meta))
+
+    def as_retriever(self, k: int = 4) -> "BM25Retriever":
+        """Get a retriever of the index."""
+        return BM25Retriever(index=self, k=k)
+
+
+class BM25Retriever(BaseRetriever):
+    """BM25Retriever Class: retriever of a BM25Index."""
+
+    index: BM25Index
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        """Get the top-k documents of a query."""
+        return [
+            self.index.doc(row) for row, _ in self.index.search(query, self.k)
+        ]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    HybridRetriever Class.
+
+    Run lexical and dense retrievers concurrently and fuse their rankings
+    with reciprocal rank fusion: score = sum(1 / (rrf_k + rank)).
+    """
+
+    retrievers: list[BaseRetriever]
+    k: int = 4
+    rrf_k: int = 60
+
+    def fuse(self, results: list[list[Document]]) -> list[Document]:
+        """Fuse ranked document lists."""
+        scores: dict[str, float] = {}
+        docs: dict[str, Document] = {}
+        for ranked in results:
+            for rank, doc in enumerate(ranked, 1):
+                key = doc.metadata.get("id", doc.page_content)
+                scores[key] = scores.get(key, 0.0) + 1 / (self.rrf_k + rank)
+                docs.setdefault(key, doc)
+        best = sorted(scores, key=scores.__getitem__, reverse=True)
+        return [docs[key] for key in best[: self.k]]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        """Get the fused top-k documents of a query."""
+        with ThreadPoolExecutor(len(self.retrievers)) as pool:
+            results = list(
+                pool.map(
+                    lambda r: r.invoke(
+                        query, {"callbacks": run_manager.get_child()}
+                    ),
+                    self.retrievers,
+                )
+            )
+        return self.fuse(results)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        """Get the fused top-k documents of a query asynchronously."""
+        results = await asyncio.gather(
+            *(
+                r.ainvoke(query, {"callbacks": run_manager.get_child()})
+                for r in self.retrievers
+            )
+        )
+        return self.fuse(list(results))
@@ -0,0 +1,366 @@
+"""
+KnowledgeBase Pipeline Module.
+
+Version: 2026.10.18.05
+"""
+
+import asyncio
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor
+from typing import Protocol
+
+from lang.prod.kbdedup import MinHashDedup
+from lang.prod.kbfetch import KBFetcher, Page
+from lang.prod.kbindex import KBIndex
+from langchain.text_splitter import TextSplitter
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+
+class KBSink(Protocol):
+    """Vector store interface of the pipeline."""
+
+    def upsert(
+        self,
+        ids: list[str],
+        docs: list[Document],
+        vectors: list[list[float]],
+    ) -> None:
+        """Insert or replace chunks with their embeddings."""
+        ...
+
+    def delete(self, ids: list[str]) -> None:
+        """Delete chunks."""
+        ...
+
+
+class ChromaSink:
+    """Chroma Sink Class: store precomputed embeddings in Chroma."""
+
+    def __init__(self, store: Chroma):
+        """Class initialization."""
+        self.store = store
+
+    def upsert(
+        self,
+        ids: list[str],
+        docs: list[Document],
+        vectors: list[list[float]],
+    ) -> None:
+        """Insert or replace chunks with their embeddings."""
+        self.store._collection.upsert(
+            ids=ids,
+            embeddings=vectors,  # type: ignore[arg-type]
+            documents=[doc.page_content for doc in docs],
+            metadatas=[doc.metadata for doc in docs],
+        )
+
+    def delete(self, ids: list[str]) -> None:
+        """Delete chunks."""
+        self.store.delete(ids=ids)
+
+
+class SinkGroup:
+    """Sink Group Class: write the same chunks to several sinks."""
+
+    def __init__(self, *sinks: KBSink):
+        """Class initialization."""
+        self.sinks = sinks
+
+    def upsert(
+        self,
+        ids: list[str],
+        docs: list[Document],
+        vectors: list[list[float]],
+    ) -> None:
+        """Insert or replace chunks with their embeddings."""
+        for sink in self.sinks:
+            sink.upsert(ids, docs, vectors)
+
+    def delete(self, ids: list[str]) -> None:
+        """Delete chunks."""
+        for sink in self.sinks:
+            sink.delete(ids)
+
+
+class PageDone:
+    """Page marker: all new chunks of the page are ahead in the queue."""
+
+    def __init__(self, page: Page, phash: str, ids: dict[str, str]):
+        """
+        Class initialization.
+
+        :param page: Fetched page.
+        :param phash: Page content hash.
+        :param ids: Chunk id to chunk content hash of the whole page.
+        """
+        self.page = page
+        self.phash = phash
+        self.ids = ids
+        # chunk ids of the old page version to delete
+        self.stale: list[str] = []
+
+
+class Stage:
+    """Pipeline Stage Stats Class."""
+
+    def __init__(self, name: str, unit: str):
+        """Class initialization."""
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        # seconds spent working, waiting on queues excluded
+        self.busy = 0.0
+
+    def add(self, items: int, start: float) -> None:
+        """Add the items of one step started at start."""
+        self.items += items
+        self.busy += time.perf_counter() - start
+
+    def __str__(self) -> str:
+        """Stage throughput."""
+        rate = self.items / self.busy if self.busy else 0.0
+        return (
+            f"{self.name:>7}: {self.items} {self.unit} "
+            f"in {self.busy:.1f}s busy, {rate:.1f} {self.unit}/s"
+        )
+
+
+class KBPipe:
+    """
+    KBPipe Class.
+
+    Streaming fetch -> split -> embed -> upsert pipeline. The stages are
+    connected by bounded queues, so a fast stage waits for a slow one and
+    peak memory depends on the queue depth and batch size, not on the
+    number of urls.
+    """
+
+    def __init__(
+        self,
+        index: KBIndex,
+        splitter: TextSplitter,
+        parse: Callable[[Page], Document],
+        embeddings: Embeddings,
+        sink: KBSink,
+        batch: int = 64,
+        depth: int = 4,
+        dedup: MinHashDedup | None = None,
+        executor: Executor | None = None,
+        workers: int = 4,
+    ):
+        """
+        Class initialization.
+
+        :param index: KnowledgeBase index manifest.
+        :param splitter: Document text splitter.
+        :param parse: Page to document parser.
+        :param embeddings: Embedding model.
+        :param sink: Vector store.
+        :param batch: Chunks per embedding micro-batch.
+        :param depth: Queue depth between stages, in pages or batches.
+        :param dedup: Near-duplicate chunk filter before embedding.
+        :param executor: Page parser executor, None for the thread pool.
+        :param workers: Pages parsed concurrently.
+        """
+        self.index = index
+        self.splitter = splitter
+        self.parse = parse
+        self.embeddings = embeddings
+        self.sink = sink
+        self.batch = batch
+        self.depth = depth
+        self.dedup = dedup
+        self.executor = executor
+        self.workers = workers
+        self.stages: list[Stage] = []
+        # pages whose dropped duplicates lost the chunk they duplicate
+        self.requeue: set[str] = set()
+
+    async def run(self, fetcher: KBFetcher, urls: list[str]) -> None:
+        """Run the pipeline over the urls."""
+        self.requeue = set()
+        fetch = Stage("fetch", "pages")
+        parse = Stage("parse", "pages")
+        split = Stage("split", "chunks")
+        embed = Stage("embed", "chunks")
+        upsert = Stage("upsert", "chunks")
+        self.stages = [fetch, parse, split, embed, upsert]
+
+        pages: asyncio.Queue[Page | None] = asyncio.Queue(self.depth)
+        docs: asyncio.Queue[tuple[Page, Document] | None] = asyncio.Queue(
+            self.depth
+        )
+        chunks: asyncio.Queue[Document | PageDone | None] = asyncio.Queue(
+            self.batch * self.depth
+        )
+        batches: asyncio.Queue[
+            tuple[list[Document], list[list[float]], list[PageDone]] | None
+        ] = asyncio.Queue(self.depth)
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            self.fetch_stage(fetcher, urls, pages, fetch),
+            self.parse_stage(pages, docs, parse),
+            self.split_stage(docs, chunks, split),
+            self.embed_stage(chunks, batches, embed),
+            self.upsert_stage(batches, upsert),
+        )
+        print(f"KBPipe took {time.perf_counter() - start:.1f}s:")
+        for stage in self.stages:
+            print(stage)
+        if self.dedup is not None:
+            print(self.dedup)
+
+    async def fetch_stage(
+        self,
+        fetcher: KBFetcher,
+        urls: list[str],
+        pages: asyncio.Queue,
+        stats: Stage,
+    ) -> None:
+        """Fetch pages: only changed pages go downstream."""
+        start = time.perf_counter()
+        await fetcher.fetch_into(urls, pages)
+        # page fetching overlaps, so wall time is the busy time
+        stats.add(len(urls), start)
+        await pages.put(None)
+
+    async def parse_stage(
+        self,
+        pages: asyncio.Queue,
+        docs: asyncio.Queue,
+        stats: Stage,
+    ) -> None:
+        """Parse pages concurrently in the executor."""
+        loop = asyncio.get_running_loop()
+
+        async def worker() -> None:
+            while (page := await pages.get()) is not None:
+                start = time.perf_counter()
+                doc = await loop.run_in_executor(
+                    self.executor, self.parse, page
+                )
+                stats.add(1, start)
+                await docs.put((page, doc))
+            # let the other workers see the end too
+            await pages.put(None)
+
+        await asyncio.gather(*(worker() for _ in range(self.workers)))
+        await docs.put(None)
+
+    async def split_stage(
+        self,
+        docs: asyncio.Queue,
+        chunks: asyncio.Queue,
+        stats: Stage,
+    ) -> None:
+        """Split changed pages into new chunks."""
+        while (item := await docs.get()) is not None:
+            page, doc = item
+            start = time.perf_counter()
+            url = page.url
+            phash = KBIndex.text_hash(doc.page_content)
+            if self.index.page_hash(url) == phash:
+                self.index.set_validators(url, page.etag, page.modified)
+                stats.add(0, start)
+                continue
+
+            splits = await asyncio.to_thread(
+                self.splitter.split_documents, [doc]
+            )
+            # chunk id -> chunk document, identical chunks stored once
+            parts: dict[str, Document] = {}
+            for split in splits:
+                cid = KBIndex.chunk_id(url, split.page_content)
+                if cid not in parts:
+                    split.metadata["id"] = cid
+                    parts[cid] = split
+
+            done = PageDone(
+                page,
+                phash,
+                {
+                    cid: KBIndex.text_hash(chunk.page_content)
+                    for cid, chunk in parts.items()
+                },
+            )
+            old = self.index.chunk_ids(url)
+            done.stale = [cid for cid in old if cid not in parts]
+            new = [chunk for cid, chunk in parts.items() if cid not in old]
+            if self.dedup is not None:
+                # near duplicates are neither embedded nor recorded
+                self.requeue |= self.dedup.remove(done.stale) - {url}
+                kept = await asyncio.to_thread(self.dedup.filter, new)
+                dropped = {c.metadata["id"] for c in new} - {
+                    c.metadata["id"] for c in kept
+                }
+                for cid in dropped:
+                    del done.ids[cid]
+                new = kept
+            stats.add(len(new), start)
+            for chunk in new:
+                await chunks.put(chunk)
+            await chunks.put(done)
+        await chunks.put(None)
+
+    async def embed_stage(
+        self,
+        chunks: asyncio.Queue,
+        batches: asyncio.Queue,
+        stats: Stage,
+    ) -> None:
+        """Embed chunks in fixed-size micro-batches."""
+        docs: list[Document] = []
+        marks: list[PageDone] = []
+
+        async def flush() -> None:
+            start = time.perf_counter()
+            vectors = (
+                await asyncio.to_thread(
+                    self.embeddings.embed_documents,
+                    [doc.page_content for doc in docs],
+                )
+                if docs
+                else []
+            )
+            stats.add(len(docs), start)
+            await batches.put((docs.copy(), vectors, marks.copy()))
+            docs.clear()
+            marks.clear()
+
+        while (item := await chunks.get()) is not None:
+            if isinstance(item, PageDone):
+                marks.append(item)
+                if not docs:
+                    await flush()
+                continue
+            docs.append(item)
+            if len(docs) >= self.batch:
+                await flush()
+        if docs or marks:
+            await flush()
+        await batches.put(None)
+
+    async def upsert_stage(self, batches: asyncio.Queue, stats: Stage) -> None:
+        """Upsert batches and commit the pages they complete."""
+        while (item := await batches.get()) is not None:
+            docs, vectors, marks = item
+            start = time.perf_counter()
+            if docs:
+                await asyncio.to_thread(
+                    self.sink.upsert,
+                    [doc.metadata["id"] for doc in docs],
+                    docs,
+                    vectors,
+                )
+            for done in marks:
+                if done.stale:
+                    await asyncio.to_thread(self.sink.delete, done.stale)
+                page = done.page
+                self.index.commit_page(
+                    page.url, done.phash, done.ids, page.etag, page.modified
+                )
+            stats.add(len(docs), start)
@@ -0,0 +1,608 @@
+"""
+KnowledgeBase Vector Index Module.
+
+Version: 2026.10.18.04
+"""
+
+import json
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import RunnableConfig
+
+
+class VectorIndex:
+    """
+    VectorIndex Class.
+
+    Exact top-k cosine search over a memory-mapped vector matrix. Every
+    column is an append-only file, so opening the index only maps files
+    and an upsert only appends rows:
+
+    * vectors.bin: float32 or float16 unit vectors, one row per chunk
+    * ids.bin: 40-byte chunk ids
+    * alive.bin: 1 for a live row, 0 for a deleted or replaced one
+    * text.bin/text.off: chunk texts and their end offsets
+    * col-<key>.i4: dictionary codes of a metadata key, values in meta.json
+    * codes-int8.bin/codes-int8.f4: int8 vector codes and row scales
+    * codes-binary.bin: sign bits of the vectors, 8 dimensions per byte
+
+    With a quantized mode, only the codes are loaded in memory for the
+    coarse search, and the float vectors of the best candidates are read
+    from the memmap to re-rank them exactly.
+
+    Deleted rows stay in the files until the dead fraction passes
+    Compact_Dead, then compact rewrites the live rows only. The new files
+    are committed by compact.json, and a compaction stopped after it is
+    finished on the next open.
+    """
+
+    Id_Size: int = 40
+    Quant_Modes: tuple[str, ...] = ("", "int8", "binary")
+    # bits set in each byte value, numpy < 2 has no bitwise_count
+    Popcount: np.ndarray = np.array(
+        [bin(i).count("1") for i in range(256)], dtype=np.uint8
+    )
+    # dead row fraction and min rows of an automatic compaction
+    Compact_Dead: float = 0.25
+    Compact_Min: int = 1024
+
+    def __init__(
+        self,
+        path: Path,
+        dtype: str = "float32",
+        quant: str = "",
+        rerank: int = 8,
+    ):
+        """
+        Class initialization.
+
+        :param path: Index folder.
+        :param dtype: Vector storage type: float32 or float16.
+        :param quant: Coarse search mode: "" for exact, int8 or binary.
+        :param rerank: Candidates re-ranked per result in a quantized mode.
+        """
+        if quant not in self.Quant_Modes:
+            raise ValueError(f"Unknown quant mode: {quant}")
+        self.quant = quant
+        self.rerank = rerank
+        # coarse codes and int8 row scales in memory
+        self.codes: np.ndarray | None = None
+        self.scales: np.ndarray | None = None
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.meta: dict[str, Any] = {
+            "dim": 0,
+            "count": 0,
+            "dtype": dtype,
+            "columns": {},
+        }
+        self.recover()
+        if (self.path / "meta.json").exists():
+            with open(self.path / "meta.json") as f:
+                self.meta = json.load(f)
+        # row memmaps of the current count
+        self.maps: dict[str, np.ndarray] = {}
+        self.mapped = -1
+        # chunk id to row, built on the first write
+        self.rows: dict[str, int] | None = None
+        # index generation, changes on every write
+        self.generation = time.time_ns()
+
+    @property
+    def count(self) -> int:
+        """Row count, deleted rows included."""
+        return self.meta["count"]
+
+    @property
+    def dim(self) -> int:
+        """Vector dimension."""
+        return self.meta["dim"]
+
+    def file(self, name: str) -> Path:
+        """Get the path of an index file."""
+        return self.path / name
+
+    def column(self, name: str, dtype: Any, width: int = 1) -> np.ndarray:
+        """Map a column file, trailing bytes of an unfinished write ignored."""
+        if self.mapped != self.count:
+            self.maps = {}
+            self.mapped = self.count
+        if name not in self.maps:
+            shape = (self.count, width) if width > 1 else (self.count,)
+            if self.count == 0:
+                self.maps[name] = np.zeros(shape, dtype=dtype)
+            else:
+                self.maps[name] = np.memmap(
+                    self.file(name), dtype=dtype, mode="r", shape=shape
+                )
+        return self.maps[name]
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Vector matrix."""
+        return self.column("vectors.bin", self.meta["dtype"], self.dim)
+
+    @property
+    def alive(self) -> np.ndarray:
+        """Live row mask."""
+        return self.column("alive.bin", np.uint8)
+
+    def get_rows(self) -> dict[str, int]:
+        """Get the live chunk id to row map."""
+        if self.rows is None:
+            ids = self.column("ids.bin", f"S{self.Id_Size}")
+            alive = self.alive
+            self.rows = {
+                ids[row].decode(): row for row in np.flatnonzero(alive)
+            }
+        return self.rows
+
+    def save_meta(self) -> None:
+        """Save meta data: the row count commits appended rows."""
+        self.generation = time.time_ns()
+        tmp = self.file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        tmp.replace(self.file("meta.json"))
+
+    def trim(self) -> None:
+        """Drop trailing bytes left by an unfinished write."""
+        sizes = {
+            "vectors.bin": np.dtype(self.meta["dtype"]).itemsize * self.dim,
+            "ids.bin": self.Id_Size,
+            "alive.bin": 1,
+            "text.off": 8,
+        }
+        sizes.update({f"col-{key}.i4": 4 for key in self.meta["columns"]})
+        sizes["codes-int8.bin"] = self.dim
+        sizes["codes-int8.f4"] = 4
+        sizes["codes-binary.bin"] = self.code_width("binary")
+        for name, size in sizes.items():
+            path = self.file(name)
+            if path.exists() and path.stat().st_size > self.count * size:
+                with open(path, "r+b") as f:
+                    f.truncate(self.count * size)
+        text = self.file("text.bin")
+        if text.exists() and self.count:
+            end = int(self.column("text.off", np.int64)[-1])
+            if text.stat().st_size > end:
+                with open(text, "r+b") as f:
+                    f.truncate(end)
+
+    def append(self, name: str, data: np.ndarray | bytes) -> None:
+        """Append data to a column file."""
+        with open(self.file(name), "ab") as f:
+            f.write(data if isinstance(data, bytes) else data.tobytes())
+
+    def delete(self, ids: list[str]) -> None:
+        """Delete chunks."""
+        rows = self.get_rows()
+        dead = [rows.pop(cid) for cid in ids if cid in rows]
+        if not dead:
+            return
+        with open(self.file("alive.bin"), "r+b") as f:
+            for row in sorted(dead):
+                f.seek(row)
+                f.write(b"\x00")
+        self.maps.pop("alive.bin", None)
+        self.generation = time.time_ns()
+        dead = self.count - len(rows)
+        if self.count >= self.Compact_Min and (
+            dead > self.count * self.Compact_Dead
+        ):
+            self.compact()
+
+    def recover(self) -> None:
+        """Finish a committed compaction, drop the files of a stopped one."""
+        commit = self.file("compact.json")
+        for new in self.path.glob("*.new"):
+            if commit.exists():
+                new.replace(new.with_suffix(""))
+            else:
+                new.unlink()
+        if commit.exists():
+            commit.replace(self.file("meta.json"))
+
+    def compact(self, block: int = 65536) -> None:
+        """Rewrite the live rows only, in row order."""
+        if self.rows is None:
+            self.trim()
+        live = np.flatnonzero(self.alive)
+        if len(live) == self.count:
+            return
+        names = ["vectors.bin", "ids.bin", "text.off"]
+        names += [f"col-{key}.i4" for key in self.meta["columns"]]
+        codes = {
+            quant: self.file(f"codes-{quant}.bin").exists()
+            and self.file(f"codes-{quant}.bin").stat().st_size
+            >= self.count * self.code_width(quant)
+            for quant in self.Quant_Modes[1:]
+        }
+        if codes["int8"]:
+            names += ["codes-int8.bin", "codes-int8.f4"]
+        if codes["binary"]:
+            names.append("codes-binary.bin")
+
+        columns = {name: self.row_column(name) for name in names}
+        offsets = self.column("text.off", np.int64)
+        end = 0
+        with (
+            open(self.file("text.bin"), "rb") as src,
+            open(self.file("text.bin.new"), "wb") as text,
+        ):
+            for start in range(0, len(live), block):
+                rows = live[start : start + block]
+                for name, column in columns.items():
+                    if name != "text.off":
+                        self.append(f"{name}.new", column[rows])
+                sizes = []
+                for row in rows:
+                    first = int(offsets[row - 1]) if row else 0
+                    src.seek(first)
+                    text.write(src.read(int(offsets[row]) - first))
+                    sizes.append(int(offsets[row]) - first)
+                self.append(
+                    "text.off.new",
+                    end + np.cumsum(sizes, dtype=np.int64),
+                )
+                end += sum(sizes)
+        self.append("alive.bin.new", np.ones(len(live), dtype=np.uint8))
+        # codes not covering all rows are made again from the vectors
+        for quant, whole in codes.items():
+            if not whole:
+                self.file(f"codes-{quant}.bin").unlink(missing_ok=True)
+                if quant == "int8":
+                    self.file("codes-int8.f4").unlink(missing_ok=True)
+
+        self.meta["count"] = len(live)
+        tmp = self.file("compact.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        # the commit point: the new files replace the old ones from here
+        tmp.replace(self.file("compact.json"))
+        self.maps = {}
+        self.mapped = -1
+        self.recover()
+        self.rows = None
+        self.codes = None
+        self.generation = time.time_ns()
+
+    def row_column(self, name: str) -> np.ndarray:
+        """Map a column file with the row width of its name."""
+        if name == "vectors.bin":
+            return self.vectors
+        if name == "ids.bin":
+            return self.column(name, f"S{self.Id_Size}")
+        if name == "codes-int8.bin":
+            return self.column(name, np.int8, self.dim)
+        if name == "codes-binary.bin":
+            width = self.code_width("binary")
+            return self.column(name, np.uint8, width)
+        dtype = {"text.off": np.int64, "codes-int8.f4": np.float32}
+        return self.column(name, dtype.get(name, np.int32))
+
+    def upsert(
+        self,
+        ids: list[str],
+        docs: list[Document],
+        vectors: list[list[float]],
+    ) -> None:
+        """Insert or replace chunks with their embeddings."""
+        if not ids:
+            return
+        if self.rows is None:
+            self.trim()
+        self.delete(ids)
+        rows = self.get_rows()
+
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if self.dim == 0:
+            self.meta["dim"] = matrix.shape[1]
+        matrix /= np.maximum(
+            np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12
+        )
+        if self.quant:
+            # code the old rows first: it trims the files to the count
+            self.sync_codes()
+        self.append("vectors.bin", matrix.astype(self.meta["dtype"]))
+        if self.quant:
+            self.append_codes(matrix)
+        self.append("ids.bin", np.array(ids, dtype=f"S{self.Id_Size}"))
+        self.append("alive.bin", np.ones(len(ids), dtype=np.uint8))
+
+        texts = [doc.page_content.encode() for doc in docs]
+        end = int(self.column("text.off", np.int64)[-1]) if self.count else 0
+        self.append("text.bin", b"".join(texts))
+        self.append(
+            "text.off",
+            end + np.cumsum([len(text) for text in texts], dtype=np.int64),
+        )
+
+        columns: dict[str, list[str]] = self.meta["columns"]
+        for doc in docs:
+            for key in doc.metadata:
+                if key != "id" and key not in columns:
+                    columns[key] = []
+                    self.append(
+                        f"col-{key}.i4", np.full(self.count, -1, np.int32)
+                    )
+        for key, values in columns.items():
+            lookup = {value: code for code, value in enumerate(values)}
+            codes = np.full(len(docs), -1, dtype=np.int32)
+            for i, doc in enumerate(docs):
+                if key in doc.metadata:
+                    value = str(doc.metadata[key])
+                    if value not in lookup:
+                        lookup[value] = len(values)
+                        values.append(value)
+                    codes[i] = lookup[value]
+            self.append(f"col-{key}.i4", codes)
+
+        for i, cid in enumerate(ids):
+            rows[cid] = self.count + i
+        self.meta["count"] += len(ids)
+        self.save_meta()
+
+    def code_width(self, quant: str) -> int:
+        """Get the code bytes per row of a quantized mode."""
+        return self.dim if quant == "int8" else (self.dim + 7) // 8
+
+    def code_count(self) -> int:
+        """Get the rows with codes on disk."""
+        path = self.file(f"codes-{self.quant}.bin")
+        if not path.exists() or self.dim == 0:
+            return 0
+        return path.stat().st_size // self.code_width(self.quant)
+
+    def append_codes(self, matrix: np.ndarray) -> None:
+        """Append the codes of unit vectors."""
+        if self.quant == "int8":
+            scale = np.maximum(np.abs(matrix).max(axis=1), 1e-12) / 127
+            codes = np.round(matrix / scale[:, None]).astype(np.int8)
+            self.append("codes-int8.bin", codes)
+            self.append("codes-int8.f4", scale.astype(np.float32))
+        else:
+            self.append("codes-binary.bin", np.packbits(matrix > 0, axis=1))
+        self.codes = None
+
+    def sync_codes(self, block: int = 65536) -> None:
+        """Code rows written before the quantized mode was enabled."""
+        have = min(self.code_count(), self.count)
+        if have < self.count:
+            self.trim()
+        for start in range(have, self.count, block):
+            self.append_codes(
+                self.vectors[start : start + block].astype(np.float32)
+            )
+
+    def get_codes(self) -> tuple[np.ndarray, np.ndarray | None]:
+        """Load the coarse codes in memory."""
+        if self.codes is None or len(self.codes) != self.count:
+            self.sync_codes()
+            width = self.code_width(self.quant)
+            dtype = np.int8 if self.quant == "int8" else np.uint8
+            self.codes = np.fromfile(
+                self.file(f"codes-{self.quant}.bin"),
+                dtype=dtype,
+                count=self.count * width,
+            ).reshape(self.count, width)
+            self.scales = (
+                np.fromfile(
+                    self.file("codes-int8.f4"),
+                    dtype=np.float32,
+                    count=self.count,
+                )
+                if self.quant == "int8"
+                else None
+            )
+        return self.codes, self.scales
+
+    def doc(self, row: int) -> Document:
+        """Get the document of a row."""
+        offsets = self.column("text.off", np.int64)
+        start = int(offsets[row - 1]) if row else 0
+        with open(self.file("text.bin"), "rb") as f:
+            f.seek(start)
+            text = f.read(int(offsets[row]) - start).decode()
+        ids = self.column("ids.bin", f"S{self.Id_Size}")
+        metadata = {"id": ids[row].decode()}
+        for key, values in self.meta["columns"].items():
+            code = self.column(f"col-{key}.i4", np.int32)[row]
+            if code >= 0:
+                metadata[key] = values[code]
+        return Document(page_content=text, metadata=metadata)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 4,
+        block: int = 65536,
+    ) -> list[list[tuple[int, float]]]:
+        """
+        Top-k cosine search.
+
+        :param queries: Query vectors, one row per query.
+        :param k: Results per query.
+        :param block: Rows scored per matrix product, bounds temp memory.
+        :return: (row, score) pairs per query, best first.
+        """
+        q = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+        if not self.quant or self.count == 0:
+            return self.sort_hits(*self.scan(q, k, block, self.score_float))
+
+        # coarse search on the codes, then exact re-rank of the candidates
+        _, cands = self.scan(q, k * self.rerank, block, self.score_codes)
+        vectors = self.vectors
+        best_s = np.full((len(q), k), -np.inf, dtype=np.float32)
+        best_r = np.zeros((len(q), k), dtype=np.int64)
+        for i, found in enumerate(cands):
+            rows = np.unique(found[found >= 0])
+            scores = vectors[rows].astype(np.float32) @ q[i]
+            top = np.argsort(-scores)[:k]
+            best_s[i, : len(top)] = scores[top]
+            best_r[i, : len(top)] = rows[top]
+        return self.sort_hits(best_s, best_r)
+
+    def score_float(self, q: np.ndarray, start: int, end: int) -> np.ndarray:
+        """Score a block of rows with the float vectors."""
+        return q @ self.vectors[start:end].astype(np.float32).T
+
+    def score_codes(self, q: np.ndarray, start: int, end: int) -> np.ndarray:
+        """Score a block of rows with the coarse codes."""
+        codes, scales = self.get_codes()
+        if self.quant == "int8":
+            part = codes[start:end].astype(np.float32)
+            return (q @ part.T) * scales[start:end]  # type: ignore[index]
+        # negative hamming distance of the sign bits
+        bits = np.packbits(q > 0, axis=1)
+        popcount = getattr(np, "bitwise_count", self.Popcount.__getitem__)
+        return -np.stack(
+            [
+                popcount(np.bitwise_xor(codes[start:end], b)).sum(
+                    axis=1, dtype=np.int32
+                )
+                for b in bits
+            ]
+        ).astype(np.float32)
+
+    def scan(
+        self,
+        q: np.ndarray,
+        k: int,
+        block: int,
+        score: Callable[[np.ndarray, int, int], np.ndarray],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Scan all rows block by block, keep the k best of each query."""
+        best_s = np.full((len(q), 0), -np.inf, dtype=np.float32)
+        best_r = np.zeros((len(q), 0), dtype=np.int64)
+        alive = self.alive
+        for start in range(0, self.count, block):
+            end = min(start + block, self.count)
+            scores = score(q, start, end)
+            scores[:, alive[start:end] == 0] = -np.inf
+            rows = np.broadcast_to(np.arange(start, end), scores.shape)
+            best_s, best_r = self.top_k(
+                np.hstack((best_s, scores)), np.hstack((best_r, rows)), k
+            )
+        best_r[best_s == -np.inf] = -1
+        return best_s, best_r
+
+    @staticmethod
+    def sort_hits(
+        best_s: np.ndarray, best_r: np.ndarray
+    ) -> list[list[tuple[int, float]]]:
+        """Sort the hits of each query, best first."""
+        order = np.argsort(-best_s, axis=1)
+        best_s = np.take_along_axis(best_s, order, axis=1)
+        best_r = np.take_along_axis(best_r, order, axis=1)
+        return [
+            [(int(r), float(s)) for r, s in zip(rs, ss) if s > -np.inf]
+            for rs, ss in zip(best_r, best_s)
+        ]
+
+    def evaluate(self, queries: np.ndarray, k: int = 10) -> dict[str, float]:
+        """
+        Compare the quantized mode with the exact search.
+
+        :return: recall@k, search time and memory of both modes.
+        """
+        quant = self.quant
+        self.quant = ""
+        start = time.perf_counter()
+        exact = self.search(queries, k)
+        exact_ms = (time.perf_counter() - start) * 1000
+        self.quant = quant
+        codes, scales = self.get_codes()
+        start = time.perf_counter()
+        approx = self.search(queries, k)
+        quant_ms = (time.perf_counter() - start) * 1000
+
+        recall = [
+            len({r for r, _ in a} & {r for r, _ in e}) / len(e)
+            for a, e in zip(approx, exact)
+            if e
+        ]
+        return {
+            f"recall@{k}": float(np.mean(recall)) if recall else 0.0,
+            "exact_ms": exact_ms,
+            "quant_ms": quant_ms,
+            "float_mb": self.vectors.nbytes / 2**20,
+            "quant_mb": (
+                codes.nbytes + (scales.nbytes if scales is not None else 0)
+            )
+            / 2**20,
+        }
+
+    @staticmethod
+    def top_k(
+        scores: np.ndarray, rows: np.ndarray, k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Keep the k best scores of each query row, unsorted."""
+        if scores.shape[1] <= k:
+            return scores, rows
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return (
+            np.take_along_axis(scores, top, axis=1),
+            np.take_along_axis(rows, top, axis=1),
+        )
+
+    def as_retriever(
+        self, embeddings: Embeddings, k: int = 4
+    ) -> "VectorRetriever":
+        """Get a retriever of the index."""
+        return VectorRetriever(index=self, embeddings=embeddings, k=k)
+
+
+class VectorRetriever(BaseRetriever):
+    """VectorRetriever Class: retriever of a VectorIndex."""
+
+    index: VectorIndex
+    embeddings: Embeddings
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        """Get the top-k documents of a query."""
+        return self.search_batch([query])[0]
+
+    def search_batch(self, queries: list[str]) -> list[list[Document]]:
+        """Get the top-k documents of many queries in one matrix product."""
+        vectors = [self.embeddings.embed_query(query) for query in queries]
+        return [
+            [self.index.doc(row) for row, _ in hits]
+            for hits in self.index.search(np.asarray(vectors), self.k)
+        ]
+
+    def batch(
+        self,
+        inputs: list[str],  # type: ignore[override]
+        config: RunnableConfig | list[RunnableConfig] | None = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Any,
+    ) -> list[list[Document]]:
+        """Batch queries share one scan of the vector matrix."""
+        return self.search_batch(inputs)
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python kbvec.py <index folder> <int8|binary> [k]
+    vi = VectorIndex(Path(sys.argv[1]), quant=sys.argv[2])
+    topk = int(sys.argv[3]) if sys.argv[3:] else 10
+    rng = np.random.default_rng(0)
+    live = np.flatnonzero(vi.alive)
+    sample = vi.vectors[rng.choice(live, min(100, len(live)), replace=False)]
+    noise = rng.normal(0, 0.05, sample.shape)
+    print(vi.evaluate(sample.astype(np.float32) + noise, topk))
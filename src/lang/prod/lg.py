@@ -1,15 +1,28 @@
 """
 LangGraph Module.
 
-Version: 2024.07.16.03
+Version: 2026.10.18.12
 """
 
-from collections.abc import Callable, Sequence
-from typing import Annotated, TypedDict
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Sequence
+from pathlib import Path
+from typing import Annotated, Any, TypedDict
 
-from lang.prod.lm import OLM
+from lang.prod.history import HistoryPolicy
+from lang.prod.kbembed import EmbeddingCache
+from lang.prod.lgsave import LGSaver
+from lang.prod.lm import OLM, AdaptiveChatOllama
+from lang.prod.lmpool import OLMPool
 from lang.prod.prompt import Prompt
+from lang.prod.rcache import ResponseCache
+from lang.prod.sched import Priority
 from lang.util.decorators import Timer
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import (
     AIMessage,
@@ -18,10 +31,10 @@ from langchain_core.messages import (
     ToolMessage,
 )
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableLambda
 from langchain_core.runnables.base import Runnable
 from langchain_core.runnables.config import RunnableConfig
 from langchain_core.tools import Tool
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph import END, START, StateGraph
 from langgraph.graph.message import add_messages
 
@@ -32,6 +45,43 @@ class AgentState(TypedDict):
     messages: Annotated[Sequence[BaseMessage], add_messages]
     cid: str  # context id
     sender: str
+    summary: str  # rolling summary of the older messages
+    summarized: int  # messages covered by the summary
+
+
+class TurnStats(BaseCallbackHandler):
+    """
+    TurnStats Class.
+
+    Callback handler of one turn: the estimated prompt tokens and the
+    Ollama generation info of the answer, history summaries excluded.
+    Each turn has its own, so concurrent sessions do not mix their stats.
+    """
+
+    def __init__(self):
+        """Class initialization."""
+        self.prompt = 0
+        self.info: dict[str, Any] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        tags: list[str] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        """Estimate the prompt tokens of the answer."""
+        if messages and HistoryPolicy.Tag not in (tags or []):
+            self.prompt = AdaptiveChatOllama.prompt_tokens(messages[0])
+
+    def on_llm_end(
+        self, response: Any, *, tags: list[str] | None = None, **kwargs: Any
+    ) -> None:
+        """Record the Ollama generation info of the answer."""
+        gens = response.generations
+        if gens and gens[0] and HistoryPolicy.Tag not in (tags or []):
+            self.info = gens[0][0].generation_info or {}
 
 
 class AgentNode:
@@ -43,12 +93,16 @@ class AgentNode:
         prompt: ChatPromptTemplate,
         llm: BaseChatModel,
         tools: list[Tool] | None = None,
+        history: HistoryPolicy | None = None,
+        priority: Priority = Priority.INTERACTIVE,
     ):
         """Class initialization."""
         # name of the agent node
         self.name: str = name
-        # context id
-        self.cid: str | None = None
+        # scheduler priority of the model requests
+        self.priority: Priority = priority
+        # messages sent to the model, all of them when None
+        self.history: HistoryPolicy | None = history
         self.prompt: ChatPromptTemplate = prompt
         self.llm: BaseChatModel = llm
         self.tools: list[Tool] | None = tools
@@ -57,45 +111,84 @@ class AgentNode:
                 tool_names=", ".join([tool.name for tool in self.tools])
             )
 
-        self.agent: Runnable = self.prompt | (
+        self.model: Runnable = (
             self.llm.bind_tools(self.tools)
             if self.tools is not None
             else self.llm
         )
-        self.node: Callable[[AgentState], AgentState] = self.build_node
+        # sync and async node: async graph runs await the model
+        self.node: Runnable[AgentState, AgentState] = RunnableLambda(
+            self.build_node, afunc=self.abuild_node, name=self.name
+        )
 
     def change_llm(self, llm: BaseChatModel) -> None:
         """Change agent llm."""
         self.llm = llm
-        self.agent = self.prompt | (
+        self.model = (
             self.llm.bind_tools(self.tools)
             if self.tools is not None
             else self.llm
         )
 
+    def agent(self, cid: str) -> Runnable:
+        """
+        Get the agent of a context.
+
+        The context ID goes to the model as its session: with several
+        Ollama hosts every turn of a context runs on the same host, which
+        keeps the KV cache of the conversation prefix. It is the session
+        of the scheduler as well, which takes turns between contexts.
+        """
+        return self.prompt | self.model.bind(
+            session=cid, priority=self.priority
+        )
+
+    def messages(
+        self, state: AgentState
+    ) -> tuple[Sequence[BaseMessage], dict[str, Any]]:
+        """Get the messages to send and the state update of the history."""
+        if self.history is None:
+            return state["messages"], {}
+        return self.history.apply(
+            state, session=state["cid"], priority=self.priority
+        )
+
     def build_node(self, state: AgentState) -> AgentState:
         """
         Build a LangGraph node.
 
         It is a function to run a specific task.
         """
-        if self.cid is None:
-            self.cid = state["cid"]
-        elif state["cid"] != self.cid:
-            # In a new context it keeps the last human message
-            state["messages"] = [state["messages"][-1]]
-            self.cid = state["cid"]
-        else:
-            # In an existing context, it keeps all messages
-            # with the same context ID
-            state["messages"] = [
-                msg
-                for msg in state["messages"]
-                if msg.additional_kwargs.get("cid") == self.cid
-            ]
+        messages, update = self.messages(state)
+        result = self.agent(state["cid"]).invoke(
+            {**state, "messages": messages}
+        )
+        return {**self.reply(result, state["cid"]), **update}
 
-        result = self.agent.invoke(state)
+    async def abuild_node(self, state: AgentState) -> AgentState:
+        """Build a LangGraph node: async version of build_node."""
+        messages, update = (
+            (state["messages"], {})
+            if self.history is None
+            else await self.history.aapply(
+                state,
+                getattr(self.llm, "model", ""),
+                state["cid"],
+                self.priority,
+            )
+        )
+        result = await self.agent(state["cid"]).ainvoke(
+            {**state, "messages": messages}
+        )
+        return {**self.reply(result, state["cid"]), **update}
+
+    def reply(self, result: BaseMessage, cid: str) -> AgentState:
+        """
+        Get the state update of a model reply.
 
+        Each context ID is its own graph thread, so the state holds the
+        messages of the current context only.
+        """
         if isinstance(result, ToolMessage):
             pass
         else:
@@ -103,10 +196,10 @@ class AgentNode:
                 **result.dict(exclude={"type", "name"}),
                 name=self.name,
             )
-            result.additional_kwargs["cid"] = self.cid
+            result.additional_kwargs["cid"] = cid
         return {
             "messages": [result],
-            "cid": self.cid,
+            "cid": cid,
             "sender": self.name,
         }
 
@@ -114,14 +207,43 @@ class AgentNode:
 class LG:
     """LG Class."""
 
-    def __init__(self, olm: OLM):
-        """Class Initialization."""
+    # Question embedding model of the semantic response cache
+    Embedding_Model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    # Turn records kept
+    Turns: int = 1000
+
+    def __init__(
+        self,
+        olm: OLM,
+        saver: LGSaver | None = None,
+        cache: ResponseCache | None = None,
+        priority: Priority = Priority.INTERACTIVE,
+        pool: OLMPool | None = None,
+    ):
+        """
+        Class Initialization.
+
+        :param olm: Ollama local model.
+        :param saver: Checkpointer, out/lg.sqlite by default.
+        :param cache: Response cache, out/rcache.sqlite by default.
+        :param priority: Scheduler priority of the model requests.
+        :param pool: Model pool of the history summary model.
+        """
         self.olm = olm
+        self.priority = priority
+        self.pool = pool
         self.smartAN = self.anode_smart()
         self.workflow = StateGraph(AgentState)
         self.graph_make()
-        memory = SqliteSaver.from_conn_string(":memory:")
-        self.graph = self.workflow.compile(checkpointer=memory)
+        # on-disk async checkpointer: one thread per context ID
+        self.saver = saver or LGSaver.from_path()
+        self.graph = self.workflow.compile(checkpointer=self.saver)
+        # answers of repeated questions
+        self.cache = cache or ResponseCache(
+            embeddings=EmbeddingCache(self.Embedding_Model, Path("out/emb"))
+        )
+        # prompt cache reuse and latency of the latest turns
+        self.turns: deque[dict[str, Any]] = deque(maxlen=self.Turns)
 
     def graph_make(self) -> None:
         """Make LangGraph graph."""
@@ -129,38 +251,176 @@ class LG:
         self.workflow.add_edge(START, self.smartAN.name)
         self.workflow.add_edge(self.smartAN.name, END)
 
-    @Timer.fxn_run
     def graph_proc(
         self,
         umsg: str,  # user message
         cid: str,  # context id
-    ) -> None:
+    ) -> str:
         """
         Process LangGraph workflow.
 
+        The checkpointer is async only: run the async workflow in a new
+        event loop, for callers outside of one.
+
+        :param umsg: User message as input.
+        :param cid: User message context id.
+        :return: The whole answer.
+        """
+        return asyncio.run(self.agraph_proc(umsg, cid))
+
+    async def astream(
+        self,
+        umsg: str,  # user message
+        cid: str,  # context id
+    ) -> AsyncIterator[str]:
+        """
+        Stream the answer tokens of a LangGraph workflow run.
+
+        The graph saves the question before the answer: a turn cancelled
+        or failed before its end is rolled back, so the thread never holds
+        a question without its answer.
+
+        :param umsg: User message as input.
+        :param cid: User message context id.
+        """
+        # the stats of this turn only, other sessions run at the same time
+        stats = TurnStats()
+        config = RunnableConfig(
+            configurable={"thread_id": cid}, callbacks=[stats]
+        )
+        question = HumanMessage(content=umsg, additional_kwargs={"cid": cid})
+        ttft: float | None = None
+        start = time.perf_counter()
+        state = await self.graph.aget_state(config)
+        # the checkpoint to roll back to, None for a new thread
+        before = (state.config or {}).get("configurable", {}).get("thread_ts")
+        request = (
+            self.olm.mn,
+            Prompt.System_Message,
+            [*state.values.get("messages", []), question],
+            self.olm.cache_options(),
+        )
+        answer = await asyncio.to_thread(self.cache.get, *request)
+        if answer is not None:
+            # the turn is recorded as if the agent answered it
+            reply = self.smartAN.reply(AIMessage(content=answer), cid)
+            await self.graph.aupdate_state(
+                config,
+                {**reply, "messages": [question, *reply["messages"]]},
+                as_node=self.smartAN.name,
+            )
+            ttft = time.perf_counter() - start
+            yield answer
+            self.log_turn(cid, time.perf_counter() - start, ttft)
+            return
+
+        # wait only if the warm-up is still in flight
+        await asyncio.to_thread(self.olm.wait_warm)
+        tokens: list[str] = []
+        try:
+            async for event in self.graph.astream_events(
+                {
+                    "messages": [question],
+                    "cid": cid,
+                    "sender": "User",
+                },
+                config,
+                version="v2",
+            ):
+                if (
+                    event["event"] != "on_chat_model_stream"
+                    or HistoryPolicy.Tag in event["tags"]
+                ):
+                    continue
+                token = event["data"]["chunk"].content
+                if not isinstance(token, str) or not token:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                tokens.append(token)
+                yield token
+        except BaseException:
+            # cancelled, failed or closed by the caller: drop the question
+            await asyncio.shield(self.saver.rollback(cid, before))
+            raise
+        self.log_turn(cid, time.perf_counter() - start, ttft, stats)
+        if tokens:
+            await asyncio.to_thread(self.cache.put, *request, "".join(tokens))
+
+    def log_turn(
+        self,
+        cid: str,
+        seconds: float,
+        ttft: float | None,
+        stats: TurnStats | None = None,
+    ) -> None:
+        """
+        Log the prompt tokens Ollama evaluated in a turn.
+
+        Ollama only evaluates the prompt tokens after the longest prefix
+        it has in the KV cache, so with a stable prefix prompt_eval_count
+        stays near the size of the new message. An answer from the
+        response cache, without stats, evaluates nothing.
+        """
+        cached = stats is None
+        info = {"prompt_eval_count": 0} if stats is None else stats.info
+        prompt = 0 if stats is None else stats.prompt
+        evaluated = info.get("prompt_eval_count", prompt)
+        turn = {
+            "cid": cid,
+            "model": self.olm.mn,
+            "prompt": prompt,
+            "evaluated": evaluated,
+            "reused": max(0.0, 1 - evaluated / prompt) if prompt else 0.0,
+            "prompt_eval_s": info.get("prompt_eval_duration", 0) / 1e9,
+            "ttft_s": ttft,
+            "total_s": seconds,
+            "cached": cached,
+        }
+        self.turns.append(turn)
+        logging.info(f"LG turn {turn}")
+
+    @Timer.afxn_run
+    async def agraph_proc(
+        self,
+        umsg: str,  # user message
+        cid: str,  # context id
+        on_token: Callable[[str], None] | None = None,
+    ) -> str:
+        """
+        Process LangGraph workflow, streaming the answer.
+
         :param umsg: User message as input.
         :param cid: User message context id.
+        :param on_token: Token callback, printing by default.
+        :return: The whole answer.
         """
-        config = RunnableConfig(configurable={"thread_id": "2"})
-        print(f"\nSmart AI {self.olm.name}:")
-        for event in self.graph.stream(
-            {
-                "messages": [
-                    HumanMessage(content=umsg, additional_kwargs={"cid": cid}),
-                ],
-                "cid": cid,
-                "sender": "User",
-            },
-            config,
-            stream_mode="values",
-        ):
-            msg = event["messages"][-1]
-            if isinstance(msg, AIMessage):
-                print("-" * 80)
-                if isinstance(msg.content, str):
-                    msg = msg.content.replace("\n\n", "\n")
-                print(msg)
-                print("-" * 80)
+        if on_token is None:
+            print(f"\nSmart AI {self.olm.name}:")
+            print("-" * 80)
+        tokens: list[str] = []
+        async with contextlib.aclosing(self.astream(umsg, cid)) as stream:
+            async for token in stream:
+                tokens.append(token)
+                if on_token is None:
+                    print(token, end="", flush=True)
+                else:
+                    on_token(token)
+        if on_token is None:
+            print()
+            print("-" * 80)
+            # the last turn of this context, not of another session
+            turn = next(t for t in reversed(self.turns) if t["cid"] == cid)
+            ttft = turn["ttft_s"]
+            ttft = f"{ttft:.2f}s" if ttft is not None else "-"
+            print(f"Graph TTFT {ttft}, model {self.olm.stats}")
+            print(self.cache)
+            print(
+                f"Prompt ~{turn['prompt']} tokens, {turn['evaluated']} "
+                f"evaluated ({turn['reused']:.0%} cached) in "
+                f"{turn['prompt_eval_s']:.2f}s, turn {turn['total_s']:.2f}s"
+            )
+        return "".join(tokens)
 
     def change_llm(self, olm: OLM) -> None:
         """Change llm model method."""
@@ -182,4 +442,6 @@ class LG:
             name,
             prompt,
             self.olm.get_llm(),
+            history=HistoryPolicy(pool=self.pool),
+            priority=self.priority,
         )
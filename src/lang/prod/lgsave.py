@@ -0,0 +1,184 @@
+"""
+LangGraph Checkpoint Module.
+
+Version: 2026.10.18.03
+"""
+
+import time
+from pathlib import Path
+
+import aiosqlite
+from langchain_core.runnables.config import RunnableConfig
+from langgraph.checkpoint.aiosqlite import AsyncSqliteSaver
+from langgraph.checkpoint.base import Checkpoint, CheckpointMetadata
+
+
+class LGSaver(AsyncSqliteSaver):
+    """
+    LGSaver Class.
+
+    On-disk async SQLite checkpointer, one thread per context ID. A
+    threads table keeps when each thread was last used, so idle threads
+    are pruned and the others compacted to their latest checkpoint. The
+    file is vacuumed only when that removed rows or its free pages pass
+    a share of it, so a start with nothing to clean up does not rewrite
+    the whole database.
+    """
+
+    # Share of free pages in the file worth a vacuum
+    Vacuum_Free: float = 0.25
+
+    Schema: str = """
+        PRAGMA synchronous=NORMAL;
+        CREATE TABLE IF NOT EXISTS threads (
+            thread_id TEXT PRIMARY KEY,
+            updated REAL NOT NULL
+        );
+    """
+
+    @classmethod
+    def from_path(cls, path: Path = Path("out/lg.sqlite")) -> "LGSaver":
+        """Create a checkpointer of a database file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = aiosqlite.connect(path)
+        # every write is committed: do not hold the process open at exit
+        conn.daemon = True
+        return cls(conn=conn)
+
+    async def setup(self) -> None:
+        """Set up the checkpoint tables in WAL mode and the threads table."""
+        if self.is_setup:
+            return
+        await super().setup()
+        await self.conn.executescript(self.Schema)
+        await self.conn.commit()
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> RunnableConfig:
+        """Save a checkpoint and mark its thread as used."""
+        saved = await super().aput(config, checkpoint, metadata)
+        await self.conn.execute(
+            "INSERT OR REPLACE INTO threads (thread_id, updated) VALUES (?, ?)",
+            (str(config["configurable"]["thread_id"]), time.time()),
+        )
+        await self.conn.commit()
+        return saved
+
+    async def latest(self) -> str | None:
+        """Get the last used thread ID."""
+        await self.setup()
+        async with self.conn.execute(
+            "SELECT thread_id FROM threads ORDER BY updated DESC LIMIT 1"
+        ) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def prune(self, days: float = 30.0) -> int:
+        """
+        Delete the threads idle for some days.
+
+        :return: Threads deleted.
+        """
+        await self.setup()
+        before = time.time() - days * 86400
+        old = "SELECT thread_id FROM threads WHERE updated < ?"
+        async with self.lock:
+            for table in ("writes", "checkpoints"):
+                await self.conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id IN ({old})", (before,)
+                )
+            cursor = await self.conn.execute(
+                "DELETE FROM threads WHERE updated < ?", (before,)
+            )
+            await self.conn.commit()
+        return cursor.rowcount
+
+    async def compact(self, thread_id: str | None = None) -> int:
+        """
+        Keep only the latest checkpoint of a thread, or of all threads.
+
+        :return: Checkpoints deleted.
+        """
+        await self.setup()
+        scope = "thread_id = ? AND " if thread_id else ""
+        args = (thread_id,) if thread_id else ()
+        # checkpoint IDs sort by time
+        latest = (
+            "SELECT thread_id, MAX(thread_ts) FROM checkpoints "
+            "GROUP BY thread_id"
+        )
+        async with self.lock:
+            for table in ("writes", "checkpoints"):
+                cursor = await self.conn.execute(
+                    f"DELETE FROM {table} WHERE {scope}"
+                    f"(thread_id, thread_ts) NOT IN ({latest})",
+                    args,
+                )
+            await self.conn.commit()
+        return cursor.rowcount
+
+    async def rollback(self, thread_id: str, after: str | None) -> None:
+        """
+        Delete the checkpoints of a thread saved after a checkpoint.
+
+        :param thread_id: Thread ID.
+        :param after: Checkpoint ID to keep, None to delete the thread.
+        """
+        await self.setup()
+        async with self.lock:
+            for table in ("writes", "checkpoints"):
+                await self.conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? "
+                    "AND (? IS NULL OR thread_ts > ?)",
+                    (thread_id, after, after),
+                )
+            if after is None:
+                await self.conn.execute(
+                    "DELETE FROM threads WHERE thread_id = ?", (thread_id,)
+                )
+            await self.conn.commit()
+
+    async def free(self) -> float:
+        """Get the share of free pages in the database file."""
+        await self.setup()
+        async with self.conn.execute("PRAGMA freelist_count") as cursor:
+            (free,) = await cursor.fetchone()
+        async with self.conn.execute("PRAGMA page_count") as cursor:
+            (pages,) = await cursor.fetchone()
+        return free / pages if pages else 0.0
+
+    async def vacuum(self) -> None:
+        """Return the deleted pages to the file system."""
+        await self.setup()
+        async with self.lock:
+            await self.conn.execute("VACUUM")
+            await self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    async def maintain(self, days: float = 30.0) -> bool:
+        """
+        Prune idle threads, compact the others and vacuum if worth it.
+
+        :return: Vacuumed.
+        """
+        pruned = await self.prune(days)
+        compacted = await self.compact()
+        vacuum = bool(pruned or compacted) or (
+            await self.free() > self.Vacuum_Free
+        )
+        if vacuum:
+            await self.vacuum()
+        print(
+            f"LGSaver pruned {pruned} idle threads, "
+            f"compacted {compacted} checkpoints."
+        )
+        return vacuum
+
+    async def close(self) -> None:
+        """Close the database."""
+        if self.is_setup:
+            await self.conn.close()
+            self.is_setup = False
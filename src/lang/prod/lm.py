@@ -1,12 +1,31 @@
 """
 LM Module.
 
-Version: 2024.07.11.01
+Version: 2026.10.18.14
 """
 
+import logging
+import os
+import time
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import (
+    AbstractAsyncContextManager,
+    AbstractContextManager,
+    nullcontext,
+)
 from enum import StrEnum
+from typing import Any
+from uuid import UUID
 
+import httpx
+from lang.prod.lmhost import OllamaHosts
+from lang.prod.lmtune import OLMTune
+from lang.prod.sched import Priority, Scheduler
+from lang.util.tokens import Tokens
 from langchain_community.chat_models import ChatOllama
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables.base import Runnable
 
@@ -31,9 +50,353 @@ class EOM(StrEnum):
     G027 = "gemma2:27b"  # context window 8k
 
 
+class EOMInfo:
+    """EOM Model Information Class."""
+
+    # Approximate resident memory in GB with an 8k context window,
+    # measured where noted in EOM, estimated from the model files otherwise
+    Size: dict[str, float] = {
+        EOM.L008: 5.3,
+        EOM.L070: 47.0,
+        EOM.P003: 3.5,
+        EOM.P014: 9.5,
+        EOM.M012: 7.8,
+        EOM.M123: 47.0,
+        EOM.G009: 7.0,
+        EOM.G027: 18.5,
+    }
+
+    # Context window cap: the model maximum, lower where the KV cache
+    # would not fit in memory
+    Ctx_Max: dict[str, int] = {
+        EOM.L008: 131072,
+        EOM.L070: 32768,
+        EOM.P003: 131072,
+        EOM.P014: 131072,
+        EOM.M012: 65536,
+        EOM.M123: 32768,
+        EOM.G009: 8192,
+        EOM.G027: 8192,
+    }
+
+    # Context window sizes: Ollama reloads the model when num_ctx changes
+    # from 2k to 128k
+    Ctx_Buckets: tuple[int, ...] = tuple(2**n for n in range(11, 18))
+
+    @staticmethod
+    def size(mn: str) -> float:
+        """Get the approximate resident memory of a model in GB."""
+        return EOMInfo.Size.get(mn, 8.0)
+
+    @staticmethod
+    def ctx_max(mn: str) -> int:
+        """Get the context window cap of a model."""
+        return EOMInfo.Ctx_Max.get(mn, 8192)
+
+
+class AdaptiveChatOllama(ChatOllama):
+    """
+    AdaptiveChatOllama Class.
+
+    ChatOllama sizing num_ctx per request from the estimated prompt tokens
+    plus num_predict, rounded up to a bucket. It only shrinks when the
+    prompt fits in a quarter of the current window of the session, so
+    alternating short and long prompts do not reload the model every turn,
+    and a long conversation does not hold the window of the others. With a
+    host pool a request goes to the host picked by the pool, and to the
+    next one if it fails before streaming any token, with the options of
+    that host. With a scheduler a request waits for a slot of its model on
+    the host it is routed to.
+    """
+
+    # smallest and largest context window
+    ctx_min: int = 2048
+    ctx_max: int = 131072
+    # context window of the last request, to warm up with
+    ctx_last: int = 0
+    # session -> context window of its last request, least recent first
+    ctx_sessions: dict[str, int] = {}
+    # sessions whose context window is kept
+    ctx_sessions_max: int = 1024
+    # extra Ollama options of every request
+    options: dict[str, Any] = {}
+    # host url -> Ollama options of the host, e.g. its tuned profile, under
+    # the options of every request
+    profiles: dict[str, dict[str, Any]] = {}
+    # Ollama servers, base_url only when None
+    hosts: OllamaHosts | None = None
+    # admission control of the requests, none when None
+    scheduler: Scheduler | None = None
+
+    def host_options(self, url: str) -> dict[str, Any]:
+        """Get the Ollama options of the requests to a host."""
+        return {**self.profiles.get(url, {}), **self.options}
+
+    def request_options(self, ctx: int, url: str = "") -> dict[str, Any]:
+        """Get the per-request options, sent with the warm-up as well."""
+        return {**self.host_options(url or self.base_url), "num_ctx": ctx}
+
+    @staticmethod
+    def prompt_tokens(messages: list[BaseMessage]) -> int:
+        """Estimate the prompt tokens of a request."""
+        # 4 chat template tokens per message
+        return sum(Tokens.estimate(str(msg.content)) + 4 for msg in messages)
+
+    def fit_ctx(self, messages: list[BaseMessage], session: str = "") -> int:
+        """Get the context window of a request of a session."""
+        prompt = self.prompt_tokens(messages)
+        predict = self.num_predict if (self.num_predict or 0) > 0 else 1024
+        need = max(int(prompt * 1.1) + predict, self.ctx_min)
+        ctx = next(
+            (size for size in EOMInfo.Ctx_Buckets if size >= need),
+            self.ctx_max,
+        )
+        ctx = min(ctx, self.ctx_max)
+        last = self.ctx_sessions.pop(session, 0)
+        if ctx < last and need > last // 4:
+            ctx = last
+        self.ctx_sessions[session] = ctx
+        if len(self.ctx_sessions) > self.ctx_sessions_max:
+            self.ctx_sessions.pop(next(iter(self.ctx_sessions)), None)
+        self.ctx_last = ctx
+        return ctx
+
+    def chat_request(
+        self, messages: list[BaseMessage], **kwargs: Any
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        """
+        Get the payload and the options of a chat request.
+
+        A session kwarg, bound by the caller, pins the requests of a
+        conversation to one host, and a priority kwarg orders them in the
+        scheduler: neither is an Ollama option. The options of the host
+        are added once the request is routed.
+        """
+        payload = {
+            "model": self.model,
+            "messages": self._convert_messages_to_ollama_messages(messages),
+        }
+        ctx = self.fit_ctx(messages, str(kwargs.get("session", "")))
+        kwargs = {"num_ctx": ctx, **kwargs}
+        kwargs.pop("session", None)
+        kwargs.pop("priority", None)
+        return payload, kwargs
+
+    def slot(
+        self, session: str, priority: Priority, host: str = ""
+    ) -> AbstractContextManager:
+        """Get a scheduler slot of the model on a host, if scheduled."""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.slot(self.model, session, priority, host)
+
+    def aslot(
+        self, session: str, priority: Priority, host: str = ""
+    ) -> AbstractAsyncContextManager:
+        """Get a scheduler slot of the model on a host: async version."""
+        if self.scheduler is None:
+            return nullcontext()
+        return self.scheduler.aslot(self.model, session, priority, host)
+
+    def _create_chat_stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """Create a chat stream with a fitted context window."""
+        session = str(kwargs.get("session", ""))
+        priority = Priority(kwargs.get("priority", Priority.INTERACTIVE))
+        payload, kwargs = self.chat_request(messages, **kwargs)
+        yield from self.host_stream(payload, stop, session, priority, **kwargs)
+
+    def host_stream(
+        self,
+        payload: dict[str, Any],
+        stop: list[str] | None,
+        session: str,
+        priority: Priority,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """Stream a chat request from a host, failing over to the next."""
+        if self.hosts is None:
+            with self.slot(session, priority):
+                yield from self._create_stream(
+                    payload=payload,
+                    stop=stop,
+                    api_url=f"{self.base_url}/api/chat",
+                    **{**self.host_options(self.base_url), **kwargs},
+                )
+            return
+
+        failed: set[str] = set()
+        while True:
+            started = False
+            try:
+                with (
+                    self.hosts.route(self.model, failed, session) as host,
+                    self.slot(session, priority, host.url),
+                ):
+                    lines = self._create_stream(
+                        payload=payload,
+                        stop=stop,
+                        api_url=f"{host.url}/api/chat",
+                        **{**self.host_options(host.url), **kwargs},
+                    )
+                    # the request is sent on the first line
+                    for line in lines:
+                        started = True
+                        yield line
+                return
+            except Exception as ex:
+                if started or not self.hosts.host_down(ex):
+                    raise
+                logging.warning(f"Ollama host {host.url} failed: {ex!r}")
+                failed.add(host.url)
+
+    async def _acreate_chat_stream(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Create an async chat stream with a fitted context window."""
+        session = str(kwargs.get("session", ""))
+        priority = Priority(kwargs.get("priority", Priority.INTERACTIVE))
+        payload, kwargs = self.chat_request(messages, **kwargs)
+        stream = self.ahost_stream(payload, stop, session, priority, **kwargs)
+        async for line in stream:
+            yield line
+
+    async def ahost_stream(
+        self,
+        payload: dict[str, Any],
+        stop: list[str] | None,
+        session: str,
+        priority: Priority,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        """Stream a chat request from a host: async version."""
+        if self.hosts is None:
+            async with self.aslot(session, priority):
+                stream = self._acreate_stream(
+                    payload=payload,
+                    stop=stop,
+                    api_url=f"{self.base_url}/api/chat",
+                    **{**self.host_options(self.base_url), **kwargs},
+                )
+                async for line in stream:
+                    yield line
+            return
+
+        failed: set[str] = set()
+        while True:
+            started = False
+            try:
+                with self.hosts.route(self.model, failed, session) as host:
+                    async with self.aslot(session, priority, host.url):
+                        stream = self._acreate_stream(
+                            payload=payload,
+                            stop=stop,
+                            api_url=f"{host.url}/api/chat",
+                            **{**self.host_options(host.url), **kwargs},
+                        )
+                        async for line in stream:
+                            started = True
+                            yield line
+                return
+            except Exception as ex:
+                if started or not self.hosts.host_down(ex):
+                    raise
+                logging.warning(f"Ollama host {host.url} failed: {ex!r}")
+                failed.add(host.url)
+
+
+class OLMStats(BaseCallbackHandler):
+    """
+    OLMStats Class.
+
+    Callback handler of an OLM: time-to-first-token of each generation,
+    split by whether the model was warmed up before, and the Ollama
+    timings of the last generation. Each generation is timed by its run,
+    so the generations of concurrent sessions do not mix.
+    """
+
+    def __init__(self):
+        """Class initialization."""
+        # run -> start of a generation without a token yet
+        self.starts: dict[UUID, float] = {}
+        self.ttft: float | None = None
+        # the model was warmed up before this generation
+        self.warm = False
+        # TTFT samples in seconds
+        self.warm_ttft: list[float] = []
+        self.cold_ttft: list[float] = []
+        # Ollama generation info of the last generation
+        self.info: dict[str, Any] = {}
+
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, Any],
+        messages: list[list[BaseMessage]],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        """Start timing a generation."""
+        self.starts[run_id] = time.perf_counter()
+
+    def on_llm_new_token(
+        self, token: str, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Record the first token of a generation."""
+        start = self.starts.pop(run_id, None)
+        if start is not None:
+            self.ttft = time.perf_counter() - start
+            (self.warm_ttft if self.warm else self.cold_ttft).append(self.ttft)
+
+    def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        """Forget a failed generation."""
+        self.starts.pop(run_id, None)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        """Record the Ollama generation info."""
+        self.starts.pop(run_id, None)
+        gens = response.generations
+        if gens and gens[0]:
+            self.info = gens[0][0].generation_info or {}
+
+    def __str__(self) -> str:
+        """Last and mean TTFT with and without warm-up."""
+
+        def mean(samples: list[float]) -> str:
+            if not samples:
+                return "-"
+            return f"{sum(samples) / len(samples):.2f}s/{len(samples)}"
+
+        last = f"{self.ttft:.2f}s" if self.ttft is not None else "-"
+        return (
+            f"TTFT {last} ({'warm' if self.warm else 'cold'}), "
+            f"mean warm {mean(self.warm_ttft)}, "
+            f"cold {mean(self.cold_ttft)}"
+        )
+
+
 class OLM:  # ChatOllama local model
     """OLM Class."""
 
+    # Warm-up threads shared by all models
+    Warm_Pool: ThreadPoolExecutor = ThreadPoolExecutor(2, "olm-warm")
+
+    # Request scheduler shared by all models: Ollama parallel slots of a
+    # model on each host, one for the largest models
+    Request_Scheduler: Scheduler = Scheduler(
+        int(os.environ.get("OLLAMA_NUM_PARALLEL", "4")),
+        limits={EOM.L070: 1, EOM.M123: 1},
+    )
+
     def __init__(
         self,
         name: str,
@@ -41,11 +404,17 @@ class OLM:  # ChatOllama local model
         form: str = "",
         temp: float = 0.1,
         keep_alive: str = "-1m",  # 0 for stop
-        num_thread: int = 16,  # max 16
-        num_ctx: int = 8192,  # max 131072 for llama3.1 and mistral-nemo
+        num_thread: int = 0,  # 0 for the tuned profile or the cpu count
+        num_ctx: int = 2048,  # min, fitted per request up to EOMInfo.ctx_max
         num_predict: int = 1024,  # -1 for infinite
+        base_url: str | list[str] = "http://localhost:11434",
     ):
         """Class initialization."""
+        # Ollama server, or servers to balance the requests over
+        urls = [base_url] if isinstance(base_url, str) else base_url
+        self.base_url: str = urls[0]
+        self.hosts = OllamaHosts(urls) if len(urls) > 1 else None
+
         # assistant name
         self.name = name
 
@@ -58,44 +427,142 @@ class OLM:  # ChatOllama local model
         # model format
         self.form: str = form
 
-        # cpu cores: 16 cores in the system
-        self.num_thread = num_thread
+        # Ollama runtime options tuned on each host, see OLMTune
+        self.profiles = {url: OLMTune.profile(mn, url) for url in urls}
+        self.profile = self.profiles[self.base_url]
+
+        # cpu threads: of every host if set, else of the tuned profile of
+        # each host, else half the cpu count
+        self.options = {"num_thread": num_thread} if num_thread else {}
+        self.num_thread = num_thread or max(1, (os.cpu_count() or 2) // 2)
 
         # model keep alive time frame
         self.keep_alive = keep_alive
 
-        # model context window: input token
+        # model context window: input token, fitted per request
         self.num_ctx = num_ctx
         # model generating text: output token
         self.num_predict = num_predict
 
+        # TTFT and generation info callback
+        self.stats = OLMStats()
+        # warm-up in flight or done
+        self.warming: Future[float] | None = None
+
         # llm model
-        self.llm: ChatOllama = (
-            ChatOllama(
+        self.llm: AdaptiveChatOllama = (
+            AdaptiveChatOllama(
                 model=self.mn,
+                base_url=self.base_url,
                 temperature=self.temp,
                 keep_alive=self.keep_alive,
                 num_thread=self.num_thread,
                 num_ctx=self.num_ctx,
+                ctx_min=self.num_ctx,
+                ctx_max=EOMInfo.ctx_max(self.mn),
                 num_predict=self.num_predict,
+                options=self.options,
+                profiles=self.profiles,
+                hosts=self.hosts,
+                scheduler=self.Request_Scheduler,
+                callbacks=[self.stats],
             )
             if self.form == ""
-            else ChatOllama(
+            else AdaptiveChatOllama(
                 model=self.mn,
+                base_url=self.base_url,
                 format=self.form,
                 temperature=self.temp,
                 keep_alive=self.keep_alive,
                 num_thread=self.num_thread,
                 num_ctx=self.num_ctx,
+                ctx_min=self.num_ctx,
+                ctx_max=EOMInfo.ctx_max(self.mn),
                 num_predict=self.num_predict,
+                options=self.options,
+                profiles=self.profiles,
+                hosts=self.hosts,
+                scheduler=self.Request_Scheduler,
+                callbacks=[self.stats],
             )
         )
 
+    def warm(self) -> float:
+        """
+        Load the model with an empty generation.
+
+        The context window must match the chat requests, otherwise Ollama
+        reloads the model on the first question: warm up with the window of
+        the last request, or the smallest one.
+
+        :return: Warm-up seconds, -1 on failure.
+        """
+        ctx = self.llm.ctx_last or self.llm.ctx_min
+        start = time.perf_counter()
+        try:
+            if self.hosts is None:
+                self.warm_on(self.base_url, ctx)
+            else:
+                with self.hosts.route(self.mn) as host:
+                    self.warm_on(host.url, ctx)
+        except (httpx.HTTPError, ConnectionError) as he:
+            logging.error(f"Ollama warm-up {self.mn}: {he!r}")
+            return -1.0
+        self.llm.ctx_last = ctx
+        return time.perf_counter() - start
+
+    def warm_on(self, url: str, ctx: int) -> None:
+        """Load the model on an Ollama server."""
+        response = httpx.post(
+            f"{url}/api/generate",
+            json={
+                "model": self.mn,
+                "keep_alive": self.keep_alive,
+                "options": self.llm.request_options(ctx, url),
+            },
+            timeout=600,
+        )
+        response.raise_for_status()
+
+    def prewarm(self) -> None:
+        """Start warming up the model in the background."""
+        if self.warming is None:
+            self.warming = self.Warm_Pool.submit(self.warm)
+
+    def cool(self) -> None:
+        """Forget the warm-up after the model is unloaded."""
+        self.warming = None
+        self.stats.warm = False
+
+    def wait_warm(self) -> None:
+        """Wait for a warm-up still in flight."""
+        if self.warming is None:
+            self.stats.warm = False
+            return
+        if not self.warming.done():
+            print(f"Waiting for {self.name} to load...")
+        seconds = self.warming.result()
+        if seconds < 0:
+            # failed: try again on the next selection
+            self.cool()
+            return
+        if not self.stats.warm:
+            print(f"{self.name} warmed up in {seconds:.1f}s.")
+        self.stats.warm = True
+
+    def cache_options(self) -> dict[str, Any]:
+        """Get the options that change the answers, for response caches."""
+        return {
+            "temperature": self.temp,
+            "num_predict": self.num_predict,
+            "format": self.form,
+        }
+
     def get_chain(self) -> Runnable:
         """Get LLM model chain."""
         chain = self.llm | StrOutputParser()
         return chain
 
-    def get_llm(self) -> ChatOllama:
+    def get_llm(self) -> AdaptiveChatOllama:
         """Get Ollama local LLM model."""
         return self.llm
@@ -0,0 +1,213 @@
+"""
+LM Host Module.
+
+Version: 2026.10.18.03
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import aiohttp
+import httpx
+import requests
+
+
+class OllamaHost:
+    """Ollama Host Class: one Ollama server and its routing state."""
+
+    def __init__(self, url: str):
+        """Class initialization."""
+        self.url = url.rstrip("/")
+        # requests in flight
+        self.outstanding = 0
+        self.served = 0
+        self.failed = 0
+        self.healthy = True
+        # models loaded in memory, from /api/ps and served requests
+        self.models: set[str] = set()
+
+    def __str__(self) -> str:
+        """Host state."""
+        state = "up" if self.healthy else "down"
+        return (
+            f"{self.url} {state}: {self.outstanding} in flight, "
+            f"{self.served} served, {self.failed} failed, "
+            f"models {sorted(self.models)}"
+        )
+
+
+class OllamaHosts:
+    """
+    OllamaHosts Class.
+
+    Route requests over several Ollama servers by least outstanding
+    requests, preferring the hosts that already have the model loaded.
+    A session sticks to its first host, where the KV cache holds its
+    conversation prefix. A host that fails is taken out until a health
+    check finds it up. The health checks run in a background thread, so
+    picking a host never blocks an event loop.
+    """
+
+    # Sessions pinned to a host, least recently used dropped first
+    Pin_Size: int = 4096
+    # Errors of a host, not of the request: the request goes to another.
+    # Not the ConnectionError of pick, no host is left to go to.
+    Down_Errors: tuple[type[BaseException], ...] = (
+        requests.ConnectionError,
+        requests.Timeout,
+        aiohttp.ClientConnectionError,
+        httpx.TransportError,
+        TimeoutError,
+    )
+    # ChatOllama raises a ValueError with the status code of a failed call
+    Down_Status = re.compile(r"status code 5\d\d")
+
+    def __init__(
+        self,
+        urls: list[str],
+        interval: float = 30.0,
+        spill: int = 2,
+    ):
+        """
+        Class initialization.
+
+        :param urls: Ollama server base urls.
+        :param interval: Health check interval in seconds.
+        :param spill: Extra requests in flight on a host with the model
+            loaded before routing to a host that has to load it.
+        """
+        self.hosts = [OllamaHost(url) for url in urls]
+        self.interval = interval
+        self.spill = spill
+        self.lock = threading.Lock()
+        self.checked = 0.0
+        # health check running in the background
+        self.checking: threading.Thread | None = None
+        # session -> host url
+        self.pins: OrderedDict[str, str] = OrderedDict()
+
+    @classmethod
+    def host_down(cls, ex: BaseException) -> bool:
+        """Check if an error means the host is down, not the request bad."""
+        if isinstance(ex, cls.Down_Errors):
+            return True
+        if isinstance(ex, httpx.HTTPStatusError):
+            return ex.response.is_server_error
+        return isinstance(ex, ValueError) and bool(
+            cls.Down_Status.search(str(ex))
+        )
+
+    def check(self) -> None:
+        """Health check all hosts and refresh their loaded models."""
+        self.checked = time.monotonic()
+        for host in self.hosts:
+            try:
+                response = httpx.get(f"{host.url}/api/ps", timeout=2)
+                response.raise_for_status()
+                models = {
+                    model["name"].removesuffix(":latest")
+                    for model in response.json().get("models", [])
+                }
+            except (httpx.HTTPError, ValueError) as he:
+                if host.healthy:
+                    logging.warning(f"Ollama host {host.url} down: {he!r}")
+                with self.lock:
+                    host.healthy = False
+                continue
+            with self.lock:
+                host.healthy = True
+                host.models = models
+
+    def check_soon(self) -> None:
+        """Start a background health check when one is due."""
+        with self.lock:
+            due = time.monotonic() - self.checked > self.interval
+            if not due or (self.checking and self.checking.is_alive()):
+                return
+            # no other check starts before this one is done
+            self.checked = time.monotonic()
+            self.checking = threading.Thread(target=self.check, daemon=True)
+            self.checking.start()
+
+    def pick(
+        self,
+        model: str,
+        exclude: set[str] | None = None,
+        session: str = "",
+    ) -> OllamaHost:
+        """
+        Pick the host of a request.
+
+        :param model: Model name.
+        :param exclude: Host urls that already failed this request.
+        :param session: Conversation of the request, none when empty.
+        :raise ConnectionError: No healthy host is left.
+        """
+        self.check_soon()
+        with self.lock:
+            hosts = [
+                host
+                for host in self.hosts
+                if host.healthy and host.url not in (exclude or set())
+            ]
+            if not hosts:
+                raise ConnectionError(f"No Ollama host is up for {model}.")
+            pinned = [h for h in hosts if h.url == self.pins.get(session)]
+            if session and pinned:
+                self.pins.move_to_end(session)
+                pinned[0].outstanding += 1
+                return pinned[0]
+            least = min(host.outstanding for host in hosts)
+            loaded = [
+                host
+                for host in hosts
+                if model in host.models
+                and host.outstanding <= least + self.spill
+            ]
+            host = min(loaded or hosts, key=lambda h: h.outstanding)
+            host.outstanding += 1
+            if session:
+                self.pins[session] = host.url
+                self.pins.move_to_end(session)
+                if len(self.pins) > self.Pin_Size:
+                    self.pins.popitem(last=False)
+            return host
+
+    def done(self, host: OllamaHost, model: str, down: bool) -> None:
+        """Record the end of a request on a host, down if the host failed."""
+        with self.lock:
+            host.outstanding -= 1
+            if down:
+                host.failed += 1
+                host.healthy = False
+            else:
+                host.served += 1
+                host.models.add(model)
+
+    @contextmanager
+    def route(
+        self,
+        model: str,
+        exclude: set[str] | None = None,
+        session: str = "",
+    ) -> Iterator[OllamaHost]:
+        """Pick a host for the duration of a request."""
+        host = self.pick(model, exclude, session)
+        # a closed stream or a bad request is not a host failure
+        down = False
+        try:
+            yield host
+        except Exception as ex:
+            down = self.host_down(ex)
+            raise
+        finally:
+            self.done(host, model, down)
+
+    def __str__(self) -> str:
+        """State of all hosts."""
+        return "\n".join(str(host) for host in self.hosts)
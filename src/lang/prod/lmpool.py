@@ -0,0 +1,146 @@
+"""
+LM Pool Module.
+
+Version: 2026.10.18.03
+"""
+
+import logging
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import httpx
+from lang.prod.lm import OLM, EOMInfo
+
+
+class OLMPool:
+    """
+    OLMPool Class.
+
+    Reuse one OLM instance per EOM model and keep the models resident in
+    Ollama within a memory budget. When a model is acquired and the budget
+    would be exceeded, the least recently used models are unloaded by
+    sending keep_alive=0. A model held by a caller, e.g. streaming an
+    answer, is never evicted. A selected model starts warming up in the
+    background right away.
+    """
+
+    def __init__(
+        self,
+        budget: float = 64.0,
+        base_url: str = "http://localhost:11434",
+    ):
+        """
+        Class initialization.
+
+        :param budget: Memory budget of resident models in GB.
+        :param base_url: Ollama server.
+        """
+        self.budget = budget
+        self.base_url = base_url
+        # model name -> OLM instance
+        self.olms: dict[str, OLM] = {}
+        # model name -> resident GB, least recently used first
+        self.resident: OrderedDict[str, float] = OrderedDict()
+        # model name -> callers holding the model
+        self.held: dict[str, int] = {}
+
+    @property
+    def used(self) -> float:
+        """Resident memory in GB."""
+        return sum(self.resident.values())
+
+    def get(self, name: str, mn: str, warm: bool = True) -> OLM:
+        """Get the OLM instance of a model, marked as recently used."""
+        if mn not in self.olms:
+            self.olms[mn] = OLM(name, mn, base_url=self.base_url)
+        self.resident[mn] = self.resident.get(mn, EOMInfo.size(mn))
+        self.resident.move_to_end(mn)
+        if warm:
+            self.olms[mn].prewarm()
+        return self.olms[mn]
+
+    async def acquire(self, name: str, mn: str) -> OLM:
+        """Get the OLM instance of a model and make room for it."""
+        olm = self.get(name, mn, warm=False)
+        await self.refresh(mn)
+        while self.used > self.budget:
+            victim = next(
+                (m for m in self.resident if m != mn and not self.held.get(m)),
+                None,
+            )
+            if victim is None:
+                logging.warning(
+                    f"{mn} and the models in use exceed {self.budget} GB."
+                )
+                break
+            await self.evict(victim)
+        # warm up after making room
+        olm.prewarm()
+        return olm
+
+    @contextmanager
+    def hold(self, mn: str) -> Iterator[None]:
+        """Keep a model from being evicted while in use."""
+        self.held[mn] = self.held.get(mn, 0) + 1
+        try:
+            yield
+        finally:
+            self.held[mn] -= 1
+            if not self.held[mn]:
+                del self.held[mn]
+
+    async def refresh(self, keep: str) -> None:
+        """Sync the resident models with the models Ollama has loaded."""
+        try:
+            async with httpx.AsyncClient(base_url=self.base_url) as client:
+                response = await client.get("/api/ps", timeout=5)
+                response.raise_for_status()
+        except httpx.HTTPError as he:
+            logging.error(f"Ollama ps: {he!r}")
+            return
+
+        loaded: dict[str, float] = {}
+        for model in response.json().get("models", []):
+            mn = model["name"].removesuffix(":latest")
+            loaded[mn] = model.get("size", 0) / 1024**3 or EOMInfo.size(mn)
+        for mn in list(self.resident):
+            if mn != keep and mn not in loaded:
+                del self.resident[mn]
+                if mn in self.olms:
+                    # unloaded by Ollama after keep_alive
+                    self.olms[mn].cool()
+        for mn, size in loaded.items():
+            if mn not in self.resident:
+                # loaded outside this pool: evicted first
+                self.resident[mn] = size
+                self.resident.move_to_end(mn, last=False)
+            else:
+                self.resident[mn] = size
+
+    async def evict(self, mn: str) -> None:
+        """Unload a model from Ollama."""
+        self.resident.pop(mn, None)
+        if mn in self.olms:
+            self.olms[mn].cool()
+        try:
+            async with httpx.AsyncClient(base_url=self.base_url) as client:
+                response = await client.post(
+                    "/api/generate",
+                    json={"model": mn, "keep_alive": 0},
+                    timeout=30,
+                )
+                response.raise_for_status()
+        except httpx.HTTPError as he:
+            logging.error(f"Ollama unload {mn}: {he!r}")
+
+    def residency(self) -> dict[str, float]:
+        """Get the resident models and their GB, least recently used first."""
+        return dict(self.resident)
+
+    def __str__(self) -> str:
+        """Pool residency."""
+        models = ", ".join(
+            f"{mn} {gb:.1f}GB" for mn, gb in self.resident.items()
+        )
+        return f"Resident {self.used:.1f}/{self.budget:.1f}GB: {models}"
@@ -0,0 +1,210 @@
+"""
+LM Tune Module.
+
+Version: 2026.10.18.03
+"""
+
+import json
+import logging
+import os
+import shutil
+import socket
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+
+class OLMTune:
+    """
+    OLMTune Class.
+
+    Benchmark Ollama runtime options of a model on the current host and
+    keep the best profile per (host, model) in cfg/olm-tune.json. Options
+    are tuned one at a time with the others at their best value so far,
+    so a model needs a handful of runs instead of the whole grid.
+    """
+
+    File: Path = Path("cfg/olm-tune.json")
+
+    # Reference request: the profile with the shortest time wins
+    Prompt_Tokens: int = 512
+    Predict_Tokens: int = 128
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        path: Path = File,
+    ):
+        """
+        Class initialization.
+
+        :param base_url: Ollama server to tune.
+        :param path: Profile file.
+        """
+        self.base_url = base_url
+        self.path = path
+        self.host = OLMTune.host_of(base_url)
+        cores = os.cpu_count() or 4
+        # physical cores are usually half the logical ones
+        threads = list(
+            dict.fromkeys([max(1, cores // 2), cores, max(1, cores // 4)])
+        )
+        # option -> candidate values, the first one is the start point
+        self.grid: dict[str, list[Any]] = {
+            "num_thread": threads,
+            "num_batch": [512, 128, 1024],
+            "use_mmap": [True, False],
+        }
+        # GPU offload is only benchmarked where a GPU is found, elsewhere
+        # Ollama decides: a profile never forces CPU-only inference
+        if shutil.which("nvidia-smi"):
+            self.grid["num_gpu"] = [0, 999]
+        # a long enough prompt that prompt eval dominates its time
+        self.prompt = " ".join(
+            f"Line {i}: the quick brown fox jumps over the lazy dog."
+            for i in range(self.Prompt_Tokens // 14)
+        )
+        # reference requests sent, each prompt starts with its number
+        self.runs = 0
+
+    @staticmethod
+    def host_of(base_url: str) -> str:
+        """Get the host name of an Ollama server."""
+        host = urlsplit(base_url).hostname or "localhost"
+        if host in {"localhost", "127.0.0.1", "::1"}:
+            return socket.gethostname()
+        return host
+
+    @staticmethod
+    def load(path: Path = File) -> dict[str, dict[str, dict[str, Any]]]:
+        """Load the profiles: host -> model -> profile."""
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text())
+
+    @staticmethod
+    def profile(
+        mn: str,
+        base_url: str = "http://localhost:11434",
+        path: Path = File,
+    ) -> dict[str, Any]:
+        """Get the tuned Ollama options of a model, empty if not tuned."""
+        found = OLMTune.load(path).get(OLMTune.host_of(base_url), {})
+        return found.get(mn, {}).get("options", {})
+
+    def run(self, mn: str, options: dict[str, Any]) -> dict[str, float]:
+        """
+        Run the reference request with some options.
+
+        The first request after an option change reloads the model, its
+        load time is reported by Ollama separately and is not counted.
+        Each prompt is new to the KV cache, but Ollama leaves out the counts
+        it did not measure: they count as no tokens.
+
+        :return: Prompt eval and generation tokens per second and the
+            reference request seconds.
+        """
+        self.runs += 1
+        response = httpx.post(
+            f"{self.base_url}/api/generate",
+            json={
+                "model": mn,
+                "prompt": f"Run {self.runs}. {self.prompt}",
+                "stream": False,
+                "options": {
+                    **options,
+                    "num_ctx": 2048,
+                    "num_predict": self.Predict_Tokens,
+                    "temperature": 0,
+                    "seed": 1,
+                },
+            },
+            timeout=1800,
+        )
+        response.raise_for_status()
+        info = response.json()
+        prompt_s = info.get("prompt_eval_duration", 0) / 1e9
+        eval_s = info.get("eval_duration", 0) / 1e9
+        prompt_tps = (
+            info.get("prompt_eval_count", 0) / prompt_s if prompt_s else 0.0
+        )
+        eval_tps = info.get("eval_count", 0) / eval_s if eval_s else 0.0
+        if not eval_tps:
+            raise ValueError(f"Ollama {mn} generated no tokens: {info}")
+        return {
+            "prompt_tps": round(prompt_tps, 1),
+            "eval_tps": round(eval_tps, 1),
+            "seconds": round(
+                (self.Prompt_Tokens / prompt_tps if prompt_tps else 0.0)
+                + self.Predict_Tokens / eval_tps,
+                3,
+            ),
+        }
+
+    def try_run(
+        self, mn: str, options: dict[str, Any]
+    ) -> dict[str, float] | None:
+        """Run the reference request, None if it fails."""
+        try:
+            result = self.run(mn, options)
+        except (httpx.HTTPError, ValueError) as ex:
+            logging.error(f"Ollama {mn} {options}: {ex!r}")
+            return None
+        print(f"{mn} {options}: {result}")
+        return result
+
+    def tune(self, mn: str) -> dict[str, Any]:
+        """
+        Tune the options of a model: coordinate descent over the grid.
+
+        A failed run is skipped, the start point too: the first run that
+        succeeds is the best so far.
+
+        :raise RuntimeError: No run succeeded.
+        """
+        best = {option: values[0] for option, values in self.grid.items()}
+        result = self.try_run(mn, best)
+        for option, values in self.grid.items():
+            for value in values[1:]:
+                options = {**best, option: value}
+                tried = self.try_run(mn, options)
+                if tried is not None and (
+                    result is None or tried["seconds"] < result["seconds"]
+                ):
+                    best, result = options, tried
+        if result is None:
+            raise RuntimeError(f"No Ollama {mn} run succeeded.")
+        return {"options": best, **result}
+
+    def save(self, mn: str, profile: dict[str, Any]) -> None:
+        """Save the profile of a model on this host."""
+        profiles = OLMTune.load(self.path)
+        profiles.setdefault(self.host, {})[mn] = profile
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(profiles, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    import sys
+
+    from lang.prod.lm import EOM
+
+    # python lmtune.py [EOM names, all by default] [--url ollama url]
+    args = sys.argv[1:]
+    url = "http://localhost:11434"
+    if "--url" in args:
+        at = args.index("--url")
+        url = args[at + 1]
+        del args[at : at + 2]
+    tuner = OLMTune(url)
+    for name in args or [eom.name for eom in EOM]:
+        model = EOM[name].value
+        try:
+            found = tuner.tune(model)
+        except RuntimeError as error:
+            print(f"Skip {model}: {error!r}")
+            continue
+        tuner.save(model, found)
+        print(f"{tuner.host} {model} best: {found}\n")
@@ -1,7 +1,7 @@
 """
 Smart Platform Project: prompt module.
 
-Version: 2024.07.17.01
+Version: 2026.10.18.01
 """
 
 
@@ -27,3 +27,12 @@ class Prompt:
         "relevant pages and subpages."
         "Try you best to show me an answer from the website links below.\n"
     )
+
+    History_Summary: str = (
+        "You summarise a conversation between a user and an AI assistant. "
+        "Merge the summary so far with the conversation to add into one "
+        "short summary. Keep names, numbers, links, decisions and open "
+        "questions. Reply with the summary only.\n"
+    )
+
+    History_Prefix: str = "Summary of the earlier conversation:\n"
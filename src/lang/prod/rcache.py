@@ -0,0 +1,273 @@
+"""
+LLM Response Cache Module.
+
+Version: 2026.10.18.02
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import BaseMessage
+
+
+class ResponseCache:
+    """
+    ResponseCache Class.
+
+    Two tier LLM answer cache in SQLite. The exact tier is keyed on the
+    model, system prompt, normalised message list and sampling options.
+    The semantic tier reuses the answer of an embedding-near question,
+    only for the first question of a context and at a low temperature,
+    where answers are close to deterministic. Entries expire after a time
+    to live, and the least recently used ones are evicted over the size
+    limit.
+    """
+
+    Schema: str = """
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            scope TEXT NOT NULL,
+            question TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            vector BLOB,
+            created REAL NOT NULL,
+            used REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+    """
+
+    def __init__(
+        self,
+        path: Path = Path("out/rcache.sqlite"),
+        embeddings: Embeddings | None = None,
+        threshold: float = 0.95,
+        max_temp: float = 0.2,
+        size: int = 10000,
+        ttl: float = 7 * 86400,
+    ):
+        """
+        Class initialization.
+
+        :param path: Cache database file.
+        :param embeddings: Question embeddings, no semantic tier if None.
+        :param threshold: Min cosine similarity of a semantic hit.
+        :param max_temp: Max temperature of the semantic tier.
+        :param size: Max entries.
+        :param ttl: Seconds an entry stays valid, 0 for no limit.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_temp = max_temp
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(self.Schema)
+        self.conn.commit()
+        # scope -> (keys, normalised vectors) of the semantic tier
+        self.vectors: dict[str, tuple[list[str], np.ndarray]] = {}
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalise the case and white space of a text, symbols matter."""
+        return " ".join(text.lower().split())
+
+    @staticmethod
+    def key(
+        model: str,
+        system: str,
+        messages: Sequence[BaseMessage],
+        options: dict[str, Any],
+    ) -> str:
+        """Get the exact tier key of a request."""
+        body = json.dumps(
+            [
+                model,
+                ResponseCache.normalize(system),
+                [
+                    (msg.type, ResponseCache.normalize(str(msg.content)))
+                    for msg in messages
+                ],
+                options,
+            ],
+            sort_keys=True,
+        )
+        return hashlib.sha1(body.encode()).hexdigest()
+
+    @staticmethod
+    def scope(model: str, system: str, options: dict[str, Any]) -> str:
+        """Get the semantic tier scope: the same model, prompt and options."""
+        body = json.dumps(
+            [model, ResponseCache.normalize(system), options], sort_keys=True
+        )
+        return hashlib.sha1(body.encode()).hexdigest()
+
+    def semantic(self, messages: Sequence[BaseMessage], temp: float) -> bool:
+        """Check if a request can use the semantic tier."""
+        return (
+            self.embeddings is not None
+            and temp <= self.max_temp
+            and len(messages) == 1
+        )
+
+    def get(
+        self,
+        model: str,
+        system: str,
+        messages: Sequence[BaseMessage],
+        options: dict[str, Any],
+    ) -> str | None:
+        """Get the cached answer of a request, None for a miss."""
+        key = ResponseCache.key(model, system, messages, options)
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT answer, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.valid(row[1], now):
+                self.touch(key, now)
+                self.exact_hits += 1
+                return row[0]
+
+        temp = float(options.get("temperature", 1.0))
+        if not self.semantic(messages, temp):
+            self.misses += 1
+            return None
+        found = self.nearest(
+            ResponseCache.scope(model, system, options),
+            str(messages[-1].content),
+        )
+        with self.lock:
+            if found is not None:
+                row = self.conn.execute(
+                    "SELECT answer, created FROM responses WHERE key = ?",
+                    (found,),
+                ).fetchone()
+                if row is not None and self.valid(row[1], now):
+                    self.touch(found, now)
+                    self.semantic_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        model: str,
+        system: str,
+        messages: Sequence[BaseMessage],
+        options: dict[str, Any],
+        answer: str,
+    ) -> None:
+        """Put the answer of a request."""
+        key = ResponseCache.key(model, system, messages, options)
+        scope = ResponseCache.scope(model, system, options)
+        question = str(messages[-1].content) if messages else ""
+        vector = None
+        temp = float(options.get("temperature", 1.0))
+        if self.semantic(messages, temp):
+            vector = self.embed(question)
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, scope, question, "
+                "answer, vector, created, used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    scope,
+                    question,
+                    answer,
+                    None if vector is None else vector.tobytes(),
+                    now,
+                    now,
+                ),
+            )
+            self.evict(now)
+            # reloaded on the next semantic lookup
+            self.vectors.pop(scope, None)
+
+    def valid(self, created: float, now: float) -> bool:
+        """Check if an entry is within its time to live."""
+        return not self.ttl or now - created < self.ttl
+
+    def touch(self, key: str, now: float) -> None:
+        """Mark an entry as used, called with the lock held."""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE responses SET used = ? WHERE key = ?", (now, key)
+            )
+
+    def evict(self, now: float) -> None:
+        """Evict expired and least recently used entries, in a transaction."""
+        if self.ttl:
+            self.conn.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+            )
+        self.conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+            "ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.size,),
+        )
+
+    def embed(self, text: str) -> np.ndarray:
+        """Get the normalised float32 embedding of a question."""
+        if self.embeddings is None:
+            raise ValueError("The semantic tier has no embeddings.")
+        vector = np.asarray(
+            self.embeddings.embed_query(ResponseCache.normalize(text)),
+            dtype=np.float32,
+        )
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def nearest(self, scope: str, question: str) -> str | None:
+        """Get the key of the nearest question above the threshold."""
+        with self.lock:
+            if scope not in self.vectors:
+                rows = self.conn.execute(
+                    "SELECT key, vector FROM responses "
+                    "WHERE scope = ? AND vector IS NOT NULL",
+                    (scope,),
+                ).fetchall()
+                keys = [row[0] for row in rows]
+                matrix = (
+                    np.stack(
+                        [np.frombuffer(row[1], np.float32) for row in rows]
+                    )
+                    if rows
+                    else np.zeros((0, 0), np.float32)
+                )
+                self.vectors[scope] = (keys, matrix)
+            keys, matrix = self.vectors[scope]
+        if not keys:
+            return None
+        scores = matrix @ self.embed(question)
+        best = int(np.argmax(scores))
+        return keys[best] if scores[best] >= self.threshold else None
+
+    @property
+    def hit_rate(self) -> float:
+        """Hit rate of both tiers."""
+        total = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / total if total else 0.0
+
+    def __str__(self) -> str:
+        """Cache stats."""
+        total = self.exact_hits + self.semantic_hits + self.misses or 1
+        return (
+            f"Response cache: {self.exact_hits / total:.1%} exact, "
+            f"{self.semantic_hits / total:.1%} semantic, "
+            f"{self.misses / total:.1%} misses, "
+            f"hit rate {self.hit_rate:.1%}"
+        )
@@ -0,0 +1,297 @@
+"""
+LM Scheduler Module.
+
+Version: 2026.10.18.02
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from enum import IntEnum
+from typing import Any
+
+import numpy as np
+
+
+class Priority(IntEnum):
+    """Request priorities, the lowest value is served first."""
+
+    INTERACTIVE = 0
+    BATCH = 1
+
+
+class SchedulerBusyError(RuntimeError):
+    """The queue of a model is full: try again later."""
+
+
+class Ticket:
+    """Ticket Class: one request waiting for or holding a model slot."""
+
+    def __init__(
+        self,
+        model: str,
+        session: str,
+        priority: Priority,
+        host: str = "",
+    ):
+        """Class initialization."""
+        self.model = model
+        self.session = session
+        # Ollama server of the request, the only one when empty
+        self.host = host
+        # slots and queues: of a model on a host
+        self.key = f"{model}@{host}" if host else model
+        self.priority = Priority(priority)
+        self.queued = time.perf_counter()
+        # set when the request gets its slot
+        self.started: float | None = None
+        # wake up the waiting caller, set before queueing
+        self.wake: Callable[[], None] = lambda: None
+
+
+class Scheduler:
+    """
+    Scheduler Class.
+
+    Admission control in front of Ollama. Each model runs at most its
+    number of parallel slots of requests on each host, which should match
+    the Ollama OLLAMA_NUM_PARALLEL, and the others wait in the queue of
+    the model on the host. A request is admitted after it is routed, so
+    with several hosts a model runs its slots on every one of them. Waiting
+    interactive requests go before batch ones, and within a priority the
+    sessions take turns, so one long batch or chat does not hold up the
+    others. A full queue rejects new requests with SchedulerBusyError rather
+    than piling them up. The queue wait and the generation time are
+    recorded apart, per model and host.
+
+    It serves threads and event loops alike: a waiting thread blocks on
+    an event, a waiting task awaits a future.
+    """
+
+    # Timing samples kept per model and host
+    Samples: int = 10000
+
+    def __init__(
+        self,
+        parallel: int = 4,
+        limits: dict[str, int] | None = None,
+        max_queue: int = 64,
+    ):
+        """
+        Class initialization.
+
+        :param parallel: Requests running at once per model and host.
+        :param limits: Parallel requests of some models on a host, e.g.
+            the large ones that do not fit more KV caches in memory.
+        :param max_queue: Requests waiting per model and host before
+            rejecting.
+        """
+        self.parallel = parallel
+        self.limits = limits or {}
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        # model@host keys below, the model alone for a single host
+        # key -> parallel slots
+        self.slots: dict[str, int] = {}
+        # key -> requests running
+        self.running: dict[str, int] = {}
+        # key -> priority -> session -> waiting tickets, in turn order
+        self.queues: dict[
+            str, dict[Priority, OrderedDict[str, deque[Ticket]]]
+        ] = {}
+        # key -> seconds waited, seconds generating, requests rejected
+        self.waits: dict[str, deque[float]] = {}
+        self.gens: dict[str, deque[float]] = {}
+        self.rejected: dict[str, int] = {}
+
+    def limit(self, model: str) -> int:
+        """Get the parallel slots of a model."""
+        return self.limits.get(model, self.parallel)
+
+    def depth(self, key: str) -> int:
+        """Get the requests waiting for a model on a host."""
+        return sum(
+            len(tickets)
+            for sessions in self.queues.get(key, {}).values()
+            for tickets in sessions.values()
+        )
+
+    def enqueue(self, ticket: Ticket) -> bool:
+        """
+        Admit a request.
+
+        :return: True if it runs right away, False if it waits.
+        :raise SchedulerBusyError: The model queue is full.
+        """
+        key = ticket.key
+        with self.lock:
+            self.slots[key] = self.limit(ticket.model)
+            running = self.running.get(key, 0)
+            waiting = self.depth(key)
+            if running < self.slots[key] and not waiting:
+                self.start(ticket)
+                return True
+            if waiting >= self.max_queue:
+                self.rejected[key] = self.rejected.get(key, 0) + 1
+                raise SchedulerBusyError(
+                    f"{key}: {waiting} requests waiting, try again later."
+                )
+            sessions = self.queues.setdefault(key, {}).setdefault(
+                ticket.priority, OrderedDict()
+            )
+            sessions.setdefault(ticket.session, deque()).append(ticket)
+            return False
+
+    def start(self, ticket: Ticket) -> None:
+        """Give a request its slot, called with the lock held."""
+        ticket.started = time.perf_counter()
+        self.running[ticket.key] = self.running.get(ticket.key, 0) + 1
+        self.waits.setdefault(ticket.key, deque(maxlen=self.Samples)).append(
+            ticket.started - ticket.queued
+        )
+
+    def next(self, key: str) -> Ticket | None:
+        """Take the next waiting request, called with the lock held."""
+        for priority in sorted(self.queues.get(key, {})):
+            sessions = self.queues[key][priority]
+            if not sessions:
+                continue
+            # the first session in turn order goes to the back
+            session, tickets = next(iter(sessions.items()))
+            ticket = tickets.popleft()
+            del sessions[session]
+            if tickets:
+                sessions[session] = tickets
+            return ticket
+        return None
+
+    def remove(self, ticket: Ticket) -> bool:
+        """Take back a request still waiting, False if it got its slot."""
+        with self.lock:
+            if ticket.started is not None:
+                return False
+            sessions = self.queues[ticket.key][ticket.priority]
+            sessions[ticket.session].remove(ticket)
+            if not sessions[ticket.session]:
+                del sessions[ticket.session]
+            return True
+
+    def release(self, ticket: Ticket) -> None:
+        """Free the slot of a request and start the next one."""
+        now = time.perf_counter()
+        key = ticket.key
+        with self.lock:
+            self.running[key] -= 1
+            self.gens.setdefault(key, deque(maxlen=self.Samples)).append(
+                now - (ticket.started or now)
+            )
+            woken = []
+            while self.running[key] < self.slots[key]:
+                waiting = self.next(key)
+                if waiting is None:
+                    break
+                self.start(waiting)
+                woken.append(waiting)
+        for waiting in woken:
+            waiting.wake()
+        logging.info(
+            f"Scheduler {key} {ticket.priority.name.lower()} "
+            f"{ticket.session}: waited "
+            f"{(ticket.started or now) - ticket.queued:.3f}s, "
+            f"generated {now - (ticket.started or now):.3f}s"
+        )
+
+    @contextmanager
+    def slot(
+        self,
+        model: str,
+        session: str = "",
+        priority: Priority = Priority.INTERACTIVE,
+        host: str = "",
+    ) -> Iterator[Ticket]:
+        """Hold a model slot on a host for a request, waiting in a thread."""
+        ticket = Ticket(model, session, priority, host)
+        event = threading.Event()
+        ticket.wake = event.set
+        if not self.enqueue(ticket):
+            event.wait()
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def aslot(
+        self,
+        model: str,
+        session: str = "",
+        priority: Priority = Priority.INTERACTIVE,
+        host: str = "",
+    ) -> AsyncIterator[Ticket]:
+        """Hold a model slot on a host for a request, waiting in a task."""
+        ticket = Ticket(model, session, priority, host)
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[None] = loop.create_future()
+
+        def wake() -> None:
+            if not future.done():
+                future.set_result(None)
+
+        # woken from the thread that releases a slot
+        ticket.wake = lambda: loop.call_soon_threadsafe(wake)
+        if not self.enqueue(ticket):
+            try:
+                await future
+            except asyncio.CancelledError:
+                # cancelled in the queue, or right after getting the slot
+                if not self.remove(ticket):
+                    self.release(ticket)
+                raise
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Get the running, waiting and timing stats of each model@host."""
+
+        def percentile(samples: deque[float] | None, q: int) -> float | None:
+            if not samples:
+                return None
+            return float(np.percentile(np.array(samples), q))
+
+        with self.lock:
+            keys = set(self.running) | set(self.queues) | set(self.rejected)
+            return {
+                key: {
+                    "running": self.running.get(key, 0),
+                    "slots": self.slots.get(key, self.parallel),
+                    "waiting": self.depth(key),
+                    "rejected": self.rejected.get(key, 0),
+                    "wait_p50": percentile(self.waits.get(key), 50),
+                    "wait_p99": percentile(self.waits.get(key), 99),
+                    "gen_p50": percentile(self.gens.get(key), 50),
+                    "gen_p99": percentile(self.gens.get(key), 99),
+                }
+                for key in sorted(keys)
+            }
+
+    def __str__(self) -> str:
+        """Scheduler stats."""
+
+        def seconds(value: float | None) -> str:
+            return "-" if value is None else f"{value:.2f}s"
+
+        return "\n".join(
+            f"{key}: {s['running']}/{s['slots']} running, "
+            f"{s['waiting']} waiting, {s['rejected']} rejected, "
+            f"wait p50 {seconds(s['wait_p50'])} "
+            f"p99 {seconds(s['wait_p99'])}, "
+            f"generation p50 {seconds(s['gen_p50'])} "
+            f"p99 {seconds(s['gen_p99'])}"
+            for key, s in self.stats().items()
+        )
@@ -0,0 +1,37 @@
+"""
+Smart Platform Project: tokens module.
+
+Version: 2026.10.18.02
+"""
+
+import re
+
+
+class Tokens:
+    """Tokens Class: fast local text tokenization."""
+
+    # a CJK character or a run of letters and digits
+    Word: re.Pattern = re.compile(
+        r"[\u3040-\u30ff\u3400-\u9fff]|[^\W_\u3040-\u30ff\u3400-\u9fff]+"
+    )
+
+    # a punctuation or symbol character
+    Symbol: re.Pattern = re.compile(r"[^\w\s]")
+
+    @staticmethod
+    def words(text: str) -> list[str]:
+        """Split a text into lower case words, one CJK character each."""
+        return Tokens.Word.findall(text.lower())
+
+    @staticmethod
+    def estimate(text: str) -> int:
+        """
+        Estimate the LLM token count of a text without a tokenizer.
+
+        A word is one token plus one per 6 more characters, a CJK
+        character or a symbol is one token.
+        """
+        words = Tokens.Word.findall(text)
+        return sum(1 + len(word) // 6 for word in words) + len(
+            Tokens.Symbol.findall(text)
+        )
@@ -0,0 +1,91 @@
+"""
+Shared test fixtures.
+
+Version: 2026.10.18.03
+"""
+
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubOllama(BaseHTTPRequestHandler):
+    """
+    Stub of the Ollama API.
+
+    A chat answers with the server port, or fails with the status of the
+    server. The prompt eval count is the number of chat messages. The
+    request bodies are kept in order, /api/ps lists the loaded models.
+    """
+
+    status: int = 200
+    bodies: list[dict] = []
+    loaded: list[dict] = []
+
+    def log_message(self, *args) -> None:
+        """Quiet."""
+
+    def send(self, status: int, body: str, kind: str) -> None:
+        """Send a whole reply."""
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        """Handle /api/ps."""
+        self.send(200, json.dumps({"models": self.loaded}), "application/json")
+
+    def do_POST(self) -> None:
+        """Handle /api/chat and /api/generate."""
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.bodies.append({"path": self.path, **body})
+        if self.status != 200:
+            self.send(self.status, "stub error", "text/plain")
+            return
+        if self.path != "/api/chat":
+            self.send(200, json.dumps({"done": True}), "application/json")
+            return
+        port = self.server.server_address[1]
+        lines = [
+            {"message": {"role": "assistant", "content": f"{port}"}},
+            {
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "prompt_eval_count": len(body["messages"]),
+                "prompt_eval_duration": 1_000_000,
+            },
+        ]
+        self.send(
+            200,
+            "".join(json.dumps(line) + "\n" for line in lines),
+            "application/x-ndjson",
+        )
+
+
+@pytest.fixture
+def servers() -> Iterator[list[ThreadingHTTPServer]]:
+    """Get two stub Ollama servers, each with its own status."""
+    started = []
+    for _ in range(2):
+        handler = type(
+            "Stub", (StubOllama,), {"status": 200, "bodies": [], "loaded": []}
+        )
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        started.append(server)
+    yield started
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def urls(servers: list[ThreadingHTTPServer]) -> list[str]:
+    """Get the base urls of the stub Ollama servers."""
+    return [f"http://127.0.0.1:{s.server_address[1]}" for s in servers]
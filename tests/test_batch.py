@@ -0,0 +1,141 @@
+"""
+BatchQA tests.
+
+Version: 2026.10.18.02
+"""
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from lang.prod.batch import BatchQA
+from lang.prod.lg import LG
+from lang.prod.lgsave import LGSaver
+from lang.prod.lm import OLM
+from lang.prod.rcache import ResponseCache
+from lang.prod.sched import Scheduler, SchedulerBusyError, Ticket
+from langchain_core.messages import HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+
+def write(path: Path, questions: list[str]) -> None:
+    """Write a questions JSONL file."""
+    path.write_text(
+        "".join(
+            json.dumps({"id": f"q{i}", "question": q}) + "\n"
+            for i, q in enumerate(questions)
+        )
+    )
+
+
+def results(path: Path) -> dict[str, dict]:
+    """Get the result records of an output JSONL file by ID."""
+    lines = path.read_text().splitlines()
+    return {item["id"]: item for item in map(json.loads, lines)}
+
+
+@pytest.mark.parametrize("mode", ["lc", "lg"])
+def test_run_and_resume(urls: list[str], tmp_path: Path, mode: str):
+    """All questions are answered once, a second run skips them."""
+    src, dst = tmp_path / "q.jsonl", tmp_path / "out" / "r.jsonl"
+    write(src, ["One?", "Two?", "Three?"])
+    asyncio.run(
+        BatchQA(OLM("L008", "llama3.1", base_url=urls[0]), mode).run(src, dst)
+    )
+    done = results(dst)
+    port = urls[0].rsplit(":", 1)[1]
+    assert sorted(done) == ["q0", "q1", "q2"]
+    assert all(item["answer"] == port for item in done.values())
+
+    # a torn last line of a killed run is not taken as answered
+    with dst.open("a") as out:
+        out.write('{"id": "q3", "ans')
+    write(src, ["One?", "Two?", "Three?", "Four?"])
+    batch = BatchQA(OLM("L008", "llama3.1", base_url=urls[0]), mode)
+    asyncio.run(batch.run(src, dst))
+    assert (batch.skipped, batch.answered) == (3, 1)
+    assert "q3" in BatchQA.finished(dst)
+
+
+def test_lc_prompt(urls: list[str], tmp_path: Path):
+    """The LC chain sends the system prompt, or the one of the caller."""
+    olm = OLM("L008", "llama3.1", base_url=urls[0])
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", "Be short."),
+            ("human", "Context."),
+            ("human", "{question}"),
+        ]
+    )
+    sent = []
+    for batch in (BatchQA(olm, "lc"), BatchQA(olm, "lc", prompt=prompt)):
+        asyncio.run(batch.answer("q0", "One?"))
+        sent.append(olm.stats.info["prompt_eval_count"])
+    # the stub evaluates one token per message
+    assert sent == [2, 3]
+
+
+def test_chain_of_caller(urls: list[str], tmp_path: Path):
+    """A chain of the caller gets the question and streams the answer."""
+    src, dst = tmp_path / "q.jsonl", tmp_path / "r.jsonl"
+    write(src, ["One?", "Two?"])
+    olm = OLM("L008", "llama3.1", base_url=urls[0])
+    asked = []
+
+    def question(text: str) -> list[HumanMessage]:
+        asked.append(text)
+        return [HumanMessage(text)]
+
+    # messages streamed, or strings
+    for chain in (
+        RunnableLambda(question) | olm.get_llm(),
+        RunnableLambda(question) | olm.get_llm() | StrOutputParser(),
+    ):
+        dst.unlink(missing_ok=True)
+        batch = BatchQA(olm, "lg", chain=chain)
+        asyncio.run(batch.run(src, dst))
+        assert batch.mode == "lc"
+        port = urls[0].rsplit(":", 1)[1]
+        assert {item["answer"] for item in results(dst).values()} == {port}
+    assert sorted(asked) == ["One?", "One?", "Two?", "Two?"]
+
+
+def test_busy_retry_saves_question_once(
+    urls: list[str], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    """A question rejected by a full queue is in its context once."""
+    src, dst = tmp_path / "q.jsonl", tmp_path / "r.jsonl"
+    write(src, ["One?"])
+    olm = OLM("L008", "llama3.1", base_url=urls[0])
+    lg = LG(
+        olm,
+        LGSaver.from_path(tmp_path / "lg.sqlite"),
+        ResponseCache(tmp_path / "rcache.sqlite"),
+    )
+    enqueue = Scheduler.enqueue
+    rejected = []
+
+    def busy(sched: Scheduler, ticket: Ticket) -> bool:
+        if not rejected:
+            rejected.append(ticket)
+            raise SchedulerBusyError("Full.")
+        return enqueue(sched, ticket)
+
+    monkeypatch.setattr(Scheduler, "enqueue", busy)
+    monkeypatch.setattr(BatchQA, "Busy_Retries", 2)
+    batch = BatchQA(olm, chain=lg)
+
+    async def run() -> list[str]:
+        await batch.run(src, dst)
+        state = await lg.graph.aget_state(
+            {"configurable": {"thread_id": "batch-q0"}}
+        )
+        await lg.saver.close()
+        return [msg.type for msg in state.values["messages"]]
+
+    assert asyncio.run(run()) == ["human", "ai"]
+    assert rejected
+    assert "answer" in results(dst)["q0"]
@@ -0,0 +1,151 @@
+"""
+ForumCrawler tests.
+
+Version: 2026.10.18.01
+"""
+
+import asyncio
+import threading
+import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from lang.aise.crawler import ForumCrawler, TokenBucket
+from lang.aise.foruminfo import ForumConfig
+
+
+class StubForum(BaseHTTPRequestHandler):
+    """Stub forum: replies with the queued statuses, then 200."""
+
+    # statuses of the next replies
+    statuses: list[int] = []
+    # paths requested, in order
+    paths: list[str] = []
+
+    def log_message(self, *args) -> None:
+        """Quiet."""
+
+    def do_GET(self) -> None:
+        """Reply with the next status."""
+        self.paths.append(self.path)
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = b"<html><body>Page</body></html>" if status == 200 else b""
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def forum() -> Iterator[type[StubForum]]:
+    """Get the handler of a stub forum, its url in its url attribute."""
+    handler = type("Forum", (StubForum,), {"statuses": [], "paths": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    handler.url = f"http://127.0.0.1:{server.server_address[1]}/"
+    yield handler
+    server.shutdown()
+    server.server_close()
+
+
+def test_bucket_burst_then_rate():
+    """A burst goes at once, then one request per 1/rate seconds."""
+    bucket = TokenBucket(rate=50, burst=3)
+
+    async def run(n: int) -> float:
+        start = time.perf_counter()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.perf_counter() - start
+
+    assert asyncio.run(run(3)) < 0.01
+    assert asyncio.run(run(2)) >= 0.035
+
+
+def test_bucket_refill_capped():
+    """An idle bucket refills at the rate, up to the burst."""
+    bucket = TokenBucket(rate=10, burst=3)
+
+    async def run(n: int) -> None:
+        for _ in range(n):
+            await bucket.acquire()
+
+    asyncio.run(run(3))
+    # idle for 0.2s: two tokens
+    bucket.updated -= 0.2
+    asyncio.run(run(2))
+    assert bucket.tokens == pytest.approx(0, abs=0.01)
+    # idle for a minute: the burst only
+    bucket.updated -= 60
+    asyncio.run(run(1))
+    assert bucket.tokens == pytest.approx(2, abs=0.01)
+
+
+def crawler_of(forum: type[StubForum]) -> ForumCrawler:
+    """Get a crawler of the stub forum with short backoffs."""
+    cfg = ForumConfig(
+        forum_name="stub",
+        forum_url=forum.url,
+        forum_user="user",
+        login_form="lsform",
+        base_path="forum.php",
+    )
+    fcr = ForumCrawler(cfg, rate=1000, burst=10, timeout=5)
+    fcr.Backoff = 0.01
+    return fcr
+
+
+def fetch(fcr: ForumCrawler, url: str) -> str | None:
+    """Fetch a page and close the client."""
+
+    async def run() -> str | None:
+        try:
+            return await fcr.fetch(url)
+        finally:
+            await fcr.scraper.client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_retry_with_backoff(forum: type[StubForum]):
+    """429 and 5xx responses are retried until the page comes."""
+    forum.statuses = [503, 429, 500]
+    fcr = crawler_of(forum)
+    assert fetch(fcr, forum.url + "page") == "<html><body>Page</body></html>"
+    assert forum.paths == ["/page"] * 4
+    assert (fcr.stats.pages, fcr.stats.retries, fcr.stats.errors) == (1, 3, 0)
+
+
+def test_retries_exhausted(forum: type[StubForum]):
+    """A page still failing after the retries is an error."""
+    forum.statuses = [502] * 10
+    fcr = crawler_of(forum)
+    assert fetch(fcr, forum.url + "page") is None
+    assert len(forum.paths) == fcr.Retries + 1
+    assert (fcr.stats.pages, fcr.stats.errors) == (0, 1)
+
+
+def test_client_error_not_retried(forum: type[StubForum]):
+    """A 404 fails at once."""
+    forum.statuses = [404]
+    fcr = crawler_of(forum)
+    assert fetch(fcr, forum.url + "page") is None
+    assert forum.paths == ["/page"]
+    assert (fcr.stats.retries, fcr.stats.errors) == (0, 1)
+
+
+def test_backoff(forum: type[StubForum]):
+    """The backoff doubles with jitter, Retry-After wins."""
+    fcr = crawler_of(forum)
+    fcr.Backoff = 1.0
+    for attempt in range(4):
+        assert (
+            0.5 * 2**attempt <= fcr.backoff(attempt, None) <= 1.5 * 2**attempt
+        )
+    response = httpx.Response(429, headers={"Retry-After": "7"})
+    assert fcr.backoff(0, response) == 7
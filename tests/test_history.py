@@ -0,0 +1,81 @@
+"""
+HistoryPolicy tests.
+
+Version: 2026.10.18.02
+"""
+
+import asyncio
+from http.server import ThreadingHTTPServer
+
+from lang.prod.history import HistoryPolicy
+from lang.prod.lm import EOM, EOMInfo
+from lang.prod.lmpool import OLMPool
+from langchain_core.messages import AIMessage, HumanMessage
+
+
+def state_of(turns: int) -> dict:
+    """Get the state of a conversation of some turns."""
+    messages = []
+    for turn in range(turns):
+        messages += [
+            HumanMessage(f"Question {turn} " + "word " * 40),
+            AIMessage(f"Answer {turn} " + "word " * 40),
+        ]
+    return {"messages": messages}
+
+
+def test_short_history_kept():
+    """A history within the budget is sent as is."""
+    state = state_of(2)
+    messages, update = HistoryPolicy("trim").apply(state)
+    assert messages == state["messages"]
+    assert update == {}
+
+
+def test_trim_keeps_recent_turns():
+    """Trimming drops the oldest messages down to half the budget."""
+    state = state_of(10)
+    policy = HistoryPolicy("trim", budget=200)
+    messages, update = policy.apply(state)
+    assert messages == state["messages"][update["summarized"] :]
+    assert len(messages) >= policy.keep
+    assert messages[-1] is state["messages"][-1]
+    assert update["summary"] == ""
+    # the next turn keeps the same cut
+    state |= update
+    state["messages"] += [HumanMessage("Next")]
+    assert policy.apply(state)[1] == {}
+
+
+def test_summary_model_from_pool(
+    servers: list[ThreadingHTTPServer], urls: list[str]
+):
+    """The summary model is acquired through the pool and counted in it."""
+    pool = OLMPool(base_url=urls[0])
+    policy = HistoryPolicy(budget=200, pool=pool)
+    messages, update = asyncio.run(policy.aapply(state_of(10)))
+    summary = str(servers[0].server_address[1])
+    assert update["summary"] == summary
+    assert summary in str(messages[0].content)
+    assert EOM.P003 in pool.residency()
+    assert policy.summarizer is None
+
+
+def test_summary_keeps_chat_model(
+    servers: list[ThreadingHTTPServer], urls: list[str]
+):
+    """Making room for the summary model never unloads the chat model."""
+    pool = OLMPool(budget=8, base_url=urls[0])
+    pool.get("A", EOM.L008, warm=False)
+    servers[0].RequestHandlerClass.loaded = [
+        {"name": EOM.L008, "size": int(EOMInfo.size(EOM.L008) * 1024**3)}
+    ]
+    policy = HistoryPolicy(budget=200, pool=pool)
+    asyncio.run(policy.aapply(state_of(10), EOM.L008, "a"))
+    assert list(pool.residency()) == [EOM.L008, EOM.P003]
+    assert not [
+        body
+        for body in servers[0].RequestHandlerClass.bodies
+        if body.get("keep_alive") == 0
+    ]
+    assert pool.held == {}
@@ -0,0 +1,191 @@
+"""
+IWEB tests.
+
+Version: 2026.10.18.01
+"""
+
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlencode
+
+import pytest
+from lang.imsg.iweb import IWEB
+from lang.prod.lgsave import LGSaver
+from lang.prod.lm import EOM
+from lang.prod.lmpool import OLMPool
+from lang.prod.rcache import ResponseCache
+
+
+@pytest.fixture
+def app(urls: list[str], tmp_path: Path) -> IWEB:
+    """Get an IWEB of a stub Ollama, without a semantic cache tier."""
+    return IWEB(
+        OLMPool(base_url=urls[0]),
+        saver=LGSaver.from_path(tmp_path / "lg.sqlite"),
+        cache=ResponseCache(tmp_path / "rcache.sqlite"),
+    )
+
+
+async def call(
+    app: IWEB,
+    method: str,
+    path: str,
+    query: dict[str, str] | None = None,
+    body: bytes = b"",
+    on_send: Callable[[dict[str, Any]], Awaitable[None]] | None = None,
+    gone: asyncio.Event | None = None,
+) -> tuple[int, list[tuple[str, Any]] | Any]:
+    """
+    Call the app in process.
+
+    :param on_send: Hook of each message sent by the app.
+    :param gone: Set when the client disconnects.
+    :return: The status, and the events of a stream or the JSON body.
+    """
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": urlencode(query or {}).encode(),
+        "headers": [],
+    }
+    requested = False
+    sent: list[dict[str, Any]] = []
+
+    async def receive() -> dict[str, Any]:
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await (gone or asyncio.Event()).wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict[str, Any]) -> None:
+        sent.append(message)
+        if on_send is not None:
+            await on_send(message)
+
+    await app(scope, receive, send)
+    status = sent[0]["status"]
+    data = b"".join(m.get("body", b"") for m in sent[1:]).decode()
+    headers = dict(sent[0]["headers"])
+    if headers[b"content-type"] != b"text/event-stream":
+        return status, json.loads(data)
+    events = []
+    for block in data.split("\n\n"):
+        if block:
+            name, payload = block.split("\n")
+            events.append(
+                (name.removeprefix("event: "), json.loads(payload[6:]))
+            )
+    return status, events
+
+
+async def saved(app: IWEB, cid: str) -> list[str]:
+    """Get the types of the saved messages of a context."""
+    lg = app.lgs["L008"]
+    state = await lg.graph.aget_state({"configurable": {"thread_id": cid}})
+    return [msg.type for msg in state.values.get("messages", [])]
+
+
+def test_chat_and_stats(app: IWEB, urls: list[str]):
+    """GET and POST chats stream tokens in one context, /stats counts them."""
+    port = urls[0].rsplit(":", 1)[1]
+
+    async def run() -> tuple:
+        first = await call(app, "GET", "/chat", {"q": "First?"})
+        cid = first[1][0][1]["cid"]
+        body = json.dumps({"q": "Second?", "cid": cid}).encode()
+        second = await call(app, "POST", "/chat", body=body)
+        stats = await call(app, "GET", "/stats")
+        messages = await saved(app, cid)
+        await app.saver.close()
+        return first, second, stats, messages
+
+    first, second, stats, messages = asyncio.run(run())
+    for status, events in (first, second):
+        assert status == 200
+        names = [name for name, _ in events]
+        assert names == ["session", "token", "done"]
+        assert events[1][1] == {"token": port}
+    assert second[1][0][1]["cid"] == first[1][0][1]["cid"]
+    assert messages == ["human", "ai", "human", "ai"]
+    status, data = stats
+    assert status == 200
+    assert (data["active"], data["served"], data["failed"]) == (0, 2, 0)
+    assert data["ttft_p50"] is not None
+
+
+@pytest.mark.parametrize(
+    ("method", "query", "body"),
+    [
+        ("GET", {}, b""),
+        ("GET", {"q": "Question?", "model": "X001"}, b""),
+        ("POST", {}, b"{not json"),
+        ("POST", {}, b"[1, 2]"),
+    ],
+)
+def test_bad_requests(app: IWEB, method: str, query: dict, body: bytes):
+    """A missing question, an unknown model or a bad body gets a 400."""
+    status, data = asyncio.run(call(app, method, "/chat", query, body))
+    assert status == 400
+    assert "error" in data
+    assert asyncio.run(call(app, "GET", "/nowhere"))[0] == 404
+
+
+def test_disconnect_stops_turn(app: IWEB):
+    """A client gone mid-stream cancels the turn and frees its model."""
+    gone = asyncio.Event()
+    held: list[dict[str, int]] = []
+
+    async def stall(message: dict[str, Any]) -> None:
+        if message.get("body", b"").startswith(b"event: token"):
+            held.append(dict(app.pool.held))
+            gone.set()
+            # the client reads no more
+            await asyncio.Event().wait()
+
+    async def run() -> tuple:
+        status, events = await call(
+            app,
+            "GET",
+            "/chat",
+            {"q": "Question?", "cid": "a"},
+            on_send=stall,
+            gone=gone,
+        )
+        messages = await saved(app, "a")
+        # the context is free for the next turn
+        again = await call(app, "GET", "/chat", {"q": "Again?", "cid": "a"})
+        after = await saved(app, "a")
+        await app.saver.close()
+        return events, messages, again, after
+
+    events, messages, again, after = asyncio.run(run())
+    assert held == [{EOM.L008: 1}]
+    assert [name for name, _ in events] == ["session", "token"]
+    assert messages == []
+    assert [name for name, _ in again[1]] == ["session", "token", "done"]
+    assert after == ["human", "ai"]
+    assert (app.active, app.served, app.failed) == (0, 1, 0)
+    assert app.pool.held == {}
+
+
+def test_turns_of_context_in_order(app: IWEB):
+    """Concurrent questions of one context run one after the other."""
+
+    async def run() -> list[str]:
+        await asyncio.gather(
+            *(
+                call(app, "GET", "/chat", {"q": f"Question {i}?", "cid": "a"})
+                for i in range(3)
+            )
+        )
+        messages = await saved(app, "a")
+        await app.saver.close()
+        return messages
+
+    assert asyncio.run(run()) == ["human", "ai"] * 3
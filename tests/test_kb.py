@@ -0,0 +1,113 @@
+"""
+KB tests.
+
+Version: 2026.10.18.02
+"""
+
+import asyncio
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from lang.prod.kbindex import KBIndex
+from lang.prod.kbvec import VectorIndex
+from langchain_core.embeddings import Embeddings
+
+pytest.importorskip("langchain_chroma")
+from lang.prod.kb import KB
+
+Text = (
+    "The quick brown fox jumps over the lazy dog while the farmer watches "
+    "from the old wooden porch and drinks his morning coffee slowly"
+)
+
+
+class Pages(BaseHTTPRequestHandler):
+    """Pages of a stub site, by path."""
+
+    pages: dict[str, str] = {}
+
+    def log_message(self, *args) -> None:
+        """Quiet."""
+
+    def do_GET(self) -> None:
+        """Send a page."""
+        body = f'<div class="post-content">{self.pages[self.path]}</div>'
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class WordEmbeddings(Embeddings):
+    """Embedding model of the text length and word count."""
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed documents."""
+        return [[float(len(text)), float(len(text.split()))] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query."""
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def site() -> Iterator[tuple[str, dict[str, str]]]:
+    """Get the base url and pages of a stub site."""
+    handler = type("Site", (Pages,), {"pages": {}})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", handler.pages
+    server.shutdown()
+    server.server_close()
+
+
+class ListSink:
+    """Sink recording the deleted chunk ids."""
+
+    def __init__(self):
+        """Class initialization."""
+        self.deleted: list[str] = []
+
+    def upsert(self, ids, docs, vectors) -> None:
+        """Insert chunks."""
+
+    def delete(self, ids: list[str]) -> None:
+        """Delete chunks."""
+        self.deleted += ids
+
+
+def test_reindex_deletes_tracked_chunks(tmp_path: Path):
+    """Chunks forgotten by a reindex are deleted from the store first."""
+    kb = KB(["http://a"], path=tmp_path)
+    ids = {KBIndex.chunk_id("http://a", t): KBIndex.text_hash(t) for t in "xy"}
+    kb.index.commit_page("http://a", "hash", ids)
+    sink = ListSink()
+
+    kb.reindex(sink)
+    assert sorted(sink.deleted) == sorted(ids)
+    assert kb.index.urls() == []
+    assert kb.index.all_chunk_ids() == []
+
+
+def test_dropped_duplicate_requeued(
+    tmp_path: Path, site: tuple[str, dict[str, str]]
+):
+    """A duplicate dropped for a chunk that is then removed gets indexed."""
+    base, pages = site
+    pages.update({"/a": Text, "/b": Text})
+    urls = [f"{base}/a", f"{base}/b"]
+    kb = KB(urls, path=tmp_path, store="numpy", parser="bs4")
+    sink = VectorIndex(tmp_path / "vec")
+    asyncio.run(kb.update(sink, WordEmbeddings()))
+    assert len(sink.get_rows()) == 1
+    assert kb.index.chunk_ids(urls[1]) == set()
+
+    pages["/a"] = "A new page about something else entirely."
+    asyncio.run(kb.update(sink, WordEmbeddings()))
+    assert len(sink.get_rows()) == 2
+    assert len(kb.index.chunk_ids(urls[1])) == 1
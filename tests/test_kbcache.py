@@ -0,0 +1,85 @@
+"""
+CachedRetriever tests.
+
+Version: 2026.10.18.01
+"""
+
+import asyncio
+
+import pytest
+from lang.prod import kbcache
+from lang.prod.kbcache import CachedRetriever, LRUCache
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class CountRetriever(BaseRetriever):
+    """Retriever counting its searches, the query is the document."""
+
+    searches: int = 0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        """Get the query as a document."""
+        self.searches += 1
+        return [Document(page_content=query)]
+
+
+def test_hits_and_normalised_keys():
+    """A query asked again, in any case or spacing, is a hit."""
+    inner = CountRetriever()
+    cached = CachedRetriever(retriever=inner, generation=lambda: 1)
+    first = cached.invoke("What is Ollama?")
+    assert cached.invoke("  what IS ollama ") == first
+    assert asyncio.run(cached.ainvoke("What is ollama")) == first
+    cached.invoke("Other question")
+    assert inner.searches == 2
+    assert (cached.cache.hits, cached.cache.misses) == (2, 2)
+    assert cached.cache.hit_rate == 0.5
+
+
+def test_new_generation_clears():
+    """Documents of an old index generation are not served."""
+    generation = [1]
+    inner = CountRetriever()
+    cached = CachedRetriever(retriever=inner, generation=lambda: generation[0])
+    cached.invoke("Question")
+    cached.invoke("Question")
+    generation[0] = 2
+    cached.invoke("Question")
+    assert inner.searches == 2
+    assert cached.seen == 2
+
+
+def test_ttl_expiry(monkeypatch: pytest.MonkeyPatch):
+    """An entry older than the time to live is a miss, and is dropped."""
+    now = [100.0]
+    monkeypatch.setattr(kbcache.time, "monotonic", lambda: now[0])
+    cache = LRUCache(size=4, ttl=10)
+    cache.put("a", 1)
+    now[0] += 9
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+    assert "a" not in cache.data
+    assert (cache.hits, cache.misses) == (1, 1)
+    # no time to live
+    forever = LRUCache(size=4, ttl=0)
+    forever.put("a", 1)
+    now[0] += 10**6
+    assert forever.get("a") == 1
+
+
+def test_lru_bound():
+    """A full cache evicts the least recently used entry."""
+    cache = LRUCache(size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert list(cache.data) == ["a", "c"]
+    assert cache.get("b") is None
+    cache.clear()
+    assert not cache.data
@@ -0,0 +1,57 @@
+"""
+MinHashDedup tests.
+
+Version: 2026.10.18.01
+"""
+
+from pathlib import Path
+
+from lang.prod.kbdedup import MinHashDedup
+from langchain_core.documents import Document
+
+Text = (
+    "The quick brown fox jumps over the lazy dog while the farmer watches "
+    "from the old wooden porch and drinks his morning coffee slowly"
+)
+
+
+def chunk(cid: str, text: str, url: str) -> Document:
+    """Get a chunk document."""
+    return Document(page_content=text, metadata={"id": cid, "source": url})
+
+
+def test_near_duplicates_dropped():
+    """A near duplicate is dropped, a different text is kept."""
+    dedup = MinHashDedup(0.8)
+    kept = dedup.filter(
+        [
+            chunk("a", Text, "http://a"),
+            chunk("b", Text.upper() + "!", "http://b"),
+            chunk("c", "Completely different words about stock markets.", ""),
+        ]
+    )
+    assert [doc.metadata["id"] for doc in kept] == ["a", "c"]
+    assert dedup.dropped == 1
+    assert dedup.duplicate("a", Text) is None
+
+
+def test_removed_kept_chunk_returns_dropped_pages():
+    """Removing a kept chunk gives the pages of its dropped duplicates."""
+    dedup = MinHashDedup(0.8)
+    dedup.filter([chunk("a", Text, "http://a"), chunk("b", Text, "http://b")])
+    assert dedup.remove(["b"]) == set()
+    assert dedup.remove(["a"]) == {"http://b"}
+    # the duplicate is kept once the original is gone
+    assert dedup.duplicate("b", Text, "http://b") is None
+
+
+def test_save_load(tmp_path: Path):
+    """Signatures and dropped duplicates survive a reload."""
+    path = tmp_path / "minhash.npz"
+    dedup = MinHashDedup(0.8, path=path)
+    dedup.filter([chunk("a", Text, "http://a"), chunk("b", Text, "http://b")])
+    dedup.save()
+
+    loaded = MinHashDedup(0.8, path=path)
+    assert loaded.duplicate("c", Text) == "a"
+    assert loaded.remove(["a"]) == {"http://b"}
@@ -0,0 +1,73 @@
+"""
+EmbeddingCache tests.
+
+Version: 2026.10.18.01
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from lang.prod.kbembed import EmbeddingCache
+from langchain_core.embeddings import Embeddings
+
+
+class CountEmbeddings(Embeddings):
+    """Embedding model counting the embedded texts."""
+
+    def __init__(self):
+        """Class initialization."""
+        self.count = 0
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed a text as its length and word count."""
+        self.count += len(texts)
+        return [[float(len(text)), float(len(text.split()))] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query."""
+        return self.embed_documents([text])[0]
+
+
+def test_misses_only_hit_the_model(tmp_path: Path):
+    """Cached texts are not embedded again, after a reopen too."""
+    model = CountEmbeddings()
+    cache = EmbeddingCache("m", tmp_path, 1, model)
+    first = cache.embed_documents(["a b", "c", "a  b"])
+    assert model.count == 2
+    assert first[0] == first[2]
+    cache.embed_documents(["c", "d e f"])
+    assert model.count == 3
+    cache.flush()
+
+    again = CountEmbeddings()
+    reopened = EmbeddingCache("m", tmp_path, 1, again)
+    assert reopened.embed_documents(["d e f", "a b"]) == [
+        [5.0, 3.0],
+        [3.0, 2.0],
+    ]
+    assert again.count == 0
+
+
+def test_eviction(tmp_path: Path):
+    """A full cache evicts the least recently used slots."""
+    cache = EmbeddingCache("m", tmp_path, 1, CountEmbeddings())
+    # 2 float32 per vector, 16 slots
+    cache.max_bytes = 16 * 8
+    cache.embed_documents([f"text {i}" for i in range(16)])
+    cache.embed_documents(["text 0"])
+    cache.embed_documents(["new"])
+    # 1/8 of the cache goes at once, the text used again stays
+    assert cache.key("text 0") in cache.slots
+    assert cache.key("new") in cache.slots
+    assert len(cache.slots) == 15
+
+
+def test_concurrent_batches(tmp_path: Path):
+    """Threads embedding the same texts at once keep one slot per text."""
+    cache = EmbeddingCache("m", tmp_path, 1, CountEmbeddings())
+    texts = [f"text {i}" for i in range(50)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(cache.embed_documents, [texts] * 8))
+    assert all(result == results[0] for result in results)
+    assert len(cache.slots) == len(texts)
+    assert len(set(cache.slots.values())) == len(texts)
@@ -0,0 +1,93 @@
+"""
+KBFetcher tests.
+
+Version: 2026.10.18.01
+"""
+
+import asyncio
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from lang.prod.kbfetch import KBFetcher
+from lang.prod.kbindex import KBIndex
+
+
+class StubSite(BaseHTTPRequestHandler):
+    """Stub site: /page has ETag "v1", the other paths are missing."""
+
+    # paths requested with a matching If-None-Match
+    revalidated: list[str] = []
+
+    def log_message(self, *args) -> None:
+        """Quiet."""
+
+    def do_GET(self) -> None:
+        """Serve /page, or 304 when the client has its ETag."""
+        if self.path != "/page":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.revalidated.append(self.path)
+            self.send_response(304)
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            return
+        body = b"<html><body>Page</body></html>"
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def site() -> Iterator[str]:
+    """Get the base url of a stub site."""
+    handler = type("Site", (StubSite,), {"revalidated": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_page_skipped(site: str, tmp_path: Path):
+    """An indexed page is revalidated with its ETag and not queued."""
+    index = KBIndex(tmp_path / "kb.sqlite")
+    fetcher = KBFetcher(index, concurrency=2)
+    url = f"{site}/page"
+    first = asyncio.run(fetcher.fetch_all([url]))[0]
+    assert first.changed
+    assert first.etag == '"v1"'
+    index.commit_page(url, "hash", {}, first.etag, first.modified)
+
+    async def queued() -> list[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        await fetcher.fetch_into([url, f"{site}/missing"], queue)
+        return [queue.get_nowait().url for _ in range(queue.qsize())]
+
+    assert asyncio.run(queued()) == []
+    again = asyncio.run(fetcher.fetch_all([url]))[0]
+    assert again.status == 304
+    assert not again.changed
+    assert not again.failed
+
+
+def test_missing_and_unindexed_pages(site: str, tmp_path: Path):
+    """A missing page fails, a page not indexed is fetched in full."""
+    index = KBIndex(tmp_path / "kb.sqlite")
+    # validators without an indexed page are not sent
+    index.set_validators(f"{site}/page", '"v1"', None)
+    pages = asyncio.run(
+        KBFetcher(index).fetch_all([f"{site}/missing", f"{site}/page"])
+    )
+    assert pages[0].failed
+    assert pages[0].status == 404
+    assert pages[1].changed
+    assert pages[1].status == 200
@@ -0,0 +1,39 @@
+"""
+LexborParser tests.
+
+Version: 2026.10.18.01
+"""
+
+from lang.prod.kbfetch import Page
+from lang.prod.kbhtml import LexborParser, ParsePool
+
+
+def pages(count: int) -> list[Page]:
+    """Get forum pages with a post and navigation."""
+    return [
+        Page(
+            f"page{i}",
+            200,
+            "<ul><li>Menu</li></ul>"
+            f"<div class='post-content'><p>Post {i}</p></div>",
+        )
+        for i in range(count)
+    ]
+
+
+def test_extract_selected_text():
+    """Only the text of the selected nodes is kept."""
+    doc = LexborParser()(pages(1)[0])
+    assert doc.page_content == "Post 0"
+    assert doc.metadata == {"source": "page0"}
+
+
+def test_pool_after_threshold():
+    """Pages past the threshold are parsed in the process pool."""
+    parser = LexborParser()
+    with ParsePool(3, workers=2) as pool:
+        docs = list(pool.map(parser, pages(3)))
+        assert pool.processes is None
+        docs += list(pool.map(parser, pages(5)[3:]))
+        assert pool.processes is not None
+    assert [doc.page_content for doc in docs] == [f"Post {i}" for i in range(5)]
@@ -0,0 +1,58 @@
+"""
+BM25Index tests.
+
+Version: 2026.10.18.01
+"""
+
+from pathlib import Path
+
+from lang.prod.kblex import BM25Index, HybridRetriever
+from langchain_core.documents import Document
+
+Texts = {
+    "a": "Ollama serves local language models over HTTP.",
+    "b": "The farmer grows apples and pears in the orchard.",
+    "c": "Local models answer questions about the orchard apples.",
+}
+
+
+def get_index(path: Path) -> BM25Index:
+    """Get an index of the test texts."""
+    index = BM25Index(path / "bm25.sqlite")
+    ids = list(Texts)
+    docs = [Document(Texts[cid], metadata={"id": cid}) for cid in ids]
+    index.upsert(ids, docs, [[] for _ in ids])
+    return index
+
+
+def ids_of(docs: list[Document]) -> list[str]:
+    """Get the chunk ids of documents."""
+    return [doc.metadata["id"] for doc in docs]
+
+
+def test_search_upsert_delete(tmp_path: Path):
+    """Matching chunks rank first, replaced and deleted ones are gone."""
+    index = get_index(tmp_path)
+    retriever = index.as_retriever(k=2)
+    assert ids_of(retriever.invoke("ollama models")) == ["a", "c"]
+    assert retriever.invoke("unknown words") == []
+
+    index.upsert(["a"], [Document("Pears only.", metadata={"id": "a"})], [[]])
+    assert index.count() == 3
+    assert ids_of(retriever.invoke("ollama")) == []
+    index.delete(["b", "missing"])
+    assert ids_of(retriever.invoke("pears")) == ["a"]
+    assert BM25Index(tmp_path / "bm25.sqlite").count() == 2
+
+
+def test_hybrid_fusion(tmp_path: Path):
+    """A chunk ranked well by both retrievers comes first."""
+    index = get_index(tmp_path)
+    hybrid = HybridRetriever(
+        retrievers=[index.as_retriever(k=3), index.as_retriever(k=1)], k=2
+    )
+    best = ids_of(hybrid.invoke("orchard apples"))
+    assert (
+        best[0] == ids_of(index.as_retriever(k=1).invoke("orchard apples"))[0]
+    )
+    assert len(best) == 2
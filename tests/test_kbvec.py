@@ -0,0 +1,113 @@
+"""
+VectorIndex tests.
+
+Version: 2026.10.18.02
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from lang.prod.kbvec import VectorIndex
+from langchain_core.documents import Document
+
+
+def chunks(start: int, count: int, dim: int = 16) -> tuple:
+    """Get ids, documents and random vectors of some chunks."""
+    rng = np.random.default_rng(start)
+    ids = [f"c{i}" for i in range(start, start + count)]
+    docs = [Document(page_content=f"text {cid}", metadata={}) for cid in ids]
+    return ids, docs, rng.normal(size=(count, dim)).tolist()
+
+
+def test_upsert_delete_round_trip(tmp_path: Path):
+    """Upserted chunks are found, deleted ones are not."""
+    index = VectorIndex(tmp_path)
+    ids, docs, vectors = chunks(0, 10)
+    index.upsert(ids, docs, vectors)
+    hits = index.search(np.asarray(vectors[3]), k=1)
+    assert index.doc(hits[0][0][0]).page_content == "text c3"
+
+    index.delete(["c3"])
+    hits = index.search(np.asarray(vectors[3]), k=10)
+    assert "c3" not in {index.doc(row).metadata["id"] for row, _ in hits[0]}
+
+    reopened = VectorIndex(tmp_path)
+    assert len(reopened.get_rows()) == 9
+
+
+@pytest.mark.parametrize("quant", ["int8", "binary"])
+def test_quant_mode_on_existing_index(tmp_path: Path, quant: str):
+    """Enabling a quantized mode on a float index keeps the new rows."""
+    ids, docs, vectors = chunks(0, 20)
+    VectorIndex(tmp_path).upsert(ids, docs, vectors)
+
+    index = VectorIndex(tmp_path, quant=quant)
+    new_ids, new_docs, new_vectors = chunks(100, 5)
+    index.upsert(new_ids, new_docs, new_vectors)
+    assert index.count == 25
+    size = (tmp_path / "vectors.bin").stat().st_size
+    assert size == 25 * 16 * 4
+
+    hits = VectorIndex(tmp_path, quant=quant).search(
+        np.asarray(new_vectors[2]), k=1
+    )
+    assert hits[0][0][0] == 22
+
+
+@pytest.mark.parametrize("quant", ["", "int8", "binary"])
+def test_compact_keeps_live_rows(tmp_path: Path, quant: str):
+    """Compaction drops the dead rows, the live ones are found as before."""
+    index = VectorIndex(tmp_path, quant=quant)
+    ids, docs, vectors = chunks(0, 20)
+    for doc, cid in zip(docs, ids):
+        doc.metadata["source"] = f"page-{cid[-1]}"
+    index.upsert(ids, docs, vectors)
+    index.delete([f"c{i}" for i in range(0, 20, 2)])
+    index.compact()
+    assert index.count == 10
+    assert (tmp_path / "vectors.bin").stat().st_size == 10 * 16 * 4
+    assert not (tmp_path / "compact.json").exists()
+
+    reopened = VectorIndex(tmp_path, quant=quant)
+    assert sorted(reopened.get_rows()) == sorted(ids[1::2])
+    row = reopened.search(np.asarray(vectors[7]), k=1)[0][0][0]
+    doc = reopened.doc(row)
+    assert doc.page_content == "text c7"
+    assert doc.metadata == {"id": "c7", "source": "page-7"}
+
+    new_ids, new_docs, new_vectors = chunks(100, 3)
+    reopened.upsert(new_ids, new_docs, new_vectors)
+    row = reopened.search(np.asarray(new_vectors[1]), k=1)[0][0][0]
+    assert reopened.doc(row).metadata["id"] == "c101"
+
+
+def test_compact_on_dead_fraction(tmp_path: Path):
+    """Deleting past the dead fraction compacts the index."""
+    index = VectorIndex(tmp_path)
+    index.Compact_Min = 8
+    ids, docs, vectors = chunks(0, 12)
+    index.upsert(ids, docs, vectors)
+    index.delete(ids[:3])
+    assert index.count == 12
+    index.delete(ids[3:4])
+    assert index.count == 8
+    assert len(index.get_rows()) == 8
+
+
+def test_compact_recovers_after_commit(tmp_path: Path):
+    """A compaction stopped after its commit is finished on open."""
+    index = VectorIndex(tmp_path)
+    ids, docs, vectors = chunks(0, 6)
+    index.upsert(ids, docs, vectors)
+    index.delete(ids[:2])
+    recover = index.recover
+    index.recover = lambda: None  # type: ignore[method-assign]
+    index.compact()
+    assert (tmp_path / "compact.json").exists()
+    index.recover = recover  # type: ignore[method-assign]
+
+    reopened = VectorIndex(tmp_path)
+    assert reopened.count == 4
+    assert sorted(reopened.get_rows()) == ids[2:]
+    assert not list(tmp_path.glob("*.new"))
@@ -0,0 +1,149 @@
+"""
+LG tests.
+
+Version: 2026.10.18.03
+"""
+
+import asyncio
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from lang.prod.lg import LG
+from lang.prod.lgsave import LGSaver
+from lang.prod.lm import OLM
+from lang.prod.rcache import ResponseCache
+
+
+def get_lg(url: str, path: Path) -> LG:
+    """Get an LG of a stub Ollama, without a semantic cache tier."""
+    return LG(
+        OLM("L008", "llama3.1", base_url=url),
+        LGSaver.from_path(path / "lg.sqlite"),
+        ResponseCache(path / "rcache.sqlite"),
+    )
+
+
+async def ask(lg: LG, question: str, cid: str) -> str:
+    """Get the answer of a question."""
+    return "".join([token async for token in lg.astream(question, cid)])
+
+
+def test_concurrent_turns(urls: list[str], tmp_path: Path):
+    """Each turn records its own context, prompt and evaluated tokens."""
+    lg = get_lg(urls[0], tmp_path)
+    port = urls[0].rsplit(":", 1)[1]
+
+    async def run() -> list[str]:
+        answers = await asyncio.gather(
+            ask(lg, "First question of a.", "a"),
+            ask(lg, "First question of b, a longer one than a.", "b"),
+        )
+        answers.append(await ask(lg, "Second question of a.", "a"))
+        await lg.saver.conn.close()
+        return answers
+
+    assert asyncio.run(run()) == [port] * 3
+    turns = {(turn["cid"], turn["evaluated"]) for turn in lg.turns}
+    # system, user / system, user, assistant, user
+    assert turns == {("a", 2), ("b", 2), ("a", 4)}
+    prompts = {turn["cid"]: turn["prompt"] for turn in list(lg.turns)[:2]}
+    assert prompts["b"] > prompts["a"] > 0
+    assert all(turn["ttft_s"] is not None for turn in lg.turns)
+
+
+def test_cached_answer(urls: list[str], tmp_path: Path):
+    """A repeated question in a new context is answered from the cache."""
+    lg = get_lg(urls[0], tmp_path)
+
+    async def run() -> None:
+        await ask(lg, "Same question.", "a")
+        await ask(lg, "Same question.", "b")
+        await lg.saver.conn.close()
+
+    asyncio.run(run())
+    assert [turn["cached"] for turn in lg.turns] == [False, True]
+    assert lg.turns[1]["evaluated"] == 0
+
+
+async def messages(lg: LG, cid: str) -> list[tuple[str, str]]:
+    """Get the types and contents of the saved messages of a context."""
+    state = await lg.graph.aget_state({"configurable": {"thread_id": cid}})
+    return [
+        (msg.type, str(msg.content)) for msg in state.values.get("messages", [])
+    ]
+
+
+def test_cancelled_turn_rolled_back(urls: list[str], tmp_path: Path):
+    """A turn cancelled mid-stream leaves no question behind."""
+    lg = get_lg(urls[0], tmp_path)
+    port = urls[0].rsplit(":", 1)[1]
+
+    def cancel(token: str) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        task.cancel()
+
+    async def run() -> tuple:
+        await ask(lg, "Question 0.", "a")
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.create_task(
+                lg.agraph_proc("Question 1.", "a", on_token=cancel)
+            )
+        after_cancel = await messages(lg, "a")
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.create_task(
+                lg.agraph_proc("Question 1.", "new", on_token=cancel)
+            )
+        new = await messages(lg, "new")
+        await ask(lg, "Question 2.", "a")
+        after = await messages(lg, "a")
+        latest = await lg.saver.latest()
+        await lg.saver.conn.close()
+        return after_cancel, new, after, latest
+
+    after_cancel, new, after, latest = asyncio.run(run())
+    assert after_cancel == [("human", "Question 0."), ("ai", port)]
+    assert new == []
+    assert after == [
+        ("human", "Question 0."),
+        ("ai", port),
+        ("human", "Question 2."),
+        ("ai", port),
+    ]
+    assert latest == "a"
+
+
+def test_failed_turn_rolled_back(
+    servers: list[ThreadingHTTPServer], urls: list[str], tmp_path: Path
+):
+    """A turn failed by the model leaves no question behind."""
+    lg = get_lg(urls[0], tmp_path)
+    servers[0].RequestHandlerClass.status = 500
+
+    async def run() -> list[tuple[str, str]]:
+        with pytest.raises(ValueError, match="500"):
+            await ask(lg, "Question.", "a")
+        saved = await messages(lg, "a")
+        await lg.saver.conn.close()
+        return saved
+
+    assert asyncio.run(run()) == []
+
+
+def test_model_stats_per_generation(urls: list[str]):
+    """Concurrent generations of a model each get their own TTFT."""
+    olm = OLM("L008", "llama3.1", base_url=urls[0])
+    llm = olm.get_llm()
+
+    async def run() -> None:
+        await asyncio.gather(
+            *(
+                llm.bind(session=f"s{i}").ainvoke(f"Question {i}.")
+                for i in range(3)
+            )
+        )
+
+    asyncio.run(run())
+    assert len(olm.stats.cold_ttft) == 3
+    assert olm.stats.starts == {}
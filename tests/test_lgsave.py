@@ -0,0 +1,79 @@
+"""
+LGSaver tests.
+
+Version: 2026.10.18.02
+"""
+
+import asyncio
+from pathlib import Path
+
+from lang.prod.lgsave import LGSaver
+from langgraph.checkpoint.base import empty_checkpoint
+
+
+async def put(saver: LGSaver, thread_id: str, count: int) -> None:
+    """Save some checkpoints of a thread."""
+    for _ in range(count):
+        await saver.aput(
+            {"configurable": {"thread_id": thread_id}}, empty_checkpoint(), {}
+        )
+        # checkpoint IDs are timestamps
+        await asyncio.sleep(0.001)
+
+
+async def checkpoints(saver: LGSaver) -> dict[str, int]:
+    """Get the checkpoint count of each thread."""
+    async with saver.conn.execute(
+        "SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id"
+    ) as cursor:
+        return dict(await cursor.fetchall())
+
+
+def test_latest_prune_compact(tmp_path: Path):
+    """Idle threads are pruned, the others keep their latest checkpoint."""
+
+    async def run() -> None:
+        saver = LGSaver.from_path(tmp_path / "lg.sqlite")
+        await put(saver, "old", 2)
+        await put(saver, "a", 3)
+        await put(saver, "b", 2)
+        assert await saver.latest() == "b"
+        await saver.conn.execute(
+            "UPDATE threads SET updated = 0 WHERE thread_id = 'old'"
+        )
+        assert await saver.prune(days=1) == 1
+        assert await checkpoints(saver) == {"a": 3, "b": 2}
+
+        assert await saver.compact("a") == 2
+        assert await checkpoints(saver) == {"a": 1, "b": 2}
+        assert await saver.maintain()
+        assert await checkpoints(saver) == {"a": 1, "b": 1}
+        latest = await saver.aget({"configurable": {"thread_id": "a"}})
+        assert latest is not None
+        await saver.close()
+
+    asyncio.run(run())
+
+
+def test_vacuum_when_worth_it(tmp_path: Path):
+    """Nothing cleaned up and few free pages: no vacuum."""
+
+    async def run() -> None:
+        saver = LGSaver.from_path(tmp_path / "lg.sqlite")
+        await put(saver, "a", 1)
+        assert not await saver.maintain()
+        # free pages left by deletes outside maintain
+        for i in range(50):
+            await put(saver, f"t{i}", 1)
+        for table in ("writes", "checkpoints", "threads"):
+            await saver.conn.execute(
+                f"DELETE FROM {table} WHERE thread_id != 'a'"
+            )
+        await saver.conn.commit()
+        assert await saver.free() > saver.Vacuum_Free
+        assert await saver.maintain()
+        assert await saver.free() == 0
+        assert await checkpoints(saver) == {"a": 1}
+        await saver.close()
+
+    asyncio.run(run())
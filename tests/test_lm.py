@@ -0,0 +1,93 @@
+"""
+OLM tests.
+
+Version: 2026.10.18.02
+"""
+
+import socket
+from http.server import ThreadingHTTPServer
+
+from lang.prod.lm import EOM, OLM, AdaptiveChatOllama
+from langchain_core.messages import BaseMessage, HumanMessage
+
+
+def test_warm(servers: list[ThreadingHTTPServer], urls: list[str]):
+    """Warm-up loads the model with the context window of the requests."""
+    olm = OLM("A", EOM.L008, num_ctx=4096, base_url=urls[0])
+    assert olm.warm() >= 0
+    (body,) = servers[0].RequestHandlerClass.bodies
+    assert body["path"] == "/api/generate"
+    assert (body["model"], body["keep_alive"]) == (EOM.L008, "-1m")
+    assert body["options"]["num_ctx"] == 4096
+    assert olm.llm.ctx_last == 4096
+
+
+def test_prewarm_once(servers: list[ThreadingHTTPServer], urls: list[str]):
+    """A warm-up in flight or done is reused until the model is unloaded."""
+    olm = OLM("A", EOM.L008, base_url=urls[0])
+    olm.wait_warm()
+    assert not olm.stats.warm
+    olm.prewarm()
+    warming = olm.warming
+    olm.prewarm()
+    assert olm.warming is warming
+    olm.wait_warm()
+    assert olm.stats.warm
+    olm.prewarm()
+    olm.wait_warm()
+    assert len(servers[0].RequestHandlerClass.bodies) == 1
+    olm.cool()
+    assert (olm.warming, olm.stats.warm) == (None, False)
+    olm.prewarm()
+    olm.wait_warm()
+    assert len(servers[0].RequestHandlerClass.bodies) == 2
+
+
+def test_warm_server_down():
+    """A failed warm-up is forgotten, to try again on the next selection."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    olm = OLM("A", EOM.L008, base_url=f"http://127.0.0.1:{port}")
+    assert olm.warm() == -1
+    assert olm.llm.ctx_last == 0
+    olm.prewarm()
+    olm.wait_warm()
+    assert (olm.warming, olm.stats.warm) == (None, False)
+
+
+def words(n: int) -> list[BaseMessage]:
+    """Get a prompt of n word tokens."""
+    return [HumanMessage("word " * n)]
+
+
+def test_fit_ctx_buckets():
+    """The window is the bucket of the prompt and the answer, up to the cap."""
+    llm = AdaptiveChatOllama(model=EOM.G009, num_predict=1024, ctx_max=8192)
+    assert llm.fit_ctx(words(0), "a") == 2048
+    assert llm.fit_ctx(words(1500), "b") == 4096
+    assert llm.fit_ctx(words(5000), "c") == 8192
+    assert llm.fit_ctx(words(20000), "d") == 8192
+    assert llm.ctx_last == 8192
+
+
+def test_fit_ctx_hysteresis_per_session():
+    """A session window only shrinks for a short prompt, others keep theirs."""
+    llm = AdaptiveChatOllama(model=EOM.L008, num_predict=1024)
+    assert llm.fit_ctx(words(5000), "a") == 8192
+    # still needs over a quarter of the window
+    assert llm.fit_ctx(words(1500), "a") == 8192
+    assert llm.fit_ctx(words(1500), "b") == 4096
+    assert llm.fit_ctx(words(0), "a") == 2048
+    assert llm.ctx_sessions == {"b": 4096, "a": 2048}
+
+
+def test_fit_ctx_sessions_bounded():
+    """The least recent sessions are forgotten."""
+    llm = AdaptiveChatOllama(model=EOM.L008, ctx_sessions_max=2)
+    for session in "abca":
+        llm.fit_ctx(words(0), session)
+    assert list(llm.ctx_sessions) == ["c", "a"]
+    payload, options = llm.chat_request(words(5000), session="b")
+    assert options == {"num_ctx": 8192}
+    assert list(llm.ctx_sessions) == ["a", "b"]
@@ -0,0 +1,142 @@
+"""
+OllamaHosts tests.
+
+Version: 2026.10.18.03
+"""
+
+import asyncio
+import time
+from http.server import ThreadingHTTPServer
+
+import httpx
+import pytest
+import requests
+from lang.prod.lm import OLM
+from lang.prod.lmhost import OllamaHosts
+from lang.prod.lmtune import OLMTune
+from langchain_core.messages import HumanMessage
+
+
+def hosts_of(*urls: str) -> OllamaHosts:
+    """Get a host pool without a health check due."""
+    hosts = OllamaHosts(list(urls))
+    hosts.checked = time.monotonic()
+    return hosts
+
+
+@pytest.mark.parametrize(
+    ("error", "down"),
+    [
+        (requests.ConnectionError(), True),
+        (requests.Timeout(), True),
+        (httpx.ConnectError("refused"), True),
+        (TimeoutError(), True),
+        (ValueError("Ollama call failed with status code 503."), True),
+        (ValueError("Ollama call failed with status code 400."), False),
+        (
+            ValueError("`stop` found in both the input and default params."),
+            False,
+        ),
+        (KeyError("message"), False),
+        (ConnectionError("No Ollama host is up for m."), False),
+    ],
+)
+def test_host_down(error: BaseException, down: bool):
+    """Only the errors of a host take it out."""
+    assert OllamaHosts.host_down(error) is down
+
+
+def test_pick_loaded_and_pinned():
+    """A request goes to a host with the model, and its session sticks."""
+    hosts = hosts_of("http://a", "http://b")
+    hosts.hosts[1].models.add("m")
+    first = hosts.pick("m", session="s")
+    assert first.url == "http://b"
+    hosts.done(first, "m", down=False)
+    hosts.hosts[0].models.add("m")
+    hosts.hosts[1].outstanding = 2
+    assert hosts.pick("m", session="s").url == "http://b"
+    assert hosts.pick("m").url == "http://a"
+
+
+def test_route_keeps_host_on_bad_request():
+    """A request error leaves the host up, a host error takes it out."""
+    hosts = hosts_of("http://a")
+    host = hosts.hosts[0]
+    with pytest.raises(KeyError), hosts.route("m"):
+        raise KeyError("message")
+    assert host.healthy
+    with pytest.raises(requests.ConnectionError), hosts.route("m"):
+        raise requests.ConnectionError()
+    assert not host.healthy
+    assert host.outstanding == 0
+
+
+def test_check_in_background(urls: list[str]):
+    """A due health check does not block the pick, and brings hosts up."""
+    hosts = OllamaHosts(urls, interval=0)
+    hosts.hosts[0].healthy = False
+    hosts.pick("m")
+    assert hosts.checking is not None
+    hosts.checking.join(5)
+    assert hosts.hosts[0].healthy
+
+
+def test_failover_on_server_error(
+    servers: list[ThreadingHTTPServer], urls: list[str]
+):
+    """A 5xx host is taken out and the request is answered by another."""
+    servers[0].RequestHandlerClass.status = 500
+    olm = OLM("L008", "llama3.1", base_url=urls)
+    assert olm.hosts is not None
+    olm.hosts.checked = time.monotonic()
+    olm.hosts.hosts[0].models.add("llama3.1")
+    answer = olm.llm.invoke([HumanMessage("Question")])
+    assert answer.content == str(servers[1].server_address[1])
+    assert not olm.hosts.hosts[0].healthy
+    assert olm.hosts.hosts[1].served == 1
+
+
+def test_no_failover_on_bad_request(
+    servers: list[ThreadingHTTPServer], urls: list[str]
+):
+    """A 4xx reply fails the request without taking the host out."""
+    for server in servers:
+        server.RequestHandlerClass.status = 400
+    olm = OLM("L008", "llama3.1", base_url=urls)
+    assert olm.hosts is not None
+    olm.hosts.checked = time.monotonic()
+    with pytest.raises(ValueError, match="400"):
+        asyncio.run(olm.llm.ainvoke([HumanMessage("Question")]))
+    assert all(host.healthy for host in olm.hosts.hosts)
+    assert sum(host.outstanding for host in olm.hosts.hosts) == 0
+
+
+@pytest.mark.parametrize("num_thread", [0, 2])
+def test_options_of_routed_host(
+    servers: list[ThreadingHTTPServer],
+    urls: list[str],
+    monkeypatch: pytest.MonkeyPatch,
+    num_thread: int,
+):
+    """A request has the tuned options of its host, an explicit one wins."""
+    profiles = {
+        urls[0]: {"num_thread": 4, "num_gpu": 0},
+        urls[1]: {"num_thread": 16},
+    }
+    monkeypatch.setattr(
+        OLMTune, "profile", staticmethod(lambda mn, url: profiles[url])
+    )
+    olm = OLM("L008", "llama3.1", num_thread=num_thread, base_url=urls)
+    assert olm.hosts is not None
+    olm.hosts.checked = time.monotonic()
+    for up in range(2):
+        for index, host in enumerate(olm.hosts.hosts):
+            host.healthy = index == up
+        olm.llm.invoke([HumanMessage("Question")])
+    first, second = (server.RequestHandlerClass.bodies for server in servers)
+    assert first[-1]["options"]["num_thread"] == (num_thread or 4)
+    assert first[-1]["options"]["num_gpu"] == 0
+    assert second[-1]["options"]["num_thread"] == (num_thread or 16)
+    assert second[-1]["options"]["num_gpu"] is None
+    assert second[-1]["options"]["num_ctx"] == olm.llm.ctx_min
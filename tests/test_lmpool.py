@@ -0,0 +1,89 @@
+"""
+OLMPool tests.
+
+Version: 2026.10.18.01
+"""
+
+import asyncio
+from http.server import ThreadingHTTPServer
+
+from lang.prod.lm import EOM, EOMInfo
+from lang.prod.lmpool import OLMPool
+
+
+def load(server: ThreadingHTTPServer, *mns: str) -> None:
+    """Set the models the stub Ollama has loaded."""
+    server.RequestHandlerClass.loaded = [
+        {"name": mn, "size": int(EOMInfo.size(mn) * 1024**3)} for mn in mns
+    ]
+
+
+def unloaded(server: ThreadingHTTPServer) -> list[str]:
+    """Get the models unloaded from the stub Ollama, in order."""
+    return [
+        body["model"]
+        for body in server.RequestHandlerClass.bodies
+        if body["path"] == "/api/generate" and body["keep_alive"] == 0
+    ]
+
+
+def test_budget_evicts_lru(servers: list[ThreadingHTTPServer], urls: list[str]):
+    """Past the budget, the least recently used model is unloaded."""
+    pool = OLMPool(budget=13, base_url=urls[0])
+
+    async def run() -> None:
+        await pool.acquire("A", EOM.L008)
+        load(servers[0], EOM.L008)
+        await pool.acquire("B", EOM.P003)
+        load(servers[0], EOM.L008, EOM.P003)
+        # used again: P003 is now the least recently used
+        pool.get("A", EOM.L008, warm=False)
+        await pool.acquire("C", EOM.G009)
+
+    asyncio.run(run())
+    assert unloaded(servers[0]) == [EOM.P003]
+    assert list(pool.residency()) == [EOM.L008, EOM.G009]
+    assert pool.used <= pool.budget
+    assert pool.olms[EOM.P003].warming is None
+
+
+def test_held_not_evicted(servers: list[ThreadingHTTPServer], urls: list[str]):
+    """A model in use stays loaded, even over the budget."""
+    pool = OLMPool(budget=13, base_url=urls[0])
+
+    async def run() -> None:
+        await pool.acquire("A", EOM.L008)
+        load(servers[0], EOM.L008)
+        await pool.acquire("B", EOM.P003)
+        load(servers[0], EOM.L008, EOM.P003)
+        with pool.hold(EOM.L008):
+            await pool.acquire("C", EOM.G009)
+        load(servers[0], EOM.L008, EOM.G009)
+        with pool.hold(EOM.L008), pool.hold(EOM.G009):
+            await pool.acquire("D", EOM.M012)
+
+    asyncio.run(run())
+    assert unloaded(servers[0]) == [EOM.P003]
+    assert list(pool.residency()) == [EOM.L008, EOM.G009, EOM.M012]
+    assert pool.held == {}
+
+
+def test_refresh_from_ps(servers: list[ThreadingHTTPServer], urls: list[str]):
+    """Residency follows the models Ollama has loaded."""
+    pool = OLMPool(base_url=urls[0])
+    pool.get("A", EOM.L008, warm=False)
+    olm = pool.get("B", EOM.P003, warm=False)
+    olm.stats.warm = True
+    servers[0].RequestHandlerClass.loaded = [
+        {"name": f"{EOM.L008}:latest", "size": 6 * 1024**3},
+        {"name": EOM.G027, "size": 0},
+    ]
+    asyncio.run(pool.refresh(""))
+    # unloaded by Ollama: dropped and cold, loaded elsewhere: evicted first
+    assert pool.residency() == {EOM.G027: 18.5, EOM.L008: 6.0}
+    assert list(pool.residency()) == [EOM.G027, EOM.L008]
+    assert not olm.stats.warm
+    # a model being acquired is kept
+    pool.get("B", EOM.P003, warm=False)
+    asyncio.run(pool.refresh(EOM.P003))
+    assert EOM.P003 in pool.residency()
@@ -0,0 +1,96 @@
+"""
+OLMTune tests.
+
+Version: 2026.10.18.02
+"""
+
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from lang.prod import lmtune
+from lang.prod.lmtune import OLMTune
+
+
+class Ollama:
+    """Stub of the Ollama generate API: faster with more threads."""
+
+    def __init__(self, fail: set[int] | None = None, cached: bool = False):
+        """
+        Class initialization.
+
+        :param fail: Thread counts that fail with a server error.
+        :param cached: Leave out the prompt eval count, as for a cached
+            prompt.
+        """
+        self.fail = fail or set()
+        self.cached = cached
+
+    def __call__(self, url: str, json: dict[str, Any], **kwargs: Any):
+        """Answer a generate request."""
+        threads = json["options"]["num_thread"]
+        request = httpx.Request("POST", url)
+        if threads in self.fail:
+            return httpx.Response(500, request=request)
+        info = {
+            "prompt_eval_duration": 10**9,
+            "eval_count": 128,
+            "eval_duration": 10**9 // threads,
+        }
+        if not self.cached:
+            info["prompt_eval_count"] = 512
+        return httpx.Response(200, json=info, request=request)
+
+
+@pytest.fixture
+def tuner(tmp_path: Path) -> OLMTune:
+    """Get a tuner of a two thread count grid."""
+    tune = OLMTune(path=tmp_path / "tune.json")
+    tune.grid = {"num_thread": [2, 4], "num_batch": [512]}
+    return tune
+
+
+def test_missing_counts(tuner: OLMTune, monkeypatch: pytest.MonkeyPatch):
+    """A response without the prompt eval count is still measured."""
+    monkeypatch.setattr(lmtune.httpx, "post", Ollama(cached=True))
+    result = tuner.run("m", {"num_thread": 2})
+    assert result == {"prompt_tps": 0.0, "eval_tps": 256.0, "seconds": 0.5}
+
+
+def test_failed_start_point(tuner: OLMTune, monkeypatch: pytest.MonkeyPatch):
+    """A failed start point is skipped, the next run is the best."""
+    monkeypatch.setattr(lmtune.httpx, "post", Ollama(fail={2}))
+    assert tuner.tune("m")["options"] == {"num_thread": 4, "num_batch": 512}
+
+
+def test_all_failed(tuner: OLMTune, monkeypatch: pytest.MonkeyPatch):
+    """No run succeeding raises."""
+    monkeypatch.setattr(lmtune.httpx, "post", Ollama(fail={2, 4}))
+    with pytest.raises(RuntimeError):
+        tuner.tune("m")
+
+
+def test_prompt_new_each_run(tuner: OLMTune, monkeypatch: pytest.MonkeyPatch):
+    """Each run sends a prompt the KV cache has not seen."""
+    prompts = []
+
+    def post(url: str, json: dict[str, Any], **kwargs: Any):
+        prompts.append(json["prompt"])
+        return Ollama()(url, json, **kwargs)
+
+    monkeypatch.setattr(lmtune.httpx, "post", post)
+    tuner.tune("m")
+    assert len(set(prompts)) == len(prompts) == 2
+
+
+@pytest.mark.parametrize(("gpu", "grid"), [(None, False), ("nvidia-smi", True)])
+def test_num_gpu_only_with_gpu(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, gpu: str | None, grid: bool
+):
+    """GPU offload is left to Ollama where it cannot be benchmarked."""
+    monkeypatch.setattr(lmtune.shutil, "which", lambda name: gpu)
+    monkeypatch.setattr(lmtune.httpx, "post", Ollama())
+    tuner = OLMTune(path=tmp_path / "tune.json")
+    assert ("num_gpu" in tuner.grid) is grid
+    assert ("num_gpu" in tuner.tune("m")["options"]) is grid
@@ -0,0 +1,42 @@
+"""
+ResponseCache tests.
+
+Version: 2026.10.18.01
+"""
+
+from pathlib import Path
+
+import pytest
+from lang.prod.rcache import ResponseCache
+from langchain_core.messages import HumanMessage
+
+Options = {"temperature": 0.1}
+
+
+def key(text: str) -> str:
+    """Get the exact tier key of a question."""
+    return ResponseCache.key("m", "sys", [HumanMessage(text)], Options)
+
+
+@pytest.mark.parametrize(
+    ("one", "two"),
+    [("Is x > 5?", "Is x < 5?"), ("2+3", "2*3"), ("C++", "C")],
+)
+def test_key_keeps_symbols(one: str, two: str):
+    """Questions that differ in symbols only have their own keys."""
+    assert key(one) != key(two)
+
+
+def test_key_ignores_case_and_space():
+    """Case and white space do not change the key."""
+    assert key("What is  C++?") == key("what is c++?\n")
+
+
+def test_exact_tier(tmp_path: Path):
+    """A cached answer is returned for the same request only."""
+    cache = ResponseCache(tmp_path / "rc.sqlite")
+    msgs = [HumanMessage("2+3")]
+    cache.put("m", "sys", msgs, Options, "5")
+    assert cache.get("m", "sys", msgs, Options) == "5"
+    assert cache.get("m", "sys", [HumanMessage("2*3")], Options) is None
+    assert cache.get("other", "sys", msgs, Options) is None
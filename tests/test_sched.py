@@ -0,0 +1,119 @@
+"""
+Scheduler tests.
+
+Version: 2026.10.18.02
+"""
+
+import asyncio
+import threading
+
+import pytest
+from lang.prod.lm import EOM, OLM
+from lang.prod.sched import Priority, Scheduler, SchedulerBusyError, Ticket
+from langchain_core.messages import HumanMessage
+
+
+def start_order(sched: Scheduler, *requests: tuple[str, Priority]) -> list[str]:
+    """Queue requests "session.n" behind a running one, get their order."""
+    held = Ticket("m", "held", Priority.BATCH)
+    assert sched.enqueue(held)
+    started: list[tuple[str, Ticket]] = []
+    for name, priority in requests:
+        ticket = Ticket("m", name.split(".")[0], priority)
+        ticket.wake = lambda n=name, t=ticket: started.append((n, t))
+        assert not sched.enqueue(ticket)
+    sched.release(held)
+    # each request runs alone and starts the next one when done
+    for _, ticket in started:
+        sched.release(ticket)
+    return [name for name, _ in started]
+
+
+def test_interactive_first_and_sessions_take_turns():
+    """Interactive requests go first, then the sessions take turns."""
+    order = start_order(
+        Scheduler(parallel=1),
+        ("a.1", Priority.BATCH),
+        ("a.2", Priority.BATCH),
+        ("a.3", Priority.BATCH),
+        ("b.1", Priority.BATCH),
+        ("c.1", Priority.INTERACTIVE),
+    )
+    assert order == ["c.1", "a.1", "b.1", "a.2", "a.3"]
+
+
+def test_full_queue_rejects():
+    """A request past the queue limit is rejected and counted."""
+    sched = Scheduler(parallel=1, max_queue=1)
+    assert sched.enqueue(Ticket("m", "a", Priority.BATCH))
+    assert not sched.enqueue(Ticket("m", "a", Priority.BATCH))
+    with pytest.raises(SchedulerBusyError):
+        sched.enqueue(Ticket("m", "b", Priority.INTERACTIVE))
+    assert sched.stats()["m"]["rejected"] == 1
+    # other models have their own slots
+    assert sched.enqueue(Ticket("n", "a", Priority.BATCH))
+
+
+def test_threads_and_tasks_share_slots():
+    """A thread holding the slot wakes a waiting task, a cancel frees it."""
+    sched = Scheduler(parallel=1)
+    held = threading.Event()
+    done = threading.Event()
+
+    def hold() -> None:
+        with sched.slot("m", "thread"):
+            held.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait(5)
+
+    async def run() -> None:
+        cancelled = asyncio.create_task(sched.aslot("m", "a").__aenter__())
+        await asyncio.sleep(0.05)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert sched.depth("m") == 0
+        asyncio.get_running_loop().call_later(0.05, done.set)
+        async with sched.aslot("m", "b") as ticket:
+            assert ticket.started is not None
+            assert sched.stats()["m"]["running"] == 1
+
+    asyncio.run(run())
+    thread.join(5)
+    assert sched.stats()["m"]["running"] == 0
+
+
+def test_slots_per_host():
+    """A model has its slots on each host, with its own queue."""
+    sched = Scheduler(parallel=4, limits={"big": 1})
+    assert sched.enqueue(Ticket("big", "a", Priority.BATCH, "http://a"))
+    assert sched.enqueue(Ticket("big", "b", Priority.BATCH, "http://b"))
+    assert not sched.enqueue(Ticket("big", "c", Priority.BATCH, "http://a"))
+    stats = sched.stats()
+    assert stats["big@http://a"]["waiting"] == 1
+    assert stats["big@http://b"]["running"] == 1
+    assert stats["big@http://b"]["slots"] == 1
+
+
+def test_admitted_after_routing(urls: list[str]):
+    """Requests of a one-slot model run on every host at once."""
+    olm = OLM("L070", EOM.L070, base_url=urls)
+    assert olm.hosts is not None
+    olm.hosts.checked = float("inf")
+    llm = olm.get_llm()
+
+    async def run() -> None:
+        await asyncio.gather(
+            llm.bind(session="a").ainvoke([HumanMessage("Question a.")]),
+            llm.bind(session="b").ainvoke([HumanMessage("Question b.")]),
+        )
+
+    asyncio.run(run())
+    assert [host.served for host in olm.hosts.hosts] == [1, 1]
+    stats = OLM.Request_Scheduler.stats()
+    for url in urls:
+        assert stats[f"{EOM.L070}@{url}"]["slots"] == 1
+        assert stats[f"{EOM.L070}@{url}"]["waiting"] == 0